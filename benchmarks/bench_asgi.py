@@ -0,0 +1,90 @@
+"""
+Per-request latency of CookiesSameSite in an async middleware chain.
+
+Compares the middleware adapted with sync_to_async (the way Django wraps sync-only
+middleware under ASGI) with the native coroutine path.
+
+    python -m benchmarks.bench_asgi
+"""
+import asyncio
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+django.setup()
+
+from asgiref.sync import sync_to_async  # noqa: E402
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from django_cookies_samesite.middleware import CookiesSameSite  # noqa: E402
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/79.0.3945.88 Safari/537.36"
+)
+
+
+def cookies_response(request):
+    response = HttpResponse("cookies!")
+    response.set_cookie("sessionid", "something")
+    response.set_cookie("csrftoken", "something")
+    return response
+
+
+async def async_cookies_response(request):
+    return cookies_response(request)
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        "requests": len(timings),
+        "mean_us": sum(timings) / len(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6,
+    }
+
+
+async def measure(handler, request, requests):
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await handler(request)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run(requests=5000):
+    request = RequestFactory().get("/", HTTP_USER_AGENT=USER_AGENT, secure=True)
+    with override_settings(SESSION_COOKIE_SAMESITE="None"):
+        adapted = sync_to_async(CookiesSameSite(cookies_response), thread_sensitive=True)
+        native = CookiesSameSite(async_cookies_response)
+
+        loop = asyncio.new_event_loop()
+        try:
+            results = {}
+            for name, handler in (("sync_to_async", adapted), ("native", native)):
+                loop.run_until_complete(measure(handler, request, requests // 10))
+                results[name] = summarize(
+                    loop.run_until_complete(measure(handler, request, requests))
+                )
+        finally:
+            loop.close()
+    return results
+
+
+def main():
+    for name, stats in run().items():
+        print(
+            "{:<15} mean {mean_us:8.1f}us  p50 {p50_us:8.1f}us  p99 {p99_us:8.1f}us".format(
+                name, **stats
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Cost of rewriting cookies in SESSION_COOKIE_SAMESITE_FORCE_ALL mode, from 1 to 200 cookies.
+
+Compares the precomputed attributes applied by the middleware with setting every attribute
+through Morsel.__setitem__, the way the middleware used to rewrite the cookies.
+
+    python -m benchmarks.bench_cookies
+"""
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+django.setup()
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from django_cookies_samesite.cookies import SameSiteMorsel  # noqa: E402
+from django_cookies_samesite.middleware import CookiesSameSite  # noqa: E402
+
+COOKIE_COUNTS = (1, 10, 50, 100, 200)
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/79.0.3945.88 Safari/537.36"
+)
+
+
+def make_response(cookie_count):
+    response = HttpResponse("cookies!")
+    for index in range(cookie_count):
+        response.set_cookie("cookie_{}".format(index), "something")
+    return response
+
+
+def morsel_rewrite(middleware, request, response):
+    """Set the attributes one by one, the way the middleware used to."""
+    for cookie in response.cookies:
+        https = request.is_secure()
+        morsel = response.cookies[cookie]
+        morsel.__class__ = SameSiteMorsel
+        morsel["samesite"] = "Lax" if middleware.devmode and not https else "None"
+        if https:
+            morsel["secure"] = True
+    return response
+
+
+def measure(rewrite, request, cookie_count, repeat):
+    responses = [make_response(cookie_count) for _ in range(repeat)]
+    start = time.perf_counter()
+    for response in responses:
+        rewrite(request, response)
+    return (time.perf_counter() - start) / repeat
+
+
+def run(repeat=500):
+    request = RequestFactory().get("/", HTTP_USER_AGENT=USER_AGENT, secure=True)
+    results = {}
+    with override_settings(
+        SESSION_COOKIE_SAMESITE="None", SESSION_COOKIE_SAMESITE_FORCE_ALL=True
+    ):
+        middleware = CookiesSameSite()
+        for cookie_count in COOKIE_COUNTS:
+            results[str(cookie_count)] = {
+                "morsel_us": measure(
+                    lambda req, resp: morsel_rewrite(middleware, req, resp),
+                    request,
+                    cookie_count,
+                    repeat,
+                )
+                * 1e6,
+                "precomputed_us": measure(
+                    middleware.process_response, request, cookie_count, repeat
+                )
+                * 1e6,
+            }
+    return results
+
+
+def main():
+    print("{:>8} {:>12} {:>15}".format("cookies", "morsel", "precomputed"))
+    for cookie_count, stats in run().items():
+        print(
+            "{:>8} {morsel_us:10.1f}us {precomputed_us:13.1f}us".format(
+                cookie_count, **stats
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Startup cost of the middleware, measured with ``python -X importtime`` in fresh interpreters.
+
+The ua_parser regex database is compiled on the first full User-Agent parse, so it's
+reported separately from the import of the middleware.
+
+    python -m benchmarks.bench_import
+"""
+from django_cookies_samesite.testing import import_times
+
+MODULES = ("django_cookies_samesite.middleware", "ua_parser.user_agent_parser")
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/66.0.3334.0 Safari/537.36"
+)
+
+
+def run(repeat=5):
+    code = (
+        "import django_cookies_samesite.middleware\n"
+        "from django_cookies_samesite.user_agent_checker import UserAgentChecker\n"
+        "UserAgentChecker({!r})\n".format(USER_AGENT)
+    )
+    samples = [import_times(code) for _ in range(repeat)]
+    results = {}
+    for module in MODULES:
+        results["{}_us".format(module)] = min(times[module] for times in samples)
+    return results
+
+
+def main():
+    for name, value in sorted(run().items()):
+        print("{:<45} {:>12.0f}us".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Per-response cost of CookiesSameSite.process_response across configurations.
+
+    python -m benchmarks.bench_middleware
+"""
+import os
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+django.setup()
+
+from django.http import HttpResponse  # noqa: E402
+from django.test import RequestFactory  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from benchmarks.corpus import weighted_sample  # noqa: E402
+from django_cookies_samesite.cache import clear_verdict_cache  # noqa: E402
+from django_cookies_samesite.instrumentation import MetricsCollector  # noqa: E402
+from django_cookies_samesite.middleware import CookiesSameSite  # noqa: E402
+
+CONFIGURATIONS = {
+    "protected_keys": {"SESSION_COOKIE_SAMESITE": "None"},
+    "force_all": {
+        "SESSION_COOKIE_SAMESITE": "None",
+        "SESSION_COOKIE_SAMESITE_FORCE_ALL": True,
+    },
+    "devmode": {"SESSION_COOKIE_SAMESITE": "None", "SAMESITE_DEVMODE": True},
+}
+
+
+def make_response():
+    response = HttpResponse("cookies!")
+    for cookie in ("sessionid", "csrftoken", "cart", "theme", "consent"):
+        response.set_cookie(cookie, "something")
+    return response
+
+
+def measure(middleware, requests):
+    responses = [make_response() for _ in requests]
+    start = time.perf_counter()
+    for request, response in zip(requests, responses):
+        middleware.process_response(request, response)
+    return (time.perf_counter() - start) / len(requests) * 1e6
+
+
+def run(size=5000):
+    factory = RequestFactory()
+    user_agents = weighted_sample(size)
+    results = {}
+    for name, config in CONFIGURATIONS.items():
+        with override_settings(**config):
+            middleware = CookiesSameSite()
+            for scheme, secure in (("http", False), ("https", True)):
+                requests = [
+                    factory.get("/", HTTP_USER_AGENT=ua, secure=secure)
+                    for ua in user_agents
+                ]
+                clear_verdict_cache()
+                results["{}_{}_cold_us".format(name, scheme)] = measure(
+                    middleware, requests
+                )
+                results["{}_{}_us".format(name, scheme)] = measure(
+                    middleware, requests
+                )
+
+    # The same warm run with a response_processed receiver connected.
+    with override_settings(**CONFIGURATIONS["protected_keys"]):
+        middleware = CookiesSameSite()
+        requests = [factory.get("/", HTTP_USER_AGENT=ua) for ua in user_agents]
+        collector = MetricsCollector()
+        collector.connect()
+        try:
+            results["instrumented_http_us"] = measure(middleware, requests)
+        finally:
+            collector.disconnect()
+    return results
+
+
+def main():
+    for name, value in run().items():
+        print("{:<30} {:8.2f}us".format(name, value))
+
+
+if __name__ == "__main__":
+    main()
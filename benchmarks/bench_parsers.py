@@ -0,0 +1,83 @@
+"""
+Per User-Agent cost of the parser backends on the same corpus, and how many verdicts
+differ from the ua_parser ones.
+
+    python -m benchmarks.bench_parsers
+    python -m benchmarks.bench_parsers myproject.parsers.FastBackend   # compare another backend
+"""
+import io
+import os
+import sys
+import time
+
+from django.utils.module_loading import import_string
+
+from benchmarks.corpus import USER_AGENTS_PATH, load_weighted_user_agents
+from django_cookies_samesite.user_agent_checker import UserAgentChecker
+
+BACKENDS = (
+    "django_cookies_samesite.parsers.UAParserBackend",
+    "django_cookies_samesite.parsers.MinimalBackend",
+)
+REGRESSION_CORPUS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "tests", "user_agents.txt"
+)
+
+
+def load_corpus():
+    """The distinct User-Agents of the benchmarks and the tests corpora."""
+    user_agents = set(
+        user_agent for _, user_agent in load_weighted_user_agents(USER_AGENTS_PATH)
+    )
+    with io.open(REGRESSION_CORPUS_PATH, encoding="utf-8") as corpus:
+        user_agents.update(line.strip() for line in corpus if line.strip())
+    return sorted(user_agents)
+
+
+def measure(function, user_agents, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for user_agent in user_agents:
+            function(user_agent)
+        elapsed = (time.perf_counter() - start) / len(user_agents) * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(backends=BACKENDS):
+    user_agents = load_corpus()
+    reference = [UserAgentChecker(ua).incompatibility_rule for ua in user_agents]
+    results = {}
+    for path in backends:
+        parser = import_string(path)()
+        # The first parse pays for the imports and the regex compilation.
+        parser.parse(user_agents[0])
+        rules = [
+            UserAgentChecker(ua, parser=parser).incompatibility_rule
+            for ua in user_agents
+        ]
+        results[path.rsplit(".", 1)[-1]] = {
+            "parse_us": measure(parser.parse, user_agents),
+            "verdict_us": measure(
+                lambda ua: UserAgentChecker(ua, parser=parser).incompatibility_rule,
+                user_agents,
+            ),
+            "verdict_mismatches": sum(1 for a, b in zip(reference, rules) if a != b),
+        }
+    return results
+
+
+def main():
+    backends = tuple(sys.argv[1:]) or BACKENDS
+    print("{:<20} {:>10} {:>12} {:>12}".format("backend", "parse", "verdict", "mismatches"))
+    for name, stats in run(backends).items():
+        print(
+            "{:<20} {parse_us:8.1f}us {verdict_us:10.1f}us {verdict_mismatches:>12}".format(
+                name, **stats
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Per User-Agent cost of the classification, over a corpus weighted by popularity.
+
+    python -m benchmarks.bench_user_agent_checker
+"""
+import time
+import tracemalloc
+
+from benchmarks.corpus import weighted_sample
+from django_cookies_samesite.cache import VerdictCache
+from django_cookies_samesite.classifier import get_do_not_send_same_site_policy
+from django_cookies_samesite.user_agent_checker import UserAgentChecker, parse_client
+
+
+def measure(classify, user_agents):
+    start = time.perf_counter()
+    for user_agent in user_agents:
+        classify(user_agent)
+    return (time.perf_counter() - start) / len(user_agents) * 1e6
+
+
+def measure_batch(classify_many, user_agents):
+    start = time.perf_counter()
+    classify_many(user_agents)
+    return (time.perf_counter() - start) / len(user_agents) * 1e6
+
+
+def measure_instance_size(user_agents):
+    """Average number of bytes kept alive by a UserAgentChecker instance."""
+    user_agents = sorted(set(user_agents))
+    # Import ua_parser and compile its regexes first, they're not part of the instances.
+    parse_client("")
+    tracemalloc.start()
+    try:
+        checkers = [UserAgentChecker(user_agent) for user_agent in user_agents]
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del checkers
+    return size / len(user_agents)
+
+
+def run(size=5000):
+    user_agents = weighted_sample(size)
+    cache = VerdictCache()
+    return {
+        "user_agent_checker_instance_bytes": measure_instance_size(user_agents),
+        "user_agent_checker_us": measure(
+            lambda ua: UserAgentChecker(ua).do_not_send_same_site_policy, user_agents
+        ),
+        "classifier_us": measure(get_do_not_send_same_site_policy, user_agents),
+        "cached_classifier_us": measure(
+            lambda ua: cache.get_or_set(ua, get_do_not_send_same_site_policy),
+            user_agents,
+        ),
+        "classify_many_us": measure_batch(UserAgentChecker.classify_many, user_agents),
+        "classify_many_chunked_us": measure_batch(
+            lambda uas: list(UserAgentChecker.classify_many(uas, chunk_size=1000)),
+            user_agents,
+        ),
+    }
+
+
+def main():
+    for name, value in run().items():
+        unit = "us" if name.endswith("_us") else "B"
+        print("{:<35} {:8.2f}{}".format(name, value, unit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+End-to-end throughput of a Django stack served in-process through its WSGI handler by
+concurrent threads, with and without CookiesSameSite in MIDDLEWARE.
+
+The requests go through the sessions and CSRF middleware to the views of tests/views.py,
+which set 0, 1 or 4 cookies (the session, CSRF and two custom ones), with a mix of popular
+User-Agents (mostly hits of the verdict cache) or only distinct ones (every one is parsed).
+
+    python -m benchmarks.bench_wsgi
+"""
+import io
+import os
+import threading
+import time
+
+from wsgiref.util import setup_testing_defaults
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.settings")
+django.setup()
+
+from django.core.handlers.wsgi import WSGIHandler  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+from benchmarks.corpus import weighted_sample  # noqa: E402
+from django_cookies_samesite.cache import clear_verdict_cache  # noqa: E402
+
+SAMESITE_MIDDLEWARE = "django_cookies_samesite.middleware.CookiesSameSite"
+STACK = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+]
+SETTINGS = {
+    # The sessions are stored in the signed cookies, so the threads don't need a database.
+    "SESSION_ENGINE": "django.contrib.sessions.backends.signed_cookies",
+    "SESSION_COOKIE_SAMESITE": "Lax",
+    "SESSION_COOKIE_SAMESITE_FORCE_ALL": True,
+}
+# The number of cookies set by the response: the view setting them.
+VIEWS = {
+    0: "/no-cookies-test/",
+    1: "/custom-cookie-test/",
+    4: "/cookies-test/",
+}
+
+
+def get_user_agent_mixes(size):
+    popular = weighted_sample(size)
+    return {
+        "popular": popular,
+        "distinct": [
+            "{} Bench/{}".format(user_agent, index)
+            for index, user_agent in enumerate(popular)
+        ],
+    }
+
+
+def make_environ(path, user_agent):
+    environ = {
+        "PATH_INFO": path,
+        "HTTP_USER_AGENT": user_agent,
+        "wsgi.input": io.BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    return environ
+
+
+def start_response(status, headers, exc_info=None):
+    return lambda data: None
+
+
+def serve(application, environ):
+    response = application(environ, start_response)
+    try:
+        for _ in response:
+            pass
+    finally:
+        response.close()
+
+
+def summarize(timings, elapsed, cpu_time):
+    timings = sorted(timings)
+    return {
+        "requests_per_second": len(timings) / elapsed,
+        "cpu_us": cpu_time / len(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6,
+    }
+
+
+def measure(application, environs, threads):
+    """Serve the requests from `threads` threads, every request gets its own environ."""
+    environs = [dict(environ) for environ in environs]
+    timings = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        barrier.wait()
+        for environ in environs[index::threads]:
+            start = time.perf_counter()
+            serve(application, environ)
+            timings[index].append(time.perf_counter() - start)
+
+    workers = [
+        threading.Thread(target=worker, args=(index,)) for index in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start, cpu_start = time.perf_counter(), time.process_time()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    cpu_time = time.process_time() - cpu_start
+    return summarize(
+        [timing for thread in timings for timing in thread], elapsed, cpu_time
+    )
+
+
+def run(requests=2000, threads=8, repeat=3):
+    """
+    The best of `repeat` runs of every configuration, the runs with and without
+    the middleware are interleaved so they share the same conditions.
+
+    The overhead is the difference of the CPU time per request, the CPU time of the process
+    (all its threads) divided by the number of requests. The threads share the GIL, so it's
+    more stable than the difference of the latencies, which include the waits for it.
+    """
+    results = {}
+    for mix, user_agents in get_user_agent_mixes(requests).items():
+        for cookies, path in sorted(VIEWS.items()):
+            environs = [make_environ(path, user_agent) for user_agent in user_agents]
+            stats = {}
+            for _ in range(repeat):
+                for name, middleware in (
+                    ("without", STACK),
+                    ("with", [SAMESITE_MIDDLEWARE] + STACK),
+                ):
+                    with override_settings(MIDDLEWARE=middleware, **SETTINGS):
+                        application = WSGIHandler()
+                        clear_verdict_cache()
+                        # Let the first requests load the views and the settings.
+                        measure(
+                            application,
+                            [make_environ(path, "warm-up")] * threads,
+                            threads,
+                        )
+                        run_stats = measure(application, environs, threads)
+                    best = stats.get(name)
+                    if (
+                        best is None
+                        or run_stats["requests_per_second"]
+                        > best["requests_per_second"]
+                    ):
+                        stats[name] = run_stats
+            stats["overhead_us"] = stats["with"]["cpu_us"] - stats["without"]["cpu_us"]
+            results["{}_{}_cookies".format(mix, cookies)] = stats
+    return results
+
+
+def main():
+    row = "{:<20}" + "{:>12}" * 6 + "{:>16}"
+    print(
+        row.format(
+            "",
+            "req/s",
+            "with",
+            "p50 us",
+            "with",
+            "p99 us",
+            "with",
+            "CPU overhead us",
+        )
+    )
+    for name, stats in sorted(run().items()):
+        without, with_samesite = stats["without"], stats["with"]
+        print(
+            row.format(
+                name,
+                *[
+                    "{:.1f}".format(value)
+                    for value in (
+                        without["requests_per_second"],
+                        with_samesite["requests_per_second"],
+                        without["p50_us"],
+                        with_samesite["p50_us"],
+                        without["p99_us"],
+                        with_samesite["p99_us"],
+                        stats["overhead_us"],
+                    )
+                ]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
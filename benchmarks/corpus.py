@@ -0,0 +1,24 @@
+import io
+import os
+import random
+
+USER_AGENTS_PATH = os.path.join(os.path.dirname(__file__), "user_agents.txt")
+
+
+def load_weighted_user_agents(path=USER_AGENTS_PATH):
+    """Return (weight, user agent) pairs from a tab separated corpus file."""
+    user_agents = []
+    with io.open(path, encoding="utf-8") as corpus:
+        for line in corpus:
+            line = line.rstrip("\n")
+            if not line or line.startswith("#"):
+                continue
+            weight, user_agent = line.split("\t", 1)
+            user_agents.append((int(weight), user_agent))
+    return user_agents
+
+
+def weighted_sample(size, path=USER_AGENTS_PATH, seed=0):
+    """Draw a reproducible sample of User-Agents which follows their popularity."""
+    weights, user_agents = zip(*load_weighted_user_agents(path))
+    return random.Random(seed).choices(user_agents, weights=weights, k=size)
@@ -0,0 +1,27 @@
+from django.apps import AppConfig
+
+from django_cookies_samesite.policy import get_config_setting
+
+
+class CookiesSameSiteConfig(AppConfig):
+    name = "django_cookies_samesite"
+    verbose_name = "Cookies SameSite"
+
+    def ready(self):
+        # DCS_UA_CACHE_WARMUP = True warms up with the bundled corpus, a path or a list
+        # of paths with a custom one.
+        corpus = get_config_setting("UA_CACHE_WARMUP")
+        if corpus:
+            from django_cookies_samesite.warmup import warm_up
+
+            if corpus is True:
+                corpus = None
+            elif isinstance(corpus, str):
+                corpus = [corpus]
+            warm_up(corpus)
+
+        # DCS_PROMETHEUS_METRICS = True counts the responses for the metrics view.
+        if get_config_setting("PROMETHEUS_METRICS"):
+            from django_cookies_samesite.prometheus import setup_metrics
+
+            setup_metrics()
@@ -0,0 +1,85 @@
+import asyncio
+
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:  # asgiref < 3.6
+    iscoroutinefunction = asyncio.iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = asyncio.coroutines._is_coroutine
+        return func
+
+
+try:
+    from asgiref.sync import sync_to_async
+except ImportError:  # Django < 3.0 has no async middleware chain.
+    sync_to_async = None
+
+from django_cookies_samesite.cache import make_cache_key, verdict_cache
+from django_cookies_samesite.signals import response_processed
+from django_cookies_samesite.verdicts import CLIENT_HINTS_PATH, SameSiteCompatibility
+
+
+class AsyncMiddlewareMixin(object):
+    """
+    Lets CookiesSameSite run natively in an async middleware chain (ASGI).
+
+    Rewriting the cookies only touches memory, so it runs on the event loop without
+    a thread hop. What may block runs in a thread with sync_to_async: the classification
+    of a User-Agent missing from the in-process cache (the verdict table, the shared cache,
+    the snapshot saves and the parse), and the whole process_response while it's profiled
+    or the response_processed receivers are connected.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def _async_check(self):
+        """Mark the middleware as a coroutine function if the next handler is async."""
+        self._is_async = iscoroutinefunction(self.get_response)
+        if self._is_async:
+            markcoroutinefunction(self)
+
+    async def __acall__(self, request):
+        # process_request only attaches the lazy request.samesite_compatibility.
+        self.process_request(request)
+        response = await self.get_response(request)
+        return await self.aprocess_response(request, response)
+
+    async def aprocess_response(self, request, response):
+        """process_response for the async middleware chain."""
+        policy = self.policy
+        if policy.profiler is not None or response_processed.receivers:
+            return await sync_to_async(self.process_response, thread_sensitive=True)(
+                request, response
+            )
+        if not policy.enabled:
+            return response
+
+        cookies = self.get_cookies_to_update(policy, response)
+        if not cookies:
+            return response
+
+        compatibility = getattr(request, "_samesite_compatibility", None)
+        if compatibility is None:
+            compatibility = self.set_request_compatibility(
+                request, await self.aget_compatibility(request)
+            )
+        if not compatibility.rule:
+            self.update_cookies(policy, cookies, request, response)
+        return response
+
+    async def aget_compatibility(self, request):
+        """get_compatibility, classifying a User-Agent missing from the in-process cache in a thread."""
+        rule = self.classify_client_hints(request)
+        if rule is not None:
+            return SameSiteCompatibility(rule, CLIENT_HINTS_PATH)
+        http_user_agent = self.get_user_agent(request)
+        cache_key = make_cache_key(http_user_agent)
+        rule = verdict_cache.get(cache_key)
+        if rule is None:
+            rule = await sync_to_async(self.classify_user_agent, thread_sensitive=True)(
+                http_user_agent
+            )
+            verdict_cache.set(cache_key, rule)
+        return SameSiteCompatibility(rule)
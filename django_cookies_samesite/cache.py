@@ -0,0 +1,206 @@
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from django_cookies_samesite import __version__
+from django_cookies_samesite.verdict_table import hash_user_agent
+
+DEFAULT_UA_CACHE_SIZE = 4096
+DEFAULT_UA_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class VerdictCache(object):
+    """
+    Bounded LRU cache of SameSite verdicts keyed by the fixed-size hash of the canonical User-Agent
+    (see make_cache_key).
+
+    Only the final verdict (the incompatibility rule from django_cookies_samesite.verdicts,
+    0 if the SameSite policy can be sent) is stored, never the parsed User-Agent, so every
+    entry stays small. A size of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=DEFAULT_UA_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.maxsize = maxsize
+        self.rules_fingerprint = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                verdict = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = verdict
+            self.hits += 1
+            return verdict
+
+    def set(self, key, verdict):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = verdict
+            self._evict()
+
+    def items(self):
+        """Return the (key, verdict) pairs, the least recently used first."""
+        with self._lock:
+            return list(self._data.items())
+
+    def get_or_set(self, key, compute):
+        """Return the cached verdict for `key`, computing and storing it on a miss."""
+        verdict = self.get(key)
+        if verdict is None:
+            verdict = compute(key)
+            self.set(key, verdict)
+        return verdict
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def use_rules(self, rules_fingerprint):
+        """Clear the cache if its verdicts were made by other rules than the given ones."""
+        with self._lock:
+            if self.rules_fingerprint != rules_fingerprint:
+                self._data.clear()
+                self.rules_fingerprint = rules_fingerprint
+
+    def clear(self):
+        """Drop all the cached verdicts and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+    def _evict(self):
+        while len(self._data) > max(self.maxsize, 0):
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+class SharedVerdictCache(object):
+    """
+    Second level cache of SameSite verdicts stored in one of the Django caches.
+
+    It's shared by all the worker processes, so a User-Agent parsed by one of them doesn't
+    have to be parsed again by the others. The entries expire after `timeout` seconds
+    and the keys include the package version and the fingerprint of the custom rules,
+    so changes of the detection rules propagate.
+    """
+
+    key_prefix = "dcs-verdict:{}:".format(__version__)
+
+    def __init__(self, alias, timeout=DEFAULT_UA_CACHE_TIMEOUT, rules_fingerprint=None):
+        self.alias = alias
+        self.timeout = timeout
+        if rules_fingerprint:
+            self.key_prefix = "{}{}:".format(self.key_prefix, rules_fingerprint)
+
+    @property
+    def cache(self):
+        from django.core.cache import caches
+
+        return caches[self.alias]
+
+    def make_key(self, user_agent):
+        return self.key_prefix + hashlib.sha1(user_agent.encode("utf-8")).hexdigest()
+
+    def get(self, user_agent):
+        return self.cache.get(self.make_key(user_agent))
+
+    def set(self, user_agent, verdict):
+        self.cache.set(self.make_key(user_agent), int(verdict), self.timeout)
+
+    def get_many(self, user_agents):
+        """Return a dict with the verdicts of the User-Agents found in the cache."""
+        keys = {self.make_key(user_agent): user_agent for user_agent in user_agents}
+        return {
+            keys[key]: verdict
+            for key, verdict in self.cache.get_many(list(keys)).items()
+        }
+
+    def set_many(self, verdicts):
+        self.cache.set_many(
+            {
+                self.make_key(user_agent): int(verdict)
+                for user_agent, verdict in verdicts.items()
+            },
+            self.timeout,
+        )
+
+    def get_or_set(self, user_agent, compute):
+        verdict = self.get(user_agent)
+        if verdict is None:
+            verdict = compute(user_agent)
+            self.set(user_agent, verdict)
+        return verdict
+
+
+verdict_cache = VerdictCache()
+
+
+def make_cache_key(user_agent):
+    """
+    Key of the User-Agent in the verdict cache, its 64-bit hash like in the verdict tables.
+
+    A long User-Agent doesn't make a long key, every entry of the cache takes the same memory.
+    """
+    return hash_user_agent(user_agent)
+
+
+def warm_verdict_cache(user_agents, compute, shared_cache=None):
+    """
+    Fill the verdict cache for many User-Agents at once.
+
+    The shared cache is read and written with a single batch each, only the User-Agents
+    missing from both caches are computed. Return a dict with the verdict of every User-Agent.
+    """
+    verdicts = {}
+    missing = []
+    for user_agent in set(user_agents):
+        verdict = verdict_cache.get(make_cache_key(user_agent))
+        if verdict is None:
+            missing.append(user_agent)
+        else:
+            verdicts[user_agent] = verdict
+
+    shared_verdicts = shared_cache.get_many(missing) if shared_cache and missing else {}
+    computed = {
+        user_agent: compute(user_agent)
+        for user_agent in missing
+        if user_agent not in shared_verdicts
+    }
+    if shared_cache and computed:
+        shared_cache.set_many(computed)
+
+    for user_agent, verdict in list(shared_verdicts.items()) + list(computed.items()):
+        verdict_cache.set(make_cache_key(user_agent), verdict)
+        verdicts[user_agent] = verdict
+    return verdicts
+
+
+def clear_verdict_cache():
+    """Clear the process-wide verdict cache e.g. after the detection rules have changed."""
+    verdict_cache.clear()
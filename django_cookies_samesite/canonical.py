@@ -0,0 +1,38 @@
+import re
+
+from collections import namedtuple
+
+DEFAULT_UA_MAX_LENGTH = 512
+
+# Tokens which never change the browser and OS families and versions the rules compare:
+# the Android build ids and the version parts after the third one (the build numbers).
+BUILD_ID = re.compile(r" Build/[^;)]*")
+BUILD_NUMBER = re.compile(r"(\d+\.\d+\.\d+)(?:\.\d+)+")
+
+
+class UserAgentCanonicalizer(
+    namedtuple("UserAgentCanonicalizer", ["max_length", "strip_tokens"])
+):
+    """
+    Reduces the User-Agent to the part the verdict depends on, before it's classified.
+
+    The User-Agent is cut to `max_length` characters, so a long one can't make the parse
+    arbitrarily slow, and the runs of whitespace are collapsed to a single space. With `strip_tokens`
+    the Android build ids are dropped and the build numbers are replaced by 0, e.g. Chrome/80.0.3987.149
+    becomes Chrome/80.0.3987.0, so the builds of the same browser share a single cached verdict.
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, max_length=DEFAULT_UA_MAX_LENGTH, strip_tokens=False):
+        return super(UserAgentCanonicalizer, cls).__new__(cls, max_length, strip_tokens)
+
+    def __call__(self, user_agent):
+        max_length = self.max_length
+        user_agent = " ".join(user_agent[:max_length].split())
+        if self.strip_tokens:
+            user_agent = BUILD_NUMBER.sub(r"\1.0", BUILD_ID.sub("", user_agent))
+        return user_agent
+
+
+default_canonicalizer = UserAgentCanonicalizer()
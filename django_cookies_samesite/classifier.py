@@ -0,0 +1,159 @@
+import re
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.user_agent_checker import UserAgentChecker
+
+# A single scan over the User-Agent which picks up every token that can make UserAgentChecker
+# withhold the SameSite policy. The order of alternatives matters: the most specific tokens
+# are listed before the generic ones which only mark the User-Agent as ambiguous.
+FAST_PATH_TOKENS = re.compile(
+    r"(?P<chrome>Chrom(?:e|ium)/(?P<chrome_major>\d+)\.)"
+    r"|(?P<ios_version>(?:iPhone|CPU) OS (?P<ios_major>\d+)_)"
+    r"|(?P<ios>iP(?:hone|ad|od)|iOS|CPU|CFNetwork|Darwin)"
+    r"|(?P<mac_osx_version>Mac OS X (?P<mac_osx_major>\d+)[_.](?P<mac_osx_minor>\d+))"
+    r"|(?P<mac_osx>Mac OS X)"
+    r"|(?P<safari_version>Version/\d)"
+    r"|(?P<safari>Safari/)"
+    r"|(?P<ambiguous>[Cc]hrom|CriOS|Browser|UCWEB|U3|Safari|Windows Phone)"
+)
+
+# The products a plain Safari User-Agent is made of. ua_parser can report another browser
+# for any other one, e.g. Epiphany/605.1.15 or Edg/18 after Safari/605.1.15.
+SAFARI_PRODUCTS = frozenset(["Mozilla", "AppleWebKit", "Version", "Safari"])
+COMMENT = re.compile(r"\([^)]*\)")
+PRODUCT = re.compile(r"([^\s/]+)/")
+
+
+class FastPathStats(object):
+    """Counts how many User-Agents were classified without the full ua_parser run."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return float(self.hits) / total if total else 0.0
+
+    def reset(self):
+        self.hits = self.misses = 0
+
+
+fast_path_stats = FastPathStats()
+
+
+def preclassify(user_agent_string):
+    """
+    Return the verdict of UserAgentChecker.do_not_send_same_site_policy for the clear-cut
+    User-Agents or None if the User-Agent has to be fully parsed.
+    """
+    rule = preclassify_rule(user_agent_string)
+    return None if rule is None else bool(rule)
+
+
+def preclassify_rule(user_agent_string):
+    """Like preclassify, but return the incompatibility rule from django_cookies_samesite.verdicts."""
+    kinds = set()
+    chrome_majors = set()
+    ios_majors = set()
+    mac_osx_versions = set()
+    for match in FAST_PATH_TOKENS.finditer(user_agent_string):
+        kind = match.lastgroup
+        if kind == "ambiguous":
+            return None
+        elif kind == "chrome":
+            chrome_majors.add(int(match.group("chrome_major")))
+        elif kind == "ios_version":
+            ios_majors.add(int(match.group("ios_major")))
+        elif kind == "mac_osx_version":
+            mac_osx_versions.add(
+                (int(match.group("mac_osx_major")), int(match.group("mac_osx_minor")))
+            )
+        kinds.add(kind)
+
+    if ios_majors:
+        # Every browser on iOS other than 12 handles the policy, iOS 12 is broken unless
+        # it's a Chrome or UC Browser which needs the full check.
+        if len(ios_majors) > 1:
+            return None
+        if UserAgentChecker.MIN_IOS_VERSION not in ios_majors:
+            return verdicts.COMPATIBLE
+        return None if "chrome" in kinds else verdicts.IOS_12
+
+    if "ios" in kinds:
+        return None
+
+    if chrome_majors:
+        buggy_chrome = any(
+            UserAgentChecker.BUGGY_CHROME_VERSION_MAJOR_MIN
+            <= major
+            <= UserAgentChecker.BUGGY_CHROME_VERSION_MAJOR_MAX
+            for major in chrome_majors
+        )
+        return None if buggy_chrome else verdicts.COMPATIBLE
+
+    if kinds & {"safari", "safari_version"}:
+        if len(mac_osx_versions) != 1:
+            return None
+        if mac_osx_versions != {
+            (
+                UserAgentChecker.MIN_MAC_OSX_VERSION_MAJOR,
+                UserAgentChecker.MIN_MAC_OSX_VERSION_MINOR,
+            )
+        }:
+            return verdicts.COMPATIBLE
+        if {"safari", "safari_version"} <= kinds and has_only_safari_products(
+            user_agent_string
+        ):
+            return verdicts.MACOS_10_14_SAFARI
+        return None
+
+    return verdicts.COMPATIBLE
+
+
+def has_only_safari_products(user_agent_string):
+    """Check if the User-Agent names no other products than Safari does, outside of the comments."""
+    products = PRODUCT.findall(COMMENT.sub("", user_agent_string))
+    return SAFARI_PRODUCTS.issuperset(products)
+
+
+def get_incompatibility_rule(user_agent_string, rule_engine=None, parser=None):
+    """
+    Return the rule from django_cookies_samesite.verdicts which makes the client incompatible
+    with the SameSite policy, running the full ua_parser cascade only for ambiguous strings.
+
+    The fast path knows only the default rules and ua_parser, it's skipped when custom rules
+    or another parser backend are given.
+    """
+    if rule_engine is not None or parser is not None:
+        return UserAgentChecker(
+            user_agent_string, rule_engine, parser
+        ).incompatibility_rule
+    rule = preclassify_rule(user_agent_string)
+    if rule is None:
+        fast_path_stats.misses += 1
+        return UserAgentChecker(user_agent_string).incompatibility_rule
+    fast_path_stats.hits += 1
+    return rule
+
+
+def get_do_not_send_same_site_policy(user_agent_string):
+    """Classify the User-Agent, running the full ua_parser cascade only for ambiguous strings."""
+    return bool(get_incompatibility_rule(user_agent_string))
+
+
+def get_client_hints_rule(
+    sec_ch_ua,
+    sec_ch_ua_platform=None,
+    sec_ch_ua_platform_version=None,
+    rule_engine=None,
+):
+    """
+    Return the incompatibility rule for the client described by its Sec-CH-UA headers,
+    without parsing the User-Agent. None means the headers aren't enough to classify it.
+    """
+    checker = UserAgentChecker.from_client_hints(
+        sec_ch_ua, sec_ch_ua_platform, sec_ch_ua_platform_version, rule_engine
+    )
+    return None if checker is None else checker.incompatibility_rule
@@ -0,0 +1,56 @@
+import re
+
+# Refer (https://wicg.github.io/ua-client-hints/)
+BRAND_RE = re.compile(r'"([^"]*)"\s*;\s*v\s*=\s*"([^"]*)"')
+GREASE_BRAND_RE = re.compile(r"not.?a.?brand", re.IGNORECASE)
+
+CHROMIUM = "Chromium"
+
+# Brands reported under different family names by ua_parser.
+BROWSER_FAMILIES = {
+    "Google Chrome": "Chrome",
+    "Microsoft Edge": "Edge",
+    "Yandex": "Yandex Browser",
+}
+OS_FAMILIES = {
+    "macOS": "Mac OS X",
+    "Chromium OS": "Chrome OS",
+}
+
+
+def parse_brands(sec_ch_ua):
+    """Return the (brand, version) pairs from the Sec-CH-UA header, skipping the GREASE brands."""
+    return [
+        (brand, version)
+        for brand, version in BRAND_RE.findall(sec_ch_ua)
+        if not GREASE_BRAND_RE.search(brand)
+    ]
+
+
+def get_browser(sec_ch_ua):
+    """
+    Return the browser from the Sec-CH-UA header in the ua_parser format.
+
+    The specific brand (e.g. Google Chrome or Microsoft Edge) is preferred over Chromium,
+    None means the header doesn't describe a known browser and the User-Agent has to be parsed.
+    """
+    brands = parse_brands(sec_ch_ua)
+    if not brands:
+        return None
+    brand, version = next(
+        ((brand, version) for brand, version in brands if brand != CHROMIUM),
+        brands[0],
+    )
+    return {"family": BROWSER_FAMILIES.get(brand, brand), "major": version}
+
+
+def get_os(sec_ch_ua_platform, sec_ch_ua_platform_version=None):
+    """Return the OS from the Sec-CH-UA-Platform(-Version) headers in the ua_parser format."""
+    platform = (sec_ch_ua_platform or "").strip().strip('"')
+    version = (sec_ch_ua_platform_version or "").strip().strip('"').split(".")
+    return {
+        "family": OS_FAMILIES.get(platform, platform) or "Other",
+        "major": version[0] or None,
+        "minor": version[1] if len(version) > 1 else None,
+        "patch": version[2] if len(version) > 2 else None,
+    }
@@ -0,0 +1,34 @@
+# Cookie library has moved to http in python3
+try:
+    import Cookie
+except ImportError:
+    import http.cookies as Cookie
+
+
+class SameSiteMorsel(Cookie.Morsel):
+    """
+    Morsel which knows how to render the SameSite attribute.
+
+    Python < 3.8 doesn't support SameSite in cookies, a subclass keeps that knowledge local
+    to the rewritten cookies instead of patching Cookie.Morsel for the whole process.
+    """
+
+    _reserved = dict(Cookie.Morsel._reserved, samesite="SameSite", secure="Secure")
+
+
+def get_cookie_attributes(samesite_flag, devmode):
+    """
+    Precompute the cookie attributes, indexed by request.is_secure().
+
+    SAMESITE_DEVMODE=True means, use Lax if http request.
+    """
+    return (
+        (("samesite", "Lax" if devmode else samesite_flag),),
+        (("samesite", samesite_flag), ("secure", True)),
+    )
+
+
+def set_cookie_attributes(morsel, attributes):
+    """Apply the precomputed attributes to a morsel without the per-key validation of Morsel."""
+    morsel.__class__ = SameSiteMorsel
+    dict.update(morsel, attributes)
@@ -0,0 +1,98 @@
+import threading
+
+from collections import Counter
+
+from django_cookies_samesite.signals import response_processed
+
+# Stages of process_response timed for the response_processed receivers.
+STAGES = ("client_hints", "normalize", "cache_lookup", "classify", "rewrite")
+
+# Reasons why the cookies of a response weren't rewritten.
+SKIPPED_DISABLED = "disabled"
+SKIPPED_NO_COOKIES = "no_cookies"
+SKIPPED_INCOMPATIBLE = "incompatible"
+
+
+class ResponseMetrics(object):
+    """
+    What the middleware did with a single response.
+
+    `timings` maps the stages which were run to their duration in seconds, `rule` is the
+    incompatibility rule of the client or None if it wasn't classified, `path` tells whether
+    it was classified from the client hints or from the User-Agent. `cache_hit` is None when
+    the verdict cache wasn't looked up, or when the client was classified before a receiver was connected.
+    """
+
+    __slots__ = ("timings", "cookies_rewritten", "skipped", "rule", "path", "cache_hit")
+
+    def __init__(self):
+        self.timings = {}
+        self.cookies_rewritten = 0
+        self.skipped = None
+        self.rule = None
+        self.path = None
+        self.cache_hit = None
+
+
+class MetricsCollector(object):
+    """
+    Aggregates the metrics of all the responses, e.g. to export them to a monitoring system.
+
+    The middleware is instrumented only while a receiver is connected to response_processed,
+    so the collector costs nothing until connect() is called.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def connect(self):
+        response_processed.connect(self.receive, dispatch_uid=id(self))
+
+    def disconnect(self):
+        response_processed.disconnect(dispatch_uid=id(self))
+
+    def reset(self):
+        with self._lock:
+            self.responses = 0
+            self.cookies_rewritten = 0
+            self.skipped = Counter()
+            self.rules = Counter()
+            self.paths = Counter()
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self.stage_seconds = Counter()
+            self.stage_calls = Counter()
+
+    def receive(self, sender, metrics, **kwargs):
+        with self._lock:
+            self.responses += 1
+            self.cookies_rewritten += metrics.cookies_rewritten
+            if metrics.skipped is not None:
+                self.skipped[metrics.skipped] += 1
+            if metrics.rule is not None:
+                self.rules[metrics.rule] += 1
+            if metrics.path is not None:
+                self.paths[metrics.path] += 1
+            if metrics.cache_hit is not None:
+                if metrics.cache_hit:
+                    self.cache_hits += 1
+                else:
+                    self.cache_misses += 1
+            for stage, seconds in metrics.timings.items():
+                self.stage_seconds[stage] += seconds
+                self.stage_calls[stage] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "responses": self.responses,
+                "cookies_rewritten": self.cookies_rewritten,
+                "skipped": dict(self.skipped),
+                "rules": dict(self.rules),
+                "paths": dict(self.paths),
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "stage_seconds": dict(self.stage_seconds),
+                "stage_calls": dict(self.stage_calls),
+            }
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django_cookies_samesite.classifier import get_incompatibility_rule
+from django_cookies_samesite.policy import (
+    get_config_setting,
+    load_canonicalizer,
+    load_parser,
+    load_rule_engine,
+)
+from django_cookies_samesite.snapshot import get_snapshot_version
+from django_cookies_samesite.verdict_table import write_verdict_table
+from django_cookies_samesite.warmup import read_user_agents
+
+
+class Command(BaseCommand):
+    help = (
+        "Classify the User-Agents from the corpus files and write them into a verdict table "
+        "loaded by the middleware from DCS_VERDICT_TABLE_PATH."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "corpus", nargs="+", help="files with one User-Agent per line"
+        )
+        parser.add_argument(
+            "--output",
+            default=get_config_setting("VERDICT_TABLE_PATH"),
+            help="where to write the table (default: DCS_VERDICT_TABLE_PATH)",
+        )
+
+    def handle(self, *args, **options):
+        if not options["output"]:
+            raise CommandError("Set DCS_VERDICT_TABLE_PATH or pass --output.")
+
+        rule_engine = load_rule_engine()
+        parser_backend = load_parser()
+        # The middleware looks up the canonical User-Agents.
+        canonicalizer = load_canonicalizer()
+        try:
+            verdicts = {}
+            for user_agent in read_user_agents(options["corpus"]):
+                user_agent = canonicalizer(user_agent)
+                if user_agent not in verdicts:
+                    verdicts[user_agent] = get_incompatibility_rule(
+                        user_agent, rule_engine, parser_backend
+                    )
+        except (IOError, OSError) as exc:
+            raise CommandError(exc)
+
+        # The middleware accepts only a table made by the rules and the parser it uses.
+        size = write_verdict_table(
+            options["output"],
+            get_snapshot_version(rule_engine, parser_backend),
+            verdicts.items(),
+        )
+        self.stdout.write(
+            "Wrote {} verdicts ({} incompatible) to {}".format(
+                size, sum(1 for rule in verdicts.values() if rule), options["output"]
+            )
+        )
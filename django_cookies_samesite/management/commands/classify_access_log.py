@@ -0,0 +1,212 @@
+import gzip
+import io
+import multiprocessing
+
+from collections import Counter, deque
+
+from django.core.management.base import BaseCommand, CommandError
+
+from django_cookies_samesite.classifier import get_incompatibility_rule
+from django_cookies_samesite.policy import (
+    load_canonicalizer,
+    load_parser,
+    load_rule_engine,
+)
+from django_cookies_samesite.snapshot import get_snapshot_version
+from django_cookies_samesite.verdict_table import hash_user_agent, write_verdict_records
+from django_cookies_samesite.verdicts import COMPATIBLE, VERDICT_NAMES
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def open_log(path):
+    """Open the log as a binary stream, gzipped logs are decompressed on the fly."""
+    with io.open(path, "rb") as log_file:
+        is_gzipped = log_file.read(2) == GZIP_MAGIC
+    return gzip.open(path, "rb") if is_gzipped else io.open(path, "rb")
+
+
+def extract_user_agent(line):
+    """
+    Return the User-Agent from a line of the log.
+
+    The lines ending with a quote are treated as the combined log format, where the User-Agent
+    is the last quoted field, any other line is a User-Agent on its own. Like the middleware,
+    all non-ascii characters are dropped.
+    """
+    line = line.decode("ascii", "ignore").strip()
+    if line.endswith('"'):
+        line = line[:-1].rsplit('"', 1)[-1]
+    return "" if line == "-" else line
+
+
+def classify_user_agents(user_agents, rule_engine=None, parser=None):
+    """Return the (User-Agent hash, rule) pairs, it runs in the worker processes."""
+    return [
+        (
+            hash_user_agent(user_agent),
+            get_incompatibility_rule(user_agent, rule_engine, parser),
+        )
+        for user_agent in user_agents
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Report which part of the clients from the access logs (or files with one User-Agent "
+        "per line) doesn't support the SameSite policy, optionally write a verdict table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("logs", nargs="+", help="access logs, can be gzipped")
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=multiprocessing.cpu_count(),
+            help="number of worker processes (default: number of CPUs)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="number of User-Agents sent to a worker at once",
+        )
+        parser.add_argument(
+            "--verdict-table", help="write the verdicts into a table at this path"
+        )
+
+    def handle(self, *args, **options):
+        if options["jobs"] < 1 or options["chunk_size"] < 1:
+            raise CommandError("--jobs and --chunk-size should be positive.")
+
+        # Only the 64-bit hashes of the User-Agents are kept, so the memory depends
+        # on the number of distinct User-Agents, not on the size of the logs.
+        self.requests = Counter()
+        self.rules = {}
+        self.rule_engine = load_rule_engine()
+        self.parser_backend = load_parser()
+        self.canonicalizer = load_canonicalizer()
+        pool = multiprocessing.Pool(options["jobs"]) if options["jobs"] > 1 else None
+        try:
+            self.classify_logs(options["logs"], pool, options)
+        except (IOError, OSError) as exc:
+            raise CommandError(exc)
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        self.report()
+        if options["verdict_table"]:
+            size = write_verdict_records(
+                options["verdict_table"],
+                get_snapshot_version(self.rule_engine, self.parser_backend),
+                self.rules.items(),
+            )
+            self.stdout.write(
+                "Wrote {} verdicts to {}".format(size, options["verdict_table"])
+            )
+
+    def classify_logs(self, paths, pool, options):
+        pending = deque()
+        max_pending = 2 * options["jobs"]
+        chunk = []
+        for path in paths:
+            with open_log(path) as log:
+                for line in log:
+                    user_agent = self.canonicalizer(extract_user_agent(line))
+                    if not user_agent:
+                        continue
+                    user_agent_hash = hash_user_agent(user_agent)
+                    if user_agent_hash not in self.requests:
+                        chunk.append(user_agent)
+                    self.requests[user_agent_hash] += 1
+
+                    if len(chunk) >= options["chunk_size"]:
+                        pending.append(self.submit(pool, chunk))
+                        chunk = []
+                        # Keep a bounded number of chunks in flight.
+                        while len(pending) > max_pending:
+                            self.rules.update(pending.popleft().get())
+
+        if chunk:
+            pending.append(self.submit(pool, chunk))
+        while pending:
+            self.rules.update(pending.popleft().get())
+
+    def submit(self, pool, chunk):
+        if pool is None:
+            return _Result(
+                classify_user_agents(chunk, self.rule_engine, self.parser_backend)
+            )
+        return pool.apply_async(
+            classify_user_agents, (chunk, self.rule_engine, self.parser_backend)
+        )
+
+    def report(self):
+        total_requests = sum(self.requests.values())
+        total_user_agents = len(self.rules)
+        requests_by_rule = Counter()
+        user_agents_by_rule = Counter(self.rules.values())
+        for user_agent_hash, rule in self.rules.items():
+            requests_by_rule[rule] += self.requests[user_agent_hash]
+
+        incompatible_requests = total_requests - requests_by_rule[COMPATIBLE]
+        incompatible_user_agents = total_user_agents - user_agents_by_rule[COMPATIBLE]
+
+        self.stdout.write(
+            "{} requests, {} distinct User-Agents".format(
+                total_requests, total_user_agents
+            )
+        )
+        self.stdout.write("")
+        self.write_row("verdict", "requests", "%", "user agents", "%")
+        self.write_counts(
+            "send SameSite",
+            total_requests - incompatible_requests,
+            total_requests,
+            total_user_agents - incompatible_user_agents,
+            total_user_agents,
+        )
+        self.write_counts(
+            "withhold SameSite",
+            incompatible_requests,
+            total_requests,
+            incompatible_user_agents,
+            total_user_agents,
+        )
+        self.stdout.write("")
+        self.write_row("rule", "requests", "%", "user agents", "%")
+        for rule, name in sorted(VERDICT_NAMES.items()):
+            self.write_counts(
+                name,
+                requests_by_rule[rule],
+                total_requests,
+                user_agents_by_rule[rule],
+                total_user_agents,
+            )
+
+    def write_counts(
+        self, name, requests, total_requests, user_agents, total_user_agents
+    ):
+        self.write_row(
+            name,
+            requests,
+            "{:.2f}".format(100.0 * requests / total_requests if total_requests else 0),
+            user_agents,
+            "{:.2f}".format(
+                100.0 * user_agents / total_user_agents if total_user_agents else 0
+            ),
+        )
+
+    def write_row(self, *columns):
+        self.stdout.write("{:<24}{:>12}{:>8}{:>14}{:>8}".format(*columns))
+
+
+class _Result(object):
+    """Stands in for AsyncResult when the User-Agents are classified in the same process."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
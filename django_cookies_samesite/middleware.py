@@ -1,14 +1,9 @@
-# Cookie library has moved to http in python3
-try:
-    import Cookie
-except ImportError:
-    import http.cookies as Cookie
-
-import django
+import sys
 
-from distutils.version import LooseVersion
+from timeit import default_timer
 
-from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import setting_changed
 from django.utils.encoding import smart_str
 
 try:
@@ -16,23 +11,80 @@ try:
 except ImportError:
     MiddlewareMixin = object
 
-from django_cookies_samesite.user_agent_checker import UserAgentChecker
+from django_cookies_samesite.cache import make_cache_key, verdict_cache
+from django_cookies_samesite.classifier import (
+    get_client_hints_rule,
+    get_incompatibility_rule,
+)
+from django_cookies_samesite.cookies import set_cookie_attributes
+from django_cookies_samesite.instrumentation import (
+    SKIPPED_DISABLED,
+    SKIPPED_INCOMPATIBLE,
+    SKIPPED_NO_COOKIES,
+    ResponseMetrics,
+)
+from django_cookies_samesite.signals import response_processed
+from django_cookies_samesite.snapshot import save_at_exit
+from django_cookies_samesite.verdicts import (
+    CLIENT_HINTS_PATH,
+    USER_AGENT_PATH,
+    SameSiteCompatibility,
+)
+from django_cookies_samesite.policy import (  # noqa: F401
+    DJANGO_SUPPORTED_VERSION,
+    get_config_setting,
+    get_verdicts_fingerprint,
+    is_policy_setting,
+    load_policy,
+)
 
-Cookie.Morsel._reserved.update({"samesite": "SameSite", "secure": "Secure"})
+if sys.version_info >= (3, 5):
+    from django_cookies_samesite.async_support import AsyncMiddlewareMixin
+else:
 
-DJANGO_SUPPORTED_VERSION = "3.1.0"
+    class AsyncMiddlewareMixin(object):
+        sync_capable = True
+        async_capable = False
 
+        def _async_check(self):
+            self._is_async = False
 
-def get_config_setting(setting_name, default_value=None):
-    """Load the Django setting with DCS_ prefix and fallback to the legacy name if not found."""
-    return getattr(
-        settings,
-        "DCS_{}".format(setting_name),
-        getattr(settings, setting_name, default_value),
-    )
 
+def is_classified(request):
+    """Check if the client of the request was already classified, without classifying it."""
+    return hasattr(request, "_samesite_compatibility")
 
-class CookiesSameSite(MiddlewareMixin):
+
+class LazySameSiteCompatibility(object):
+    """
+    request.samesite_compatibility until the client is classified, which the first access
+    to one of the SameSiteCompatibility attributes does.
+    """
+
+    __slots__ = ("middleware", "request")
+
+    def __init__(self, middleware, request):
+        self.middleware = middleware
+        self.request = request
+
+    def __getattr__(self, name):
+        return getattr(self.middleware.get_request_compatibility(self.request), name)
+
+    def __eq__(self, other):
+        return self.middleware.get_request_compatibility(self.request) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        if is_classified(self.request):
+            return "<Lazy {!r}>".format(self.request._samesite_compatibility)
+        return "<LazySameSiteCompatibility: not classified>"
+
+
+class CookiesSameSite(AsyncMiddlewareMixin, MiddlewareMixin):
     """
     Support for SameSite attribute in Cookies is fully implemented in Django 3.1 and won't
     be back-ported to Django 3.0 or earlier.
@@ -41,79 +93,266 @@ class CookiesSameSite(MiddlewareMixin):
     """
 
     def __init__(self, *args, **kwargs):
-        self.protected_cookies = get_config_setting(
-            "SESSION_COOKIE_SAMESITE_KEYS", set()
+        self._policy = None
+        if self.policy.django_supports_samesite:
+            raise MiddlewareNotUsed(
+                "Your version of Django supports SameSite flag in the cookies mechanism. "
+                "You should remove django-cookies-samesite from your project."
+            )
+
+        setting_changed.connect(self.reset_policy)
+        super(CookiesSameSite, self).__init__(*args, **kwargs)
+        self._async_check()
+
+    def __call__(self, request):
+        if self._is_async:
+            return self.__acall__(request)
+        return super(CookiesSameSite, self).__call__(request)
+
+    @property
+    def policy(self):
+        """The compiled configuration, rebuilt lazily after the settings have changed."""
+        if self._policy is None:
+            policy = load_policy()
+            verdict_cache.resize(policy.ua_cache_size)
+            verdict_cache.use_rules(
+                get_verdicts_fingerprint(policy.rule_engine, policy.parser)
+            )
+            if policy.verdict_snapshot is not None:
+                policy.verdict_snapshot.load(verdict_cache)
+            save_at_exit(policy.verdict_snapshot, verdict_cache)
+            self._policy = policy
+        return self._policy
+
+    def reset_policy(self, setting, **kwargs):
+        if is_policy_setting(setting):
+            self._policy = None
+
+    @property
+    def samesite_flag(self):
+        return self.policy.samesite_flag
+
+    @property
+    def protected_cookies(self):
+        return self.policy.protected_cookies
+
+    @property
+    def samesite_force_all(self):
+        return self.policy.samesite_force_all
+
+    @property
+    def devmode(self):
+        return self.policy.devmode
+
+    def update_cookies(self, policy, cookies, request, response):
+        attributes = policy.cookie_attributes[request.is_secure()]
+        for cookie in cookies:
+            set_cookie_attributes(response.cookies[cookie], attributes)
+
+    def get_cookies_to_update(self, policy, response):
+        """Return the names of the cookies from the response which should get the SameSite flag."""
+        if policy.samesite_force_all:
+            return list(response.cookies)
+        return [
+            cookie for cookie in policy.protected_cookies if cookie in response.cookies
+        ]
+
+    def get_user_agent(self, request):
+        # Some of HTTP Clients have non-ascii characters in their User Agents. The most feasible solution to that
+        # problem is to ignore all non-ascii characters.
+        # Related: https://stackoverflow.com/questions/4400678/what-character-encoding-should-i-use-for-a-http-header
+        return self.policy.canonicalizer(
+            smart_str(
+                request.META.get("HTTP_USER_AGENT") or " ",
+                encoding="ascii",
+                errors="ignore",
+            )
         )
 
-        if not isinstance(self.protected_cookies, (list, set, tuple)):
-            raise ValueError(
-                "SESSION_COOKIE_SAMESITE_KEYS should be a list, set or tuple."
+    def get_client_hints(self, request):
+        """Return the Sec-CH-UA, Sec-CH-UA-Platform and Sec-CH-UA-Platform-Version headers."""
+        return tuple(
+            smart_str(request.META.get(header) or "", encoding="ascii", errors="ignore")
+            for header in (
+                "HTTP_SEC_CH_UA",
+                "HTTP_SEC_CH_UA_PLATFORM",
+                "HTTP_SEC_CH_UA_PLATFORM_VERSION",
             )
+        )
 
-        self.protected_cookies = set(self.protected_cookies)
-        if get_config_setting("SESSION_COOKIE_SAMESITE_FORCE_CORE", True):
-            self.protected_cookies |= {
-                settings.SESSION_COOKIE_NAME,
-                settings.CSRF_COOKIE_NAME,
-            }
+    def classify_client_hints(self, request):
+        """
+        Classify the client from its client hints, None if it didn't send them.
 
-        samesite_flag = get_config_setting("SESSION_COOKIE_SAMESITE", "")
-        self.samesite_flag = (
-            str(samesite_flag).capitalize() if samesite_flag is not None else ""
+        Parsing the hints is cheaper than a cache lookup, so they're not cached.
+        """
+        policy = self.policy
+        if not policy.use_client_hints or not request.META.get("HTTP_SEC_CH_UA"):
+            return None
+        return get_client_hints_rule(
+            *self.get_client_hints(request), rule_engine=policy.rule_engine
         )
-        self.samesite_force_all = get_config_setting(
-            "SESSION_COOKIE_SAMESITE_FORCE_ALL"
+
+    def get_compatibility(self, request):
+        rule = self.classify_client_hints(request)
+        if rule is not None:
+            return SameSiteCompatibility(rule, CLIENT_HINTS_PATH)
+        http_user_agent = self.get_user_agent(request)
+        rule = verdict_cache.get_or_set(
+            make_cache_key(http_user_agent),
+            lambda key: self.classify_user_agent(http_user_agent),
         )
-        # SAMESITE_DEVMODE=True means, use Lax if http request.
-        self.devmode = bool(get_config_setting("SAMESITE_DEVMODE"))
+        return SameSiteCompatibility(rule)
 
-        return super(CookiesSameSite, self).__init__(*args, **kwargs)
+    def get_request_compatibility(self, request):
+        """
+        Return the SameSiteCompatibility of the client, classified on the first call.
 
-    def update_cookie(self, cookie, request, response):
-        https = request.is_secure()
-        if self.devmode and not https:
-            flag = "Lax"
-        else:
-            flag = self.samesite_flag
-        response.cookies[cookie]["samesite"] = flag
-        if https:
-            response.cookies[cookie]["secure"] = True
+        It's kept in request._samesite_compatibility and replaces request.samesite_compatibility.
+        """
+        try:
+            return request._samesite_compatibility
+        except AttributeError:
+            return self.set_request_compatibility(
+                request, self.classify_request(request)
+            )
 
-    def process_response(self, request, response):
+    def set_request_compatibility(self, request, compatibility):
+        request._samesite_compatibility = request.samesite_compatibility = compatibility
+        return compatibility
+
+    def get_incompatibility_rule(self, request):
+        """Return the rule from django_cookies_samesite.verdicts matching the client, 0 if it's compatible."""
+        return self.get_request_compatibility(request).rule
+
+    def do_not_send_same_site_policy(self, request):
         # same-site = None introduced for Chrome 80 breaks for Chrome 51-66
         # Refer (https://www.chromium.org/updates/same-site/incompatible-clients)
-        # Some of HTTP Clients have non-ascii characters in their User Agents. The most feasible solution to that
-        # problem is to ignore all non-ascii characters.
-        # Related: https://stackoverflow.com/questions/4400678/what-character-encoding-should-i-use-for-a-http-header
-        http_user_agent = smart_str(
-            request.META.get("HTTP_USER_AGENT") or " ",
-            encoding="ascii",
-            errors="ignore",
+        return bool(self.get_incompatibility_rule(request))
+
+    def classify_user_agent(self, http_user_agent):
+        """Classify a User-Agent missing from the in-process cache."""
+        policy = self.policy
+        if policy.verdict_snapshot is not None:
+            policy.verdict_snapshot.start_saving(verdict_cache)
+        if policy.verdict_table is not None:
+            rule = policy.verdict_table.get(http_user_agent)
+            if rule is not None:
+                return rule
+
+        shared_verdict_cache = policy.shared_verdict_cache
+        if shared_verdict_cache is None:
+            return self.parse_user_agent(http_user_agent)
+        return shared_verdict_cache.get_or_set(http_user_agent, self.parse_user_agent)
+
+    def parse_user_agent(self, http_user_agent):
+        """Classify the User-Agent by parsing it."""
+        policy = self.policy
+        return get_incompatibility_rule(
+            http_user_agent, policy.rule_engine, policy.parser
         )
-        user_agent_checker = UserAgentChecker(http_user_agent)
 
-        if user_agent_checker.do_not_send_same_site_policy:
-            return response
+    def process_request(self, request):
+        # Classified at most once and only if the view or process_response asks for it.
+        request.samesite_compatibility = LazySameSiteCompatibility(self, request)
 
-        if LooseVersion(django.get_version()) >= LooseVersion(DJANGO_SUPPORTED_VERSION):
-            raise DeprecationWarning(
-                "Your version of Django supports SameSite flag in the cookies mechanism. "
-                "You should remove django-cookies-samesite from your project."
-            )
+    def classify_request(self, request):
+        """
+        Classify the client when its compatibility is first needed.
 
-        if not self.samesite_flag:
+        While the middleware is instrumented, the classification stages are timed here and
+        kept on the request until process_response reports them.
+        """
+        if not response_processed.receivers:
+            return self.get_compatibility(request)
+        metrics = request._samesite_classification_metrics = ResponseMetrics()
+        return self.collect_classification_metrics(request, metrics)
+
+    def process_response(self, request, response):
+        profiler = self.policy.profiler
+        if profiler is not None and profiler.is_sampled():
+            return profiler.runcall(self.update_response, request, response)
+        return self.update_response(request, response)
+
+    def update_response(self, request, response):
+        """Rewrite the cookies of the response, the work of process_response."""
+        if response_processed.receivers:
+            return self.process_response_instrumented(request, response)
+
+        policy = self.policy
+        if not policy.enabled:
             return response
 
-        # TODO: capitalize those values
-        if self.samesite_flag not in {"Lax", "None", "Strict"}:
-            raise ValueError('samesite must be "Lax", "None", or "Strict".')
+        # The User-Agent is classified only when there's at least one cookie to rewrite.
+        cookies = self.get_cookies_to_update(policy, response)
+        if not cookies or self.do_not_send_same_site_policy(request):
+            return response
 
-        if self.samesite_force_all:
-            for cookie in response.cookies:
-                self.update_cookie(cookie, request, response)
-        else:
-            for cookie in self.protected_cookies:
-                if cookie in response.cookies:
-                    self.update_cookie(cookie, request, response)
+        self.update_cookies(policy, cookies, request, response)
+        return response
 
+    def process_response_instrumented(self, request, response):
+        """Process the response like process_response, timing every stage for the response_processed receivers."""
+        metrics = ResponseMetrics()
+        self.collect_metrics(request, response, metrics)
+        response_processed.send(
+            sender=self.__class__, request=request, response=response, metrics=metrics
+        )
         return response
+
+    def collect_metrics(self, request, response, metrics):
+        policy = self.policy
+        if not policy.enabled:
+            metrics.skipped = SKIPPED_DISABLED
+            return
+
+        cookies = self.get_cookies_to_update(policy, response)
+        if not cookies:
+            metrics.skipped = SKIPPED_NO_COOKIES
+            return
+
+        if is_classified(request):
+            compatibility = request._samesite_compatibility
+            # Classified during the request, without the metrics if it wasn't instrumented then.
+            classification = getattr(request, "_samesite_classification_metrics", None)
+            if classification is not None:
+                metrics.timings.update(classification.timings)
+                metrics.cache_hit = classification.cache_hit
+            metrics.path = compatibility.path
+        else:
+            compatibility = self.set_request_compatibility(
+                request, self.collect_classification_metrics(request, metrics)
+            )
+
+        rule = metrics.rule = compatibility.rule
+        if rule:
+            metrics.skipped = SKIPPED_INCOMPATIBLE
+            return
+
+        started = default_timer()
+        self.update_cookies(policy, cookies, request, response)
+        metrics.timings["rewrite"] = default_timer() - started
+        metrics.cookies_rewritten = len(cookies)
+
+    def collect_classification_metrics(self, request, metrics):
+        started = default_timer()
+        rule = self.classify_client_hints(request)
+        if rule is not None:
+            metrics.timings["client_hints"] = default_timer() - started
+            metrics.path = CLIENT_HINTS_PATH
+            return SameSiteCompatibility(rule, CLIENT_HINTS_PATH)
+
+        metrics.path = USER_AGENT_PATH
+        http_user_agent = self.get_user_agent(request)
+        cache_key = make_cache_key(http_user_agent)
+        normalized = default_timer()
+        rule = verdict_cache.get(cache_key)
+        looked_up = default_timer()
+        metrics.timings["normalize"] = normalized - started
+        metrics.timings["cache_lookup"] = looked_up - normalized
+        metrics.cache_hit = rule is not None
+        if rule is None:
+            rule = self.classify_user_agent(http_user_agent)
+            verdict_cache.set(cache_key, rule)
+            metrics.timings["classify"] = default_timer() - looked_up
+        return SameSiteCompatibility(rule)
@@ -0,0 +1,258 @@
+import re
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    import sre_constants
+    import sre_parse
+
+OTHER = "Other"
+
+BRANCH = sre_constants.BRANCH
+IN = sre_constants.IN
+LITERAL = sre_constants.LITERAL
+MAX_REPEAT = sre_constants.MAX_REPEAT
+MIN_REPEAT = sre_constants.MIN_REPEAT
+SUBPATTERN = sre_constants.SUBPATTERN
+
+
+class ParserBackend(object):
+    """
+    Extracts from a User-Agent only the fields UserAgentChecker needs.
+
+    `parse` returns the browser and the OS as dicts in the ua_parser format, holding
+    "family", "major", "minor" and "patch" (the versions as strings, None if unknown).
+    A family the backend doesn't recognize is reported as "Other".
+
+    Backends are selected with the DCS_UA_PARSER_BACKEND setting, a third party backend
+    should pass django_cookies_samesite.testing.ParserBackendConformanceMixin.
+    """
+
+    # Changes whenever the backend can return different fields, the cached verdicts
+    # made by another version are discarded.
+    version = ""
+
+    @property
+    def fingerprint(self):
+        return "{}.{}:{}".format(
+            self.__class__.__module__, self.__class__.__name__, self.version
+        )
+
+    def parse(self, user_agent_string):
+        raise NotImplementedError
+
+
+class UAParserBackend(ParserBackend):
+    """The full ua_parser regex database, the default backend."""
+
+    # ua_parser compiles its whole regex database on import, so it's imported only
+    # when the first User-Agent has to be parsed, not when Django loads the middleware.
+
+    @property
+    def version(self):
+        import ua_parser
+
+        return ".".join(str(part) for part in ua_parser.VERSION)
+
+    def parse(self, user_agent_string):
+        from ua_parser import user_agent_parser
+
+        return (
+            user_agent_parser.ParseUserAgent(user_agent_string),
+            user_agent_parser.ParseOS(user_agent_string),
+        )
+
+
+class MinimalBackend(ParserBackend):
+    """
+    Returns the same fields as UAParserBackend without trying every ua_parser rule.
+
+    Every ua_parser rule can only match a User-Agent containing one of a few literal strings,
+    taken from its regex. A single scan of the User-Agent with one compiled alternation of all
+    these strings finds the rules which can match, only these are tried, in the ua_parser order.
+    The rules whose regex has no such strings are always tried.
+    """
+
+    def __init__(self):
+        self.indexes = None
+
+    @property
+    def version(self):
+        import ua_parser
+
+        return "4:" + ".".join(str(part) for part in ua_parser.VERSION)
+
+    def parse(self, user_agent_string):
+        if self.indexes is None:
+            from ua_parser import user_agent_parser
+
+            self.indexes = (
+                RuleIndex(user_agent_parser.USER_AGENT_PARSERS),
+                RuleIndex(user_agent_parser.OS_PARSERS),
+            )
+        browser_index, os_index = self.indexes
+        family, major, minor, patch = browser_index.parse(user_agent_string, 4)
+        os_family, os_major, os_minor, os_patch, os_patch_minor = os_index.parse(
+            user_agent_string, 5
+        )
+        # The empty versions are None in the browser, like in user_agent_parser.ParseUserAgent.
+        return (
+            {
+                "family": family or OTHER,
+                "major": major or None,
+                "minor": minor or None,
+                "patch": patch or None,
+            },
+            {
+                "family": os_family or OTHER,
+                "major": os_major,
+                "minor": os_minor,
+                "patch": os_patch,
+                "patch_minor": os_patch_minor,
+            },
+        )
+
+
+class RuleIndex(object):
+    """The ua_parser rules of a list, by the literal strings in the User-Agent they need."""
+
+    def __init__(self, rules):
+        self.rules = rules
+        required = [get_required_strings(rule.user_agent_re) for rule in rules]
+        literals = set()
+        for strings in required:
+            literals.update(strings or ())
+        always = set(index for index, strings in enumerate(required) if not strings)
+        # A found string also contains the shorter strings it starts with or includes.
+        self.rules_by_literal = {}
+        for literal in literals:
+            included = set(other for other in literals if other in literal)
+            self.rules_by_literal[literal] = always | set(
+                index
+                for index, strings in enumerate(required)
+                if strings and not strings.isdisjoint(included)
+            )
+        self.always = sorted(always)
+        # A lookahead finds the longest string starting at every position of the User-Agent.
+        self.scan = re.compile("(?=({}))".format(get_trie_pattern(literals)))
+
+    def parse(self, user_agent_string, size):
+        """The fields of the first rule returning a family, like ua_parser does."""
+        indexes = set(self.always)
+        for match in self.scan.finditer(user_agent_string):
+            indexes.update(self.rules_by_literal[match.group(1)])
+        for index in sorted(indexes):
+            fields = self.rules[index].Parse(user_agent_string)
+            if fields[0]:
+                return fields
+        return (None,) * size
+
+
+# The largest sets of strings kept for a part of a regex.
+MAX_STRINGS = 64
+
+
+def get_required_strings(regex):
+    """
+    A set of strings one of which occurs in every string the regex matches, the longest
+    ones found, or None if there are none.
+    """
+    if regex.flags & re.IGNORECASE:
+        return None
+    strings = get_required(sre_parse.parse(regex.pattern))
+    return frozenset(strings) if strings else None
+
+
+def get_required(items):
+    best = None
+    run = set([""])
+    for op, av in items:
+        strings = get_exact(op, av)
+        if strings is not None and len(run) * len(strings) <= MAX_STRINGS:
+            run = set(prefix + string for prefix in run for string in strings)
+            continue
+        best = get_longer(best, run)
+        run = set([""])
+        if strings is None:
+            if op == SUBPATTERN and not is_ignoring_case(av):
+                strings = get_required(av[-1])
+            elif op == BRANCH:
+                branches = [get_required(branch) for branch in av[1]]
+                if all(branches):
+                    strings = set().union(*branches)
+            elif op in (MAX_REPEAT, MIN_REPEAT) and av[0] >= 1:
+                strings = get_required(av[2])
+        best = get_longer(best, strings)
+    return get_longer(best, run)
+
+
+def get_exact(op, av):
+    """The strings the part of a regex matches, None if they aren't a small set."""
+    if op == LITERAL:
+        return set([chr(av)])
+    if op == IN:
+        if len(av) <= 4 and all(member_op == LITERAL for member_op, _ in av):
+            return set(chr(member) for _, member in av)
+    elif op == SUBPATTERN:
+        if not is_ignoring_case(av):
+            return get_exact_sequence(av[-1])
+    elif op == BRANCH:
+        strings = set()
+        for branch in av[1]:
+            branch_strings = get_exact_sequence(branch)
+            if branch_strings is None:
+                return None
+            strings.update(branch_strings)
+        if len(strings) <= MAX_STRINGS:
+            return strings
+    return None
+
+
+def get_exact_sequence(items):
+    strings = set([""])
+    for op, av in items:
+        item_strings = get_exact(op, av)
+        if item_strings is None or len(strings) * len(item_strings) > MAX_STRINGS:
+            return None
+        strings = set(prefix + string for prefix in strings for string in item_strings)
+    return strings
+
+
+def get_longer(strings, other):
+    """The set whose shortest string is the longest, the empty strings don't count."""
+    if not other or "" in other:
+        return strings
+    if not strings or min(map(len, other)) > min(map(len, strings)):
+        return other
+    return strings
+
+
+def is_ignoring_case(av):
+    # Since Python 3.6 a group holds the flags it adds, e.g. (?i:...).
+    return len(av) == 4 and av[1] & re.IGNORECASE
+
+
+def get_trie_pattern(literals):
+    """An alternation of the strings matching the longest one, factored by their prefixes."""
+    trie = {}
+    for literal in literals:
+        node = trie
+        for character in literal:
+            node = node.setdefault(character, {})
+        node[""] = {}
+    return get_node_pattern(trie)
+
+
+def get_node_pattern(node):
+    branches = [
+        re.escape(character) + get_node_pattern(child)
+        for character, child in sorted(node.items())
+        if character
+    ]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:{})".format("|".join(branches))
+    return "(?:{})?".format(pattern) if "" in node else pattern
+
+
+default_parser = UAParserBackend()
@@ -0,0 +1,304 @@
+from collections import namedtuple
+from distutils.version import LooseVersion
+
+import django
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from django_cookies_samesite.cache import (
+    DEFAULT_UA_CACHE_SIZE,
+    DEFAULT_UA_CACHE_TIMEOUT,
+    SharedVerdictCache,
+)
+from django_cookies_samesite.canonical import (
+    DEFAULT_UA_MAX_LENGTH,
+    UserAgentCanonicalizer,
+)
+from django_cookies_samesite.cookies import get_cookie_attributes
+from django_cookies_samesite.parsers import ParserBackend
+from django_cookies_samesite.profiling import (
+    DEFAULT_PROFILE_DUMP_INTERVAL,
+    DEFAULT_PROFILE_MAX_BYTES,
+    SampledProfiler,
+)
+from django_cookies_samesite.rules import DEFAULT_RULES, RuleEngine, parse_rule
+from django_cookies_samesite.snapshot import (
+    DEFAULT_UA_CACHE_SNAPSHOT_INTERVAL,
+    VerdictCacheSnapshot,
+    get_snapshot_version,
+)
+from django_cookies_samesite.verdict_table import StaleVerdictTable, VerdictTable
+
+DJANGO_SUPPORTED_VERSION = "3.1.0"
+
+SAMESITE_FLAGS = frozenset(["Lax", "None", "Strict"])
+
+# Settings which affect the policy, they're accepted with and without the DCS_ prefix.
+POLICY_SETTINGS = frozenset(
+    [
+        "SESSION_COOKIE_SAMESITE",
+        "SESSION_COOKIE_SAMESITE_KEYS",
+        "SESSION_COOKIE_SAMESITE_FORCE_CORE",
+        "SESSION_COOKIE_SAMESITE_FORCE_ALL",
+        "SAMESITE_DEVMODE",
+        "UA_CACHE_SIZE",
+        "UA_MAX_LENGTH",
+        "UA_STRIP_TOKENS",
+        "UA_CACHE_ALIAS",
+        "UA_CACHE_TIMEOUT",
+        "VERDICT_TABLE_PATH",
+        "UA_CACHE_SNAPSHOT_PATH",
+        "UA_CACHE_SNAPSHOT_INTERVAL",
+        "SAMESITE_RULES",
+        "USE_CLIENT_HINTS",
+        "UA_PARSER_BACKEND",
+        "PROFILE_SAMPLE_RATE",
+        "PROFILE_DIRECTORY",
+        "PROFILE_MAX_BYTES",
+        "PROFILE_DUMP_INTERVAL",
+    ]
+)
+DJANGO_POLICY_SETTINGS = frozenset(
+    ["SESSION_COOKIE_NAME", "CSRF_COOKIE_NAME", "CACHES"]
+)
+
+
+def get_config_setting(setting_name, default_value=None):
+    """Load the Django setting with DCS_ prefix and fallback to the legacy name if not found."""
+    return getattr(
+        settings,
+        "DCS_{}".format(setting_name),
+        getattr(settings, setting_name, default_value),
+    )
+
+
+def is_policy_setting(setting_name):
+    """Check if a change of the setting requires to rebuild the policy."""
+    if setting_name.startswith("DCS_"):
+        setting_name = setting_name.replace("DCS_", "", 1)
+    return setting_name in POLICY_SETTINGS or setting_name in DJANGO_POLICY_SETTINGS
+
+
+class SameSitePolicy(
+    namedtuple(
+        "SameSitePolicy",
+        [
+            "samesite_flag",
+            "protected_cookies",
+            "samesite_force_all",
+            "devmode",
+            "cookie_attributes",
+            "ua_cache_size",
+            "canonicalizer",
+            "rule_engine",
+            "parser",
+            "shared_verdict_cache",
+            "verdict_table",
+            "verdict_snapshot",
+            "use_client_hints",
+            "profiler",
+            "django_supports_samesite",
+        ],
+    )
+):
+    """
+    Validated configuration of the middleware.
+
+    It's compiled once from the settings, so the middleware doesn't have to look up
+    and validate the settings for every response.
+    """
+
+    __slots__ = ()
+
+    @property
+    def enabled(self):
+        return bool(self.samesite_flag)
+
+
+def load_rule_engine():
+    """Compile the custom rules from the settings, None means the default rules."""
+    custom_rules = get_config_setting("SAMESITE_RULES")
+    if not custom_rules:
+        return None
+
+    if not isinstance(custom_rules, (list, tuple)):
+        raise ValueError("SAMESITE_RULES should be a list or tuple.")
+
+    # The custom rules take precedence over the default ones.
+    return RuleEngine(tuple(parse_rule(spec) for spec in custom_rules) + DEFAULT_RULES)
+
+
+def load_parser():
+    """Instantiate the parser backend from the settings, None means ua_parser."""
+    parser_path = get_config_setting("UA_PARSER_BACKEND")
+    if not parser_path:
+        return None
+
+    try:
+        parser_class = import_string(parser_path)
+    except ImportError:
+        parser_class = None
+    if not isinstance(parser_class, type) or not issubclass(
+        parser_class, ParserBackend
+    ):
+        raise ValueError(
+            "UA_PARSER_BACKEND should be a dotted path to a ParserBackend subclass."
+        )
+    return parser_class()
+
+
+def load_canonicalizer():
+    ua_max_length = get_config_setting("UA_MAX_LENGTH", DEFAULT_UA_MAX_LENGTH)
+    if not isinstance(ua_max_length, int) or ua_max_length <= 0:
+        raise ValueError("UA_MAX_LENGTH should be a positive integer.")
+
+    return UserAgentCanonicalizer(
+        ua_max_length, bool(get_config_setting("UA_STRIP_TOKENS"))
+    )
+
+
+def get_verdicts_fingerprint(rule_engine=None, parser=None):
+    """Identify the rules and the parser the verdicts were made by, None for the defaults."""
+    if rule_engine is None and parser is None:
+        return None
+    return "{}:{}".format(
+        rule_engine.fingerprint if rule_engine else "",
+        parser.fingerprint if parser else "",
+    )
+
+
+def load_shared_verdict_cache(rule_engine=None, parser=None):
+    ua_cache_alias = get_config_setting("UA_CACHE_ALIAS")
+    if not ua_cache_alias:
+        return None
+
+    if ua_cache_alias not in settings.CACHES:
+        raise ValueError(
+            "UA_CACHE_ALIAS should be one of the caches configured in CACHES."
+        )
+
+    ua_cache_timeout = get_config_setting("UA_CACHE_TIMEOUT", DEFAULT_UA_CACHE_TIMEOUT)
+    if ua_cache_timeout is not None and (
+        not isinstance(ua_cache_timeout, int) or ua_cache_timeout <= 0
+    ):
+        raise ValueError("UA_CACHE_TIMEOUT should be a positive integer or None.")
+
+    return SharedVerdictCache(
+        ua_cache_alias,
+        ua_cache_timeout,
+        rules_fingerprint=get_verdicts_fingerprint(rule_engine, parser),
+    )
+
+
+def load_verdict_table(rule_engine=None, parser=None):
+    verdict_table_path = get_config_setting("VERDICT_TABLE_PATH")
+    if not verdict_table_path:
+        return None
+
+    try:
+        return VerdictTable(
+            verdict_table_path, get_snapshot_version(rule_engine, parser)
+        )
+    except StaleVerdictTable:
+        raise ValueError(
+            "VERDICT_TABLE_PATH points to a table built for other rules or another parser, "
+            "rebuild it with the build_verdict_table command."
+        )
+    except (IOError, OSError, ValueError):
+        raise ValueError(
+            "VERDICT_TABLE_PATH should point to a table built with the build_verdict_table command."
+        )
+
+
+def load_verdict_snapshot(rule_engine=None, parser=None):
+    snapshot_path = get_config_setting("UA_CACHE_SNAPSHOT_PATH")
+    if not snapshot_path:
+        return None
+
+    snapshot_interval = get_config_setting(
+        "UA_CACHE_SNAPSHOT_INTERVAL", DEFAULT_UA_CACHE_SNAPSHOT_INTERVAL
+    )
+    if not isinstance(snapshot_interval, (int, float)) or snapshot_interval < 0:
+        raise ValueError("UA_CACHE_SNAPSHOT_INTERVAL should be a non-negative number.")
+
+    return VerdictCacheSnapshot(
+        snapshot_path, get_snapshot_version(rule_engine, parser), snapshot_interval
+    )
+
+
+def load_profiler():
+    """Build the profiler of process_response from the settings, None means it's not profiled."""
+    sample_rate = get_config_setting("PROFILE_SAMPLE_RATE")
+    if not sample_rate:
+        return None
+
+    if not isinstance(sample_rate, int) or sample_rate < 0:
+        raise ValueError("PROFILE_SAMPLE_RATE should be a positive integer.")
+
+    directory = get_config_setting("PROFILE_DIRECTORY")
+    if not directory:
+        raise ValueError("PROFILE_DIRECTORY should be set to profile the middleware.")
+
+    max_bytes = get_config_setting("PROFILE_MAX_BYTES", DEFAULT_PROFILE_MAX_BYTES)
+    if not isinstance(max_bytes, int) or max_bytes <= 0:
+        raise ValueError("PROFILE_MAX_BYTES should be a positive integer.")
+
+    dump_interval = get_config_setting(
+        "PROFILE_DUMP_INTERVAL", DEFAULT_PROFILE_DUMP_INTERVAL
+    )
+    if not isinstance(dump_interval, (int, float)) or dump_interval < 0:
+        raise ValueError("PROFILE_DUMP_INTERVAL should be a non-negative number.")
+
+    return SampledProfiler(sample_rate, directory, max_bytes, dump_interval)
+
+
+def load_policy():
+    """Compile the policy from the settings, raise ValueError if they're malformed."""
+    protected_cookies = get_config_setting("SESSION_COOKIE_SAMESITE_KEYS", set())
+
+    if not isinstance(protected_cookies, (list, set, tuple, frozenset)):
+        raise ValueError("SESSION_COOKIE_SAMESITE_KEYS should be a list, set or tuple.")
+
+    protected_cookies = set(protected_cookies)
+    if get_config_setting("SESSION_COOKIE_SAMESITE_FORCE_CORE", True):
+        protected_cookies |= {
+            settings.SESSION_COOKIE_NAME,
+            settings.CSRF_COOKIE_NAME,
+        }
+
+    samesite_flag = get_config_setting("SESSION_COOKIE_SAMESITE", "")
+    samesite_flag = str(samesite_flag).capitalize() if samesite_flag is not None else ""
+
+    if samesite_flag and samesite_flag not in SAMESITE_FLAGS:
+        raise ValueError('samesite must be "Lax", "None", or "Strict".')
+
+    # SAMESITE_DEVMODE=True means, use Lax if http request.
+    devmode = bool(get_config_setting("SAMESITE_DEVMODE"))
+
+    ua_cache_size = get_config_setting("UA_CACHE_SIZE", DEFAULT_UA_CACHE_SIZE)
+    if not isinstance(ua_cache_size, int) or ua_cache_size < 0:
+        raise ValueError("UA_CACHE_SIZE should be a non-negative integer.")
+
+    rule_engine = load_rule_engine()
+    parser = load_parser()
+
+    return SameSitePolicy(
+        samesite_flag=samesite_flag,
+        protected_cookies=frozenset(protected_cookies),
+        samesite_force_all=get_config_setting("SESSION_COOKIE_SAMESITE_FORCE_ALL"),
+        devmode=devmode,
+        cookie_attributes=get_cookie_attributes(samesite_flag, devmode),
+        ua_cache_size=ua_cache_size,
+        canonicalizer=load_canonicalizer(),
+        rule_engine=rule_engine,
+        parser=parser,
+        shared_verdict_cache=load_shared_verdict_cache(rule_engine, parser),
+        verdict_table=load_verdict_table(rule_engine, parser),
+        verdict_snapshot=load_verdict_snapshot(rule_engine, parser),
+        use_client_hints=bool(get_config_setting("USE_CLIENT_HINTS", True)),
+        profiler=load_profiler(),
+        django_supports_samesite=(
+            LooseVersion(django.get_version()) >= LooseVersion(DJANGO_SUPPORTED_VERSION)
+        ),
+    )
@@ -0,0 +1,126 @@
+import cProfile
+import itertools
+import os
+import pstats
+import threading
+import time
+
+from timeit import default_timer
+
+DEFAULT_PROFILE_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_PROFILE_DUMP_INTERVAL = 60
+
+DUMP_PREFIX = "samesite-"
+DUMP_SUFFIX = ".pstats"
+
+
+class SampledProfiler(object):
+    """
+    Profiles 1 in `rate` calls with cProfile and aggregates their stats.
+
+    The stats aggregated since the previous dump are written into `directory` in the pstats
+    format every `dump_interval` seconds, by the first sampled call after it. The oldest
+    dumps of all the processes sharing the directory are deleted to keep them under
+    `max_bytes`. A call which isn't sampled only advances a counter.
+    """
+
+    def __init__(
+        self,
+        rate,
+        directory,
+        max_bytes=DEFAULT_PROFILE_MAX_BYTES,
+        dump_interval=DEFAULT_PROFILE_DUMP_INTERVAL,
+    ):
+        self.rate = rate
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.dump_interval = dump_interval
+        self._calls = itertools.count(1)
+        self._dumps = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stats = None
+        self._dumped_at = default_timer()
+
+    def is_sampled(self):
+        return next(self._calls) % self.rate == 0
+
+    def runcall(self, function, *args):
+        """Call the function under the profiler, the stats are added to the aggregated ones."""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active, since Python 3.12 only one can run at a time.
+            return function(*args)
+        try:
+            return function(*args)
+        finally:
+            profile.disable()
+            self.add(profile)
+
+    def add(self, profile):
+        with self._lock:
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+            is_due = default_timer() - self._dumped_at >= self.dump_interval
+        if is_due:
+            self.dump()
+
+    def dump(self):
+        """
+        Write the stats aggregated since the previous dump and prune the old dumps.
+
+        Return the path of the dump, None if nothing was sampled or it couldn't be written,
+        profiling never breaks the response.
+        """
+        with self._lock:
+            stats, self._stats = self._stats, None
+            self._dumped_at = default_timer()
+        if stats is None:
+            return None
+
+        path = os.path.join(
+            self.directory,
+            "{}{}-{}-{}{}".format(
+                DUMP_PREFIX,
+                int(time.time()),
+                os.getpid(),
+                next(self._dumps),
+                DUMP_SUFFIX,
+            ),
+        )
+        tmp_path = "{}.tmp".format(path)
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            stats.dump_stats(tmp_path)
+            os.rename(tmp_path, path)
+            self.prune()
+        except (IOError, OSError):
+            return None
+        return path
+
+    def prune(self):
+        """Delete the oldest dumps until all of them take at most max_bytes."""
+        dumps = []
+        for name in os.listdir(self.directory):
+            if name.startswith(DUMP_PREFIX) and name.endswith(DUMP_SUFFIX):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Pruned by another process.
+                    continue
+                dumps.append((stat.st_mtime, name, stat.st_size))
+
+        total_bytes = sum(size for _, _, size in dumps)
+        for _, name, size in sorted(dumps):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total_bytes -= size
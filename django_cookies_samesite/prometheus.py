@@ -0,0 +1,340 @@
+import atexit
+import bisect
+import errno
+import io
+import json
+import os
+import threading
+
+from collections import Counter
+from timeit import default_timer
+
+from django_cookies_samesite.cache import verdict_cache
+from django_cookies_samesite.instrumentation import (
+    SKIPPED_DISABLED,
+    SKIPPED_INCOMPATIBLE,
+    SKIPPED_NO_COOKIES,
+)
+from django_cookies_samesite.signals import response_processed
+from django_cookies_samesite.verdicts import VERDICT_NAMES
+
+DEFAULT_METRICS_FLUSH_INTERVAL = 10
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# The upper bounds of the buckets of the parse latency histogram, in seconds.
+PARSE_SECONDS_BUCKETS = (
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+)
+
+FILE_PREFIX = "dcs-metrics-"
+FILE_SUFFIX = ".json"
+
+RESPONSES = "dcs_responses_total"
+RESPONSES_SKIPPED = "dcs_responses_skipped_total"
+RESPONSES_REWRITTEN = "dcs_responses_rewritten_total"
+COOKIES_REWRITTEN = "dcs_cookies_rewritten_total"
+VERDICTS = "dcs_verdicts_total"
+CACHE_HITS = "dcs_ua_cache_hits_total"
+CACHE_MISSES = "dcs_ua_cache_misses_total"
+CACHE_SIZE = "dcs_ua_cache_size"
+CACHE_HIT_RATIO = "dcs_ua_cache_hit_ratio"
+PARSE_SECONDS = "dcs_ua_parse_seconds"
+
+# (name, type, help) of the exported metrics, in the order they're rendered.
+METRICS = (
+    (RESPONSES, "counter", "Responses processed by CookiesSameSite."),
+    (
+        RESPONSES_SKIPPED,
+        "counter",
+        "Responses whose cookies weren't rewritten, by reason.",
+    ),
+    (RESPONSES_REWRITTEN, "counter", "Responses whose cookies were rewritten."),
+    (COOKIES_REWRITTEN, "counter", "Cookies the SameSite flag was added to."),
+    (
+        VERDICTS,
+        "counter",
+        "Classified clients, by incompatibility rule and classification path.",
+    ),
+    (CACHE_HITS, "counter", "User-Agents classified from the verdict cache."),
+    (CACHE_MISSES, "counter", "User-Agents missing from the verdict cache."),
+    (CACHE_SIZE, "gauge", "Verdicts in the in-process caches of the live processes."),
+    (CACHE_HIT_RATIO, "gauge", "Hits of the verdict cache per classified User-Agent."),
+    (
+        PARSE_SECONDS,
+        "histogram",
+        "Time to classify a User-Agent missing from the verdict cache.",
+    ),
+)
+GAUGES = frozenset(name for name, metric_type, _ in METRICS if metric_type == "gauge")
+# The metrics which have no sample until they get one with labels.
+LABELED = frozenset([RESPONSES_SKIPPED, VERDICTS])
+HISTOGRAM_SAMPLES = frozenset(
+    PARSE_SECONDS + suffix for suffix in ("_bucket", "_sum", "_count")
+)
+
+
+def escape_label_value(value):
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def make_sample(name, **labels):
+    """The name of the sample in the exposition format, e.g. 'name{label="value"}'."""
+    if not labels:
+        return name
+    return "{}{{{}}}".format(
+        name,
+        ",".join(
+            '{}="{}"'.format(label, escape_label_value(str(value)))
+            for label, value in sorted(labels.items())
+        ),
+    )
+
+
+SKIPPED_SAMPLES = {
+    reason: make_sample(RESPONSES_SKIPPED, reason=reason)
+    for reason in (SKIPPED_DISABLED, SKIPPED_NO_COOKIES, SKIPPED_INCOMPATIBLE)
+}
+
+
+def get_metric_name(sample):
+    name = sample.split("{", 1)[0]
+    return PARSE_SECONDS if name in HISTOGRAM_SAMPLES else name
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+class PrometheusCollector(object):
+    """
+    Counts what the middleware does with the responses, rendered in the Prometheus text format.
+
+    Every thread counts into its own Counter, so the threads serving the responses never wait
+    for each other, the counters of all of them are summed when they're collected. The counts
+    of the finished threads are merged into a single Counter when a new thread starts counting
+    or the samples are collected, so a thread per request doesn't grow the collector. With a shared
+    `directory`, every process writes its counters into its own file there every `flush_interval`
+    seconds (by the first response after it) and at exit, so any of them can render the metrics
+    of all the processes. The gauges include only the processes which are still running.
+    """
+
+    def __init__(self, directory=None, flush_interval=DEFAULT_METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.connected = False
+        self.reset()
+        self._flush_lock = threading.Lock()
+        self._flushed_at = default_timer()
+        self._verdict_samples = {}
+        self._bucket_samples = [
+            make_sample(PARSE_SECONDS + "_bucket", le=repr(bound))
+            for bound in PARSE_SECONDS_BUCKETS
+        ] + [make_sample(PARSE_SECONDS + "_bucket", le="+Inf")]
+        self._exit_handler = None
+
+    def connect(self):
+        response_processed.connect(self.receive, dispatch_uid=id(self))
+        self.connected = True
+        if self._exit_handler is None:
+            self._exit_handler = self.flush
+            atexit.register(self._exit_handler)
+            if hasattr(os, "register_at_fork"):
+                # The counters of the parent stay in its own file.
+                os.register_at_fork(after_in_child=self.reset)
+
+    def disconnect(self):
+        response_processed.disconnect(dispatch_uid=id(self))
+        self.connected = False
+
+    def reset(self):
+        self._local = threading.local()
+        self._counters_lock = threading.Lock()
+        # The Counters of the threads by thread, and the counts of the finished threads.
+        self._counters = {}
+        self._finished_counter = Counter()
+
+    def get_counter(self):
+        """The Counter of the current thread, only this thread writes into it."""
+        try:
+            return self._local.counter
+        except AttributeError:
+            counter = self._local.counter = Counter()
+            with self._counters_lock:
+                self.merge_finished_counters()
+                self._counters[threading.current_thread()] = counter
+            return counter
+
+    def merge_finished_counters(self):
+        """Merge the Counters of the finished threads, called with the counters lock held."""
+        for thread in [thread for thread in self._counters if not thread.is_alive()]:
+            self._finished_counter.update(self._counters.pop(thread))
+
+    def receive(self, sender, metrics, **kwargs):
+        counter = self.get_counter()
+        counter[RESPONSES] += 1
+        if metrics.skipped is not None:
+            counter[SKIPPED_SAMPLES[metrics.skipped]] += 1
+        if metrics.cookies_rewritten:
+            counter[RESPONSES_REWRITTEN] += 1
+            counter[COOKIES_REWRITTEN] += metrics.cookies_rewritten
+        if metrics.rule is not None:
+            counter[self.get_verdict_sample(metrics.rule, metrics.path)] += 1
+        if metrics.cache_hit is not None:
+            counter[CACHE_HITS if metrics.cache_hit else CACHE_MISSES] += 1
+        seconds = metrics.timings.get("classify")
+        if seconds is not None:
+            counter[
+                self._bucket_samples[bisect.bisect_left(PARSE_SECONDS_BUCKETS, seconds)]
+            ] += 1
+            counter[PARSE_SECONDS + "_sum"] += seconds
+            counter[PARSE_SECONDS + "_count"] += 1
+
+        if self.directory and default_timer() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def get_verdict_sample(self, rule, path):
+        sample = self._verdict_samples.get((rule, path))
+        if sample is None:
+            sample = self._verdict_samples[(rule, path)] = make_sample(
+                VERDICTS, rule=VERDICT_NAMES.get(rule, rule), path=path
+            )
+        return sample
+
+    def collect(self):
+        """Return the samples of this process, the histogram buckets aren't cumulative."""
+        with self._counters_lock:
+            self.merge_finished_counters()
+            samples = Counter(self._finished_counter)
+            counters = list(self._counters.values())
+        for counter in counters:
+            samples.update(dict(counter))
+        samples[CACHE_SIZE] = len(verdict_cache)
+        return samples
+
+    def flush(self):
+        """Write the samples of this process into the shared directory, return the path of the file."""
+        if not self.directory or not self._flush_lock.acquire(False):
+            return None
+        try:
+            self._flushed_at = default_timer()
+            path = os.path.join(
+                self.directory, "{}{}{}".format(FILE_PREFIX, os.getpid(), FILE_SUFFIX)
+            )
+            tmp_path = "{}.tmp".format(path)
+            try:
+                if not os.path.isdir(self.directory):
+                    os.makedirs(self.directory)
+                # json.dumps returns bytes on Python 2, str on Python 3, both ASCII.
+                with io.open(tmp_path, "wb") as metrics_file:
+                    metrics_file.write(json.dumps(self.collect()).encode("ascii"))
+                os.rename(tmp_path, path)
+            except Exception:
+                # Flushed by the response_processed receiver, the metrics never break a response.
+                return None
+            return path
+        finally:
+            self._flush_lock.release()
+
+    def aggregate(self):
+        """Sum the samples of this process and the ones written by the other processes."""
+        samples = self.collect()
+        if not self.directory:
+            return samples
+
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            names = []
+        for name in names:
+            if not name.startswith(FILE_PREFIX) or not name.endswith(FILE_SUFFIX):
+                continue
+            pid = name.replace(FILE_PREFIX, "", 1).replace(FILE_SUFFIX, "")
+            if not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                with io.open(
+                    os.path.join(self.directory, name), encoding="utf-8"
+                ) as metrics_file:
+                    process_samples = json.load(metrics_file)
+            except (IOError, OSError, ValueError):
+                continue
+            is_running = is_process_running(int(pid))
+            for sample, value in process_samples.items():
+                if is_running or get_metric_name(sample) not in GAUGES:
+                    samples[sample] += value
+        return samples
+
+    def render(self):
+        """The metrics of all the processes in the Prometheus text exposition format."""
+        samples = self.aggregate()
+        classified = samples[CACHE_HITS] + samples[CACHE_MISSES]
+        samples[CACHE_HIT_RATIO] = (
+            float(samples[CACHE_HITS]) / classified if classified else 0.0
+        )
+
+        by_metric = {}
+        for sample, value in samples.items():
+            by_metric.setdefault(get_metric_name(sample), {})[sample] = value
+
+        lines = []
+        for name, metric_type, help_text in METRICS:
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, metric_type))
+            metric_samples = by_metric.get(name, {})
+            if metric_type == "histogram":
+                cumulative = 0
+                for sample in self._bucket_samples:
+                    cumulative += metric_samples.get(sample, 0)
+                    lines.append("{} {}".format(sample, cumulative))
+                for suffix in ("_sum", "_count"):
+                    lines.append(
+                        "{}{} {}".format(
+                            name,
+                            suffix,
+                            format_value(metric_samples.get(name + suffix, 0)),
+                        )
+                    )
+            elif metric_samples:
+                for sample, value in sorted(metric_samples.items()):
+                    lines.append("{} {}".format(sample, format_value(value)))
+            elif name not in LABELED:
+                lines.append("{} 0".format(name))
+        return "\n".join(lines) + "\n"
+
+
+def is_process_running(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as exc:
+        return exc.errno != errno.ESRCH
+    return True
+
+
+metrics_collector = PrometheusCollector()
+
+
+def setup_metrics():
+    """Configure the process-wide collector from the settings and start counting the responses."""
+    from django_cookies_samesite.policy import get_config_setting
+
+    flush_interval = get_config_setting(
+        "PROMETHEUS_FLUSH_INTERVAL", DEFAULT_METRICS_FLUSH_INTERVAL
+    )
+    if not isinstance(flush_interval, (int, float)) or flush_interval < 0:
+        raise ValueError("PROMETHEUS_FLUSH_INTERVAL should be a non-negative number.")
+
+    metrics_collector.directory = get_config_setting("PROMETHEUS_MULTIPROCESS_DIR")
+    metrics_collector.flush_interval = flush_interval
+    metrics_collector.connect()
+    return metrics_collector
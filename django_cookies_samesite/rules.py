@@ -0,0 +1,211 @@
+import hashlib
+import re
+import sys
+
+from collections import namedtuple
+
+from django_cookies_samesite import verdicts
+
+# Which version a rule compares.
+BROWSER_VERSION = "browser"
+OS_VERSION = "os"
+
+# Browser families grouped under a single name, every other family is matched as it is.
+CHROME = "Chrome"
+SAFARI = "Safari"
+UC_BROWSER = "UC Browser"
+IOS = "iOS"
+MAC_OSX = "Mac OS X"
+
+CHROME_RE = re.compile("Chrom(e|ium)")
+SAFARI_RE = re.compile("Safari")
+
+MAX_VERSION_PART = sys.maxsize
+
+RULE_KEYS = frozenset(
+    ["browser", "os", "version_of", "min_version", "max_version", "incompatible"]
+)
+
+
+class Rule(
+    namedtuple(
+        "Rule",
+        ["verdict", "browser", "os", "version_of", "min_version", "max_version"],
+    )
+):
+    """
+    Assigns the verdict to the clients of the browser and OS families within the version range.
+
+    None matches any family, the bounds are inclusive and compared with the same number
+    of version parts, i.e. max_version=(11,) matches every 11.x version.
+    """
+
+    __slots__ = ()
+
+    def __new__(
+        cls,
+        verdict,
+        browser=None,
+        os=None,
+        version_of=BROWSER_VERSION,
+        min_version=None,
+        max_version=None,
+    ):
+        return super(Rule, cls).__new__(
+            cls, verdict, browser, os, version_of, min_version, max_version
+        )
+
+    def bounds(self):
+        """The version range padded to full (major, minor, patch) versions."""
+        low = (self.min_version or ()) + (0,) * (3 - len(self.min_version or ()))
+        high = (self.max_version or ()) + (MAX_VERSION_PART,) * (
+            3 - len(self.max_version or ())
+        )
+        return low, high
+
+
+# Refer (https://www.chromium.org/updates/same-site/incompatible-clients)
+# The first matching rule wins, the clients matching none of them are compatible.
+DEFAULT_RULES = (
+    Rule(verdicts.COMPATIBLE, os=IOS, version_of=OS_VERSION, max_version=(11,)),
+    Rule(verdicts.COMPATIBLE, os=IOS, version_of=OS_VERSION, min_version=(13,)),
+    Rule(verdicts.COMPATIBLE, browser=CHROME, max_version=(50,)),
+    Rule(verdicts.COMPATIBLE, browser=CHROME, min_version=(67,)),
+    Rule(verdicts.COMPATIBLE, browser=UC_BROWSER, min_version=(12, 13, 2)),
+    Rule(
+        verdicts.COMPATIBLE,
+        browser=SAFARI,
+        os=MAC_OSX,
+        version_of=OS_VERSION,
+        max_version=(10, 13),
+    ),
+    Rule(
+        verdicts.COMPATIBLE,
+        browser=SAFARI,
+        os=MAC_OSX,
+        version_of=OS_VERSION,
+        min_version=(10, 15),
+    ),
+    Rule(verdicts.BUGGY_CHROME, browser=CHROME),
+    Rule(verdicts.OLD_UC_BROWSER, browser=UC_BROWSER),
+    Rule(verdicts.IOS_12, os=IOS),
+    Rule(verdicts.MACOS_10_14_SAFARI, browser=SAFARI, os=MAC_OSX),
+    Rule(verdicts.OTHER_INCOMPATIBLE, browser=SAFARI),
+)
+
+
+class RuleEngine(object):
+    """
+    Rules compiled into a dispatch dict keyed by the (browser, OS) families.
+
+    Every entry holds only the version ranges of the rules which can match the families,
+    in their order, so a verdict costs a dict lookup and usually one or two range checks.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = tuple(rules)
+        self._browsers = frozenset(rule.browser for rule in self.rules)
+        self._oses = frozenset(rule.os for rule in self.rules)
+        self._dispatch = {}
+        for browser in self._browsers | {None}:
+            for os in self._oses | {None}:
+                self._dispatch[(browser, os)] = tuple(
+                    (rule.version_of == BROWSER_VERSION,)
+                    + rule.bounds()
+                    + (rule.verdict,)
+                    for rule in self.rules
+                    if rule.browser in (None, browser) and rule.os in (None, os)
+                )
+
+    @property
+    def fingerprint(self):
+        """Short hash of the rules, it changes whenever a verdict can change."""
+        return hashlib.sha1(repr(self.rules).encode("utf-8")).hexdigest()[:12]
+
+    def classify(self, client):
+        """Return the verdict of the first rule matching the ParsedClient."""
+        browser = client.browser_key
+        if browser not in self._browsers:
+            browser = None
+        os = client.os_family
+        if os not in self._oses:
+            os = None
+        for of_browser, low, high, verdict in self._dispatch[(browser, os)]:
+            if (
+                low
+                <= (client.browser_version if of_browser else client.os_version)
+                <= high
+            ):
+                return verdict
+        return verdicts.COMPATIBLE
+
+
+def get_browser_key(browser_family):
+    """The family name the rules match, all Chrome and Safari flavours are grouped."""
+    if CHROME_RE.search(browser_family):
+        return CHROME
+    if SAFARI_RE.search(browser_family):
+        return SAFARI
+    return browser_family
+
+
+def parse_version(version):
+    if version is None:
+        return None
+    if isinstance(version, int):
+        return (version,)
+    if isinstance(version, str):
+        version = version.split(".")
+    return tuple(int(part) for part in version)
+
+
+def parse_rule(spec):
+    """
+    Build a Rule from its settings representation, e.g.
+
+        {"browser": "Samsung Internet", "max_version": "9.2"}
+
+    The clients matching the rule are incompatible unless "incompatible" is False.
+    """
+    if not isinstance(spec, dict) or not set(spec) <= RULE_KEYS:
+        raise ValueError("Invalid SameSite rule {!r}.".format(spec))
+    if not spec.get("browser") and not spec.get("os"):
+        raise ValueError(
+            "SameSite rule {!r} should match a browser or an OS.".format(spec)
+        )
+
+    browser = spec.get("browser")
+    if browser and get_browser_key(browser) != browser:
+        # The flavours are grouped before the lookup, a rule naming one would never match.
+        raise ValueError(
+            'SameSite rule {spec!r} would never match "{browser}", every {key} flavour is '
+            'matched as "{key}". Use "{key}" and narrow the rule with "os".'.format(
+                spec=spec, browser=browser, key=get_browser_key(browser)
+            )
+        )
+
+    version_of = spec.get("version_of") or (
+        BROWSER_VERSION if spec.get("browser") else OS_VERSION
+    )
+    if version_of not in (BROWSER_VERSION, OS_VERSION):
+        raise ValueError(
+            'SameSite rule {!r} should compare "browser" or "os" version.'.format(spec)
+        )
+
+    try:
+        min_version = parse_version(spec.get("min_version"))
+        max_version = parse_version(spec.get("max_version"))
+    except (TypeError, ValueError):
+        raise ValueError("SameSite rule {!r} has an invalid version.".format(spec))
+
+    return Rule(
+        verdicts.CUSTOM_RULE if spec.get("incompatible", True) else verdicts.COMPATIBLE,
+        browser=spec.get("browser"),
+        os=spec.get("os"),
+        version_of=version_of,
+        min_version=min_version,
+        max_version=max_version,
+    )
+
+
+default_rule_engine = RuleEngine()
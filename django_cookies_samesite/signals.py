@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent by CookiesSameSite for every response while at least one receiver is connected,
+# with `request`, `response` and `metrics` (django_cookies_samesite.instrumentation.ResponseMetrics).
+response_processed = Signal()
@@ -0,0 +1,207 @@
+import atexit
+import hashlib
+import io
+import os
+import struct
+import threading
+
+from collections import OrderedDict
+
+from django_cookies_samesite import __version__
+from django_cookies_samesite.parsers import default_parser
+from django_cookies_samesite.rules import default_rule_engine
+
+DEFAULT_UA_CACHE_SNAPSHOT_INTERVAL = 5 * 60
+
+# File layout: the header (magic, version) followed by the records in the order they were appended.
+# A record holds the key of the verdict cache (the 64-bit hash of the User-Agent) and the rule
+# from django_cookies_samesite.verdicts. A later record of the same key replaces the earlier one.
+MAGIC = b"DCSVS002"
+HEADER = struct.Struct("<8s20s")
+RECORD = struct.Struct("<QB")
+
+
+def get_snapshot_version(rule_engine=None, parser=None):
+    """
+    Hash of the package version, the rules and the parser the verdicts were made by.
+
+    The snapshots of another version are discarded, a change of the rules or an upgrade of ua_parser
+    can change the verdicts.
+    """
+    return hashlib.sha1(
+        "{}:{}:{}".format(
+            __version__,
+            (rule_engine or default_rule_engine).fingerprint,
+            (parser or default_parser).fingerprint,
+        ).encode("utf-8")
+    ).digest()
+
+
+def pack_records(verdicts):
+    return b"".join(RECORD.pack(key, int(verdict)) for key, verdict in verdicts)
+
+
+def read_snapshot(path, version):
+    """
+    Return the verdicts from the snapshot as an OrderedDict, the latest appended last.
+
+    The snapshot is empty if the file is missing, isn't a snapshot or was written for another
+    version. A record cut short by a crash while it was appended is ignored.
+    """
+    verdicts = OrderedDict()
+    try:
+        with io.open(path, "rb") as snapshot_file:
+            data = snapshot_file.read()
+    except (IOError, OSError):
+        return verdicts
+    if len(data) < HEADER.size or HEADER.unpack_from(data) != (MAGIC, version):
+        return verdicts
+
+    for offset in range(HEADER.size, len(data) - RECORD.size + 1, RECORD.size):
+        key, verdict = RECORD.unpack_from(data, offset)
+        verdicts.pop(key, None)
+        verdicts[key] = verdict
+    return verdicts
+
+
+def write_snapshot(path, version, verdicts):
+    """
+    Write the (key, verdict) pairs into a new snapshot at `path`.
+
+    The file is written next to the target and renamed, so the processes reading it
+    never see a partial snapshot.
+    """
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with io.open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(HEADER.pack(MAGIC, version))
+        snapshot_file.write(pack_records(verdicts))
+    os.rename(tmp_path, path)
+
+
+def append_snapshot(path, version, verdicts):
+    """
+    Append the (key, verdict) pairs to the snapshot at `path`.
+
+    The snapshot is started over if it's missing or was written for another version. The records
+    are appended with a single write, so the processes sharing the file don't interleave them.
+    """
+    try:
+        with io.open(path, "rb") as snapshot_file:
+            header = snapshot_file.read(HEADER.size)
+    except (IOError, OSError):
+        header = b""
+    if header != HEADER.pack(MAGIC, version):
+        write_snapshot(path, version, verdicts)
+        return
+    with io.open(path, "ab") as snapshot_file:
+        snapshot_file.write(pack_records(verdicts))
+
+
+class VerdictCacheSnapshot(object):
+    """
+    Keeps the verdict cache in a local file, so a restarted process doesn't parse again
+    the User-Agents it has already seen.
+
+    The verdicts cached since the previous save are appended to the file by a background thread
+    every `interval` seconds (0 saves only at exit), started in each process by its first miss
+    of the cache, and when the process exits. Once the file holds twice as many records as the cache,
+    it's compacted to the latest ones. Several processes can share the file, the read and write
+    errors are ignored.
+    """
+
+    def __init__(self, path, version, interval=DEFAULT_UA_CACHE_SNAPSHOT_INTERVAL):
+        self.path = path
+        self.version = version
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._saved = set()
+        self._saver_pid = None
+        self._stopped = threading.Event()
+
+    def load(self, cache):
+        """Fill the cache with the verdicts from the file, return their number."""
+        verdicts = read_snapshot(self.path, self.version)
+        for key, verdict in verdicts.items():
+            cache.set(key, verdict)
+        with self._lock:
+            self._saved.update(verdicts)
+        return len(verdicts)
+
+    def start_saving(self, cache):
+        """Start the thread saving the cache every `interval` seconds, once per process."""
+        if self._saver_pid == os.getpid() or not self.interval:
+            return
+        with self._lock:
+            if self._saver_pid == os.getpid() or self._stopped.is_set():
+                return
+            # A forked process doesn't inherit the thread of its parent.
+            self._saver_pid = os.getpid()
+            saver = threading.Thread(
+                target=self.save_periodically, args=(cache,), name="dcs-snapshot"
+            )
+            saver.daemon = True
+            saver.start()
+
+    def stop_saving(self):
+        self._stopped.set()
+
+    def save_periodically(self, cache):
+        while not self._stopped.wait(self.interval):
+            self.save(cache)
+
+    def save(self, cache):
+        """Append the verdicts cached since the previous save, return their number."""
+        with self._lock:
+            verdicts = [
+                (key, verdict)
+                for key, verdict in cache.items()
+                if key not in self._saved
+            ]
+            if not verdicts:
+                return 0
+            try:
+                if len(self._saved) + len(verdicts) > 2 * max(cache.maxsize, 1):
+                    self.compact(verdicts, cache.maxsize)
+                else:
+                    append_snapshot(self.path, self.version, verdicts)
+            except (IOError, OSError):
+                return 0
+            self._saved.update(key for key, _ in verdicts)
+            return len(verdicts)
+
+    def compact(self, verdicts, size):
+        """Rewrite the file with the latest `size` verdicts, including the ones appended by other processes."""
+        latest = read_snapshot(self.path, self.version)
+        for key, verdict in verdicts:
+            latest.pop(key, None)
+            latest[key] = verdict
+        while len(latest) > size:
+            latest.popitem(last=False)
+        write_snapshot(self.path, self.version, latest.items())
+        self._saved = set(latest)
+
+
+# The (snapshot, cache) saved when the process exits, the snapshot of the latest policy.
+exit_save = None
+exit_save_lock = threading.Lock()
+
+
+def save_at_exit(snapshot, cache):
+    """
+    Save the cache into the snapshot when the process exits, instead of the previously given
+    snapshot, which stops saving: its verdicts may have been made by other rules. None disables
+    the save. The atexit handler is registered once per process.
+    """
+    global exit_save
+    with exit_save_lock:
+        if exit_save is None:
+            atexit.register(run_exit_save)
+        elif exit_save[0] is not snapshot and exit_save[0] is not None:
+            exit_save[0].stop_saving()
+        exit_save = (snapshot, cache)
+
+
+def run_exit_save():
+    snapshot, cache = exit_save
+    if snapshot is not None:
+        snapshot.save(cache)
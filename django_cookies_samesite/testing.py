@@ -0,0 +1,231 @@
+import os
+import subprocess
+import sys
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.parsers import ParserBackend
+from django_cookies_samesite.user_agent_checker import UserAgentChecker
+
+# User-Agents covering every default rule and the clients easily mistaken for Chrome or Safari.
+VERDICT_SAMPLES = (
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/66.0.3359.181 Safari/537.36",
+        verdicts.BUGGY_CHROME,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/67.0.3396.87 Safari/537.36",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/49.0.2623.112 Safari/537.36",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Linux; Android 7.0; SM-G930F) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/64.0.3282.137 Mobile Safari/537.36",
+        verdicts.BUGGY_CHROME,
+    ),
+    (
+        "Mozilla/5.0 (Linux; Android 8.1.0; Pixel 2 Build/OPD3.170816.012; wv) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Version/4.0 Chrome/58.0.3029.83 Mobile Safari/537.36",
+        verdicts.BUGGY_CHROME,
+    ),
+    (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "HeadlessChrome/60.0.3112.78 Safari/537.36",
+        verdicts.BUGGY_CHROME,
+    ),
+    (
+        "Mozilla/5.0 (Linux; Android 7.0; SAMSUNG SM-G930F Build/NRD90M) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) SamsungBrowser/6.2 Chrome/56.0.2924.87 Mobile Safari/537.36",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/58.0.3029.110 Safari/537.36 Edge/16.16299",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/60.0.3112.113 Safari/537.36 OPR/47.0.2631.80",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Linux; U; Android 8.1.0; en-US; Nexus 6P Build/OPM7.181205.001) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Version/4.0 Chrome/57.0.2987.108 UCBrowser/12.11.1.1197 Mobile Safari/537.36",
+        verdicts.OLD_UC_BROWSER,
+    ),
+    (
+        "Mozilla/5.0 (Linux; U; Android 6.0.1; zh-CN; F5121 Build/34.0.A.1.247) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Version/4.0 Chrome/57.0.2987.108 UCBrowser/12.13.2.1208 Mobile Safari/537.36",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 12_4_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+        "Version/12.1.2 Mobile/15E148 Safari/604.1",
+        verdicts.IOS_12,
+    ),
+    (
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 12_4_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+        "CriOS/79.0.3945.73 Mobile/15E148 Safari/604.1",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (iPhone; CPU iPhone OS 13_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+        "Version/13.0.4 Mobile/15E148 Safari/604.1",
+        verdicts.COMPATIBLE,
+    ),
+    ("MyApp/5.2.1 CFNetwork/978.0.7 Darwin/18.7.0", verdicts.IOS_12),
+    (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+        "Version/13.0.4 Safari/605.1.15",
+        verdicts.MACOS_10_14_SAFARI,
+    ),
+    (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_2) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+        "Version/13.0.4 Safari/605.1.15",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/534.57.2 (KHTML, like Gecko) "
+        "Version/5.1.7 Safari/534.57.2",
+        verdicts.OTHER_INCOMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:72.0) Gecko/20100101 Firefox/72.0",
+        verdicts.COMPATIBLE,
+    ),
+    ("curl/7.64.1", verdicts.COMPATIBLE),
+    # The browsers built on Chrome, reported as Chrome by ua_parser only without a version of their own.
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/60.0.3112.113 Safari/537.36 Brave/60.0.3112.113",
+        verdicts.BUGGY_CHROME,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/58.0.3029.110 Safari/537.36 Core/1.58.3029.400 QQBrowser/10.0.2076.400",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Maxthon/5.2.1.6000 Chrome/63.0.3239.132 Safari/537.36",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Linux; U; Android 8.1.0; zh-cn; Redmi 5 Plus Build/OPM1.171019.019) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Version/4.0 Chrome/61.0.3163.128 Mobile Safari/537.36 XiaoMi/MiuiBrowser/9.4.8",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "MyApp/1.0.0 Chrome/61.0.3163.100 Electron/2.0.0 Safari/537.36",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/63.0.3239.84 Safari/537.36 Sleipnir/6.2.10",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/58.0.3029.110 Whale/1.0.37.16 Safari/537.36",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Linux; Android 7.0; SM-G930F Build/NRD90M) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/62.0.3202.84 Mobile Safari/537.36 Puffin/7.0.0.18914AP",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Linux; Android 8.0.0; SM-G950F Build/R16NW; wv) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Version/4.0 Chrome/65.0.3325.109 Mobile Safari/537.36 [Pinterest/Android]",
+        verdicts.COMPATIBLE,
+    ),
+    (
+        "Mozilla/5.0 (Linux; U; Android 7.0; zh-cn; MI 5s Build/NRD90M) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Version/4.0 Chrome/57.0.2987.132 MQQBrowser/8.0 Mobile Safari/537.36",
+        verdicts.COMPATIBLE,
+    ),
+)
+
+# Strings every backend has to survive.
+MALFORMED_USER_AGENTS = (
+    "",
+    " ",
+    "-",
+    "Mozilla/5.0 (",
+    "Chrome/",
+    "Safari/" + "9" * 100,
+    "Mozilla/5.0 " * 1000,
+)
+
+
+class ParserBackendConformanceMixin(object):
+    """
+    Checks every parser backend has to pass, mix it into a unittest.TestCase:
+
+        class MyBackendTests(ParserBackendConformanceMixin, unittest.TestCase):
+            parser_class = MyBackend
+    """
+
+    parser_class = None
+
+    def setUp(self):
+        super(ParserBackendConformanceMixin, self).setUp()
+        self.parser = self.parser_class()
+
+    def test_parser_backend(self):
+        self.assertIsInstance(self.parser, ParserBackend)
+        self.assertEqual(self.parser.fingerprint, self.parser_class().fingerprint)
+
+    def test_fields(self):
+        user_agents = [user_agent for user_agent, _ in VERDICT_SAMPLES]
+        for user_agent in user_agents + list(MALFORMED_USER_AGENTS):
+            for result in self.parser.parse(user_agent):
+                self.assertTrue(result["family"])
+                for part in ("major", "minor", "patch"):
+                    version = result.get(part)
+                    self.assertTrue(
+                        version is None or str(version).isdigit(),
+                        "{!r} has an invalid {} version {!r}".format(
+                            user_agent, part, version
+                        ),
+                    )
+
+    def test_verdicts(self):
+        for user_agent, rule in VERDICT_SAMPLES:
+            checker = UserAgentChecker(user_agent, parser=self.parser)
+            self.assertEqual(
+                checker.incompatibility_rule,
+                rule,
+                "{!r} should be {}, not {}".format(
+                    user_agent,
+                    verdicts.VERDICT_NAMES[rule],
+                    verdicts.VERDICT_NAMES[checker.incompatibility_rule],
+                ),
+            )
+
+
+def import_times(code):
+    """
+    Run the code in a fresh interpreter with ``python -X importtime`` (Python 3.7+),
+    return {module: cumulative import time in us}.
+    """
+    output = subprocess.check_output(
+        [sys.executable, "-X", "importtime", "-c", code],
+        # The directory django_cookies_samesite is imported from.
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split(":", 1)[1].split("|")
+        times[module.strip()] = int(cumulative)
+    return times
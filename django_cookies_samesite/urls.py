@@ -0,0 +1,9 @@
+from django.conf.urls import url
+
+from django_cookies_samesite import views
+
+app_name = "django_cookies_samesite"
+
+urlpatterns = [
+    url(r"^metrics/$", views.metrics, name="metrics"),
+]
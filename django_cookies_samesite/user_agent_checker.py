@@ -1,5 +1,78 @@
-from ua_parser import user_agent_parser
-import re
+from django_cookies_samesite import client_hints, parsers, rules, verdicts
+
+CHROME_RE = rules.CHROME_RE
+SAFARI_RE = rules.SAFARI_RE
+
+
+def get_val_in_int(val):
+    try:
+        return int(val or "0")
+    except (TypeError, ValueError):
+        return 0
+
+
+class ParsedClient(object):
+    """
+    The parts of a parsed User-Agent used by UserAgentChecker.
+
+    The families and integer versions are extracted once, so the checks don't have to
+    look them up and convert them again.
+    """
+
+    __slots__ = (
+        "string",
+        "browser_family",
+        "browser_major",
+        "browser_minor",
+        "browser_patch",
+        "os_family",
+        "os_major",
+        "os_minor",
+        "os_patch",
+        "browser_version",
+        "os_version",
+        "is_chrome",
+        "is_safari",
+        "browser_key",
+    )
+
+    def __init__(self, string, browser, os):
+        self.string = string
+        self.browser_family = browser.get("family") or ""
+        self.browser_major = get_val_in_int(browser.get("major"))
+        self.browser_minor = get_val_in_int(browser.get("minor"))
+        self.browser_patch = get_val_in_int(browser.get("patch"))
+        self.os_family = os.get("family") or ""
+        self.os_major = get_val_in_int(os.get("major"))
+        self.os_minor = get_val_in_int(os.get("minor"))
+        self.os_patch = get_val_in_int(os.get("patch"))
+        self.browser_version = (
+            self.browser_major,
+            self.browser_minor,
+            self.browser_patch,
+        )
+        self.os_version = (self.os_major, self.os_minor, self.os_patch)
+        self.is_chrome = CHROME_RE.search(self.browser_family) is not None
+        self.is_safari = (
+            not self.is_chrome and SAFARI_RE.search(self.browser_family) is not None
+        )
+        # The family name the rules match, all Chrome and Safari flavours are grouped.
+        if self.is_chrome:
+            self.browser_key = rules.CHROME
+        elif self.is_safari:
+            self.browser_key = rules.SAFARI
+        else:
+            self.browser_key = self.browser_family
+
+
+def parse_client(user_agent_string, parser=None):
+    """
+    Parse the browser and the OS of the User-Agent with the parser backend, ua_parser by default.
+
+    The device is never used so it's skipped.
+    """
+    browser, os = (parser or parsers.default_parser).parse(user_agent_string)
+    return ParsedClient(user_agent_string, browser, os)
 
 
 class UserAgentChecker:
@@ -17,21 +90,122 @@ class UserAgentChecker:
     MIN_MAC_OSX_VERSION_MAJOR = 10
     MIN_MAC_OSX_VERSION_MINOR = 14
 
-    def __init__(self, user_agent_string=""):
-        user_agent_parsed = user_agent_parser.Parse(
-            user_agent_string if user_agent_string else ""
+    def __init__(self, user_agent_string="", rule_engine=None, parser=None):
+        self.client = parse_client(
+            user_agent_string if user_agent_string else "", parser
+        )
+        self.rule_engine = rule_engine or rules.default_rule_engine
+
+    @classmethod
+    def from_client_hints(
+        cls,
+        sec_ch_ua,
+        sec_ch_ua_platform=None,
+        sec_ch_ua_platform_version=None,
+        rule_engine=None,
+    ):
+        """
+        Build the checker from the Sec-CH-UA headers instead of parsing the User-Agent.
+
+        Return None if the headers don't describe a known browser. The OS version is known
+        only if the client sent Sec-CH-UA-Platform-Version.
+        """
+        browser = client_hints.get_browser(sec_ch_ua or "")
+        if browser is None:
+            return None
+        checker = cls.__new__(cls)
+        checker.client = ParsedClient(
+            sec_ch_ua,
+            browser,
+            client_hints.get_os(sec_ch_ua_platform, sec_ch_ua_platform_version),
         )
-        self.user_agent = user_agent_parsed.get("user_agent", dict())
-        self.user_agent_os = user_agent_parsed.get("os", dict())
-        self.user_agent_device = user_agent_parsed.get("device", dict())
-        self.user_agent_string = user_agent_parsed.get("string", "")
+        checker.rule_engine = rule_engine or rules.default_rule_engine
+        return checker
+
+    @property
+    def user_agent(self):
+        # Kept for backward compatibility, the versions are integers.
+        return {
+            "family": self.client.browser_family,
+            "major": self.client.browser_major,
+            "minor": self.client.browser_minor,
+            "patch": self.client.browser_patch,
+        }
+
+    @property
+    def user_agent_os(self):
+        # Kept for backward compatibility, the versions are integers.
+        return {
+            "family": self.client.os_family,
+            "major": self.client.os_major,
+            "minor": self.client.os_minor,
+        }
+
+    @property
+    def user_agent_device(self):
+        # The device isn't parsed anymore.
+        return {}
+
+    @property
+    def user_agent_string(self):
+        return self.client.string
 
     @property
     def do_not_send_same_site_policy(self):
+        return bool(self.incompatibility_rule)
+
+    @classmethod
+    def classify_many(
+        cls, user_agent_strings, chunk_size=None, rule_engine=None, parser=None
+    ):
+        """
+        Return do_not_send_same_site_policy for every User-Agent, in the input order.
+
+        Every distinct User-Agent is classified once, like the middleware does with the rules
+        and the parser backend of its policy. With `chunk_size` a generator is returned,
+        it reads the input lazily and keeps at most `chunk_size` User-Agents in the memory.
+        """
+        if chunk_size is None:
+            return cls._classify_chunk(list(user_agent_strings), rule_engine, parser)
+        if chunk_size < 1:
+            raise ValueError("chunk_size should be a positive integer.")
+        return cls._iter_classify_many(
+            user_agent_strings, chunk_size, rule_engine, parser
+        )
+
+    @classmethod
+    def _iter_classify_many(cls, user_agent_strings, chunk_size, rule_engine, parser):
+        chunk = []
+        for user_agent_string in user_agent_strings:
+            chunk.append(user_agent_string)
+            if len(chunk) == chunk_size:
+                for verdict in cls._classify_chunk(chunk, rule_engine, parser):
+                    yield verdict
+                chunk = []
+        for verdict in cls._classify_chunk(chunk, rule_engine, parser):
+            yield verdict
+
+    @classmethod
+    def _classify_chunk(cls, user_agent_strings, rule_engine=None, parser=None):
+        # The classifier imports this module.
+        from django_cookies_samesite.classifier import get_incompatibility_rule
+
+        results = {}
+        for user_agent_string in user_agent_strings:
+            if user_agent_string not in results:
+                results[user_agent_string] = bool(
+                    get_incompatibility_rule(
+                        user_agent_string or "", rule_engine, parser
+                    )
+                )
+        return [results[user_agent_string] for user_agent_string in user_agent_strings]
+
+    @property
+    def incompatibility_rule(self):
+        """The rule from django_cookies_samesite.verdicts which makes the client incompatible."""
         if not self.user_agent_string:
-            return False
-        else:
-            return not (self.supported_browsers_os() or self.other_browsers())
+            return verdicts.COMPATIBLE
+        return self.rule_engine.classify(self.client)
 
     def supported_browsers_os(self):
         return (
@@ -56,83 +230,60 @@ class UserAgentChecker:
         return not (is_uc_or_chrome or is_safari_ios_mac_supported)
 
     def is_uc_browser(self):
-        return self.user_agent.get("family") == "UC Browser"
+        return self.client.browser_family == self.UC_BROWSER
 
     def is_uc_browser_in_least_supported_version(self):
-        major = self.get_val_in_int(self.user_agent.get("major"))
-        minor = self.get_val_in_int(self.user_agent.get("minor"))
-        build = self.get_val_in_int(self.user_agent.get("patch"))
-        if self.is_uc_browser():
-            if self.MIN_UC_BROWSER_VER_MAJOR == major:
-                if self.MIN_UC_BROWSER_VER_MINOR == minor:
-                    return self.MIN_UC_BROWSER_VER_BUILD <= build
-                else:
-                    return self.MIN_UC_BROWSER_VER_MINOR < minor
-            else:
-                return self.MIN_UC_BROWSER_VER_MAJOR < major
-        return False
-
-    def is_chrome_browser(self):
+        if not self.is_uc_browser():
+            return False
         return (
-            True
-            if re.search(self.CHROME_REGX, self.user_agent.get("family", ""))
-            else False
+            self.client.browser_major,
+            self.client.browser_minor,
+            self.client.browser_patch,
+        ) >= (
+            self.MIN_UC_BROWSER_VER_MAJOR,
+            self.MIN_UC_BROWSER_VER_MINOR,
+            self.MIN_UC_BROWSER_VER_BUILD,
         )
 
+    def is_chrome_browser(self):
+        return self.client.is_chrome
+
     def is_chrome_supported_version(self):
-        uav = self.get_val_in_int(self.user_agent.get("major"))
-        return (
-            True
-            if self.is_chrome_browser()
-            and (
-                self.BUGGY_CHROME_VERSION_MAJOR_MIN > uav
-                or uav > self.BUGGY_CHROME_VERSION_MAJOR_MAX
-            )
-            else False
+        return self.client.is_chrome and not (
+            self.BUGGY_CHROME_VERSION_MAJOR_MIN
+            <= self.client.browser_major
+            <= self.BUGGY_CHROME_VERSION_MAJOR_MAX
         )
 
     def get_user_agent_os_version(self, version_type):
-        return self.get_val_in_int(self.user_agent_os.get(version_type))
+        return getattr(self.client, "os_" + version_type)
 
     def get_user_agent_os_major(self):
-        return self.get_user_agent_os_version("major")
+        return self.client.os_major
 
     def get_user_agent_os_minor(self):
-        return self.get_user_agent_os_version("minor")
+        return self.client.os_minor
 
     def get_val_in_int(self, val):
-        try:
-            return int(val or "0")
-        except (TypeError, ValueError):
-            return 0
+        return get_val_in_int(val)
 
     def is_ios(self):
-        return self.user_agent_os.get("family") == self.IOS
+        return self.client.os_family == self.IOS
 
     def is_supported_ios_version(self):
-        return self.is_ios() and not (
-            self.get_user_agent_os_major() == self.MIN_IOS_VERSION
-        )
+        return self.is_ios() and self.client.os_major != self.MIN_IOS_VERSION
 
     def is_mac_osx(self):
-        return self.user_agent_os.get("family", "") == self.MAC_OSX
+        return self.client.os_family == self.MAC_OSX
 
     def is_supported_mac_osx_version(self):
-        if self.is_mac_osx():
-            is_min_mac_maj = (
-                self.get_user_agent_os_major() == self.MIN_MAC_OSX_VERSION_MAJOR
-            )
-            is_min_mac_min = (
-                self.get_user_agent_os_minor() == self.MIN_MAC_OSX_VERSION_MINOR
-            )
-            return not (is_min_mac_maj and is_min_mac_min)
-        return False
+        return self.is_mac_osx() and (self.client.os_major, self.client.os_minor) != (
+            self.MIN_MAC_OSX_VERSION_MAJOR,
+            self.MIN_MAC_OSX_VERSION_MINOR,
+        )
 
     def is_safari(self):
-        is_safari_reg_res = re.search(
-            self.SAFARI_REGX, self.user_agent.get("family", "")
-        )
-        return True if is_safari_reg_res and not self.is_chrome_browser() else False
+        return self.client.is_safari
 
     def is_supported_mac_osx_safari(self):
         return self.is_supported_mac_osx_version() and self.is_safari()
@@ -0,0 +1,110 @@
+import hashlib
+import io
+import mmap
+import os
+import struct
+
+# File layout: the header (magic, version, number of records) followed by records sorted by the hash.
+# The version identifies the rules and the parser the verdicts were made by, see
+# django_cookies_samesite.snapshot.get_snapshot_version. A record holds the rule from
+# django_cookies_samesite.verdicts, 0 for the compatible clients.
+MAGIC = b"DCSVT002"
+HEADER = struct.Struct("<8s20sQ")
+RECORD = struct.Struct("<QB")
+HASH = struct.Struct("<Q")
+
+
+def hash_user_agent(user_agent):
+    """64-bit hash of the User-Agent, the first 8 bytes of its SHA-1."""
+    return HASH.unpack(hashlib.sha1(user_agent.encode("utf-8")).digest()[:8])[0]
+
+
+def write_verdict_table(path, version, verdicts):
+    """
+    Write the (User-Agent, verdict) pairs into a verdict table at `path`.
+
+    Return the number of records.
+    """
+    return write_verdict_records(
+        path,
+        version,
+        ((hash_user_agent(user_agent), verdict) for user_agent, verdict in verdicts),
+    )
+
+
+def write_verdict_records(path, version, records):
+    """
+    Write the (User-Agent hash, verdict) pairs into a verdict table at `path`.
+
+    The file is written next to the target and renamed, so the workers which have
+    the previous version mapped keep reading a consistent table.
+    Return the number of records.
+    """
+    records = sorted(
+        set((user_agent_hash, int(verdict)) for user_agent_hash, verdict in records)
+    )
+    tmp_path = "{}.tmp".format(path)
+    with io.open(tmp_path, "wb") as table_file:
+        table_file.write(HEADER.pack(MAGIC, version, len(records)))
+        for record in records:
+            table_file.write(RECORD.pack(*record))
+    os.rename(tmp_path, path)
+    return len(records)
+
+
+class StaleVerdictTable(ValueError):
+    pass
+
+
+class VerdictTable(object):
+    """
+    Read-only table of precomputed verdicts mapped into the memory.
+
+    The pages are shared by all the processes which map the same file, so every worker
+    gets the whole table without building its own copy. The lookup is a binary search
+    over the sorted hashes.
+
+    A table built with another version than `version` (e.g. by other rules) raises
+    StaleVerdictTable, None accepts any version.
+    """
+
+    def __init__(self, path, version=None):
+        self.path = path
+        with io.open(path, "rb") as table_file:
+            self._mmap = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < HEADER.size:
+            raise ValueError("{} is not a verdict table.".format(path))
+        magic, self.version, self._size = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or len(self._mmap) != HEADER.size + self._size * RECORD.size:
+            raise ValueError("{} is not a verdict table.".format(path))
+        if version is not None and self.version != version:
+            self._mmap.close()
+            raise StaleVerdictTable(
+                "{} was built for other rules or another parser.".format(path)
+            )
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, user_agent):
+        return self.get(user_agent) is not None
+
+    def get(self, user_agent, default=None):
+        """Return the rule for the User-Agent or `default` if it's not in the table."""
+        user_agent_hash = hash_user_agent(user_agent)
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD.size
+            record_hash = HASH.unpack_from(self._mmap, offset)[0]
+            if record_hash < user_agent_hash:
+                low = middle + 1
+            elif record_hash > user_agent_hash:
+                high = middle
+            else:
+                return RECORD.unpack_from(self._mmap, offset)[1]
+        return default
+
+    def close(self):
+        self._mmap.close()
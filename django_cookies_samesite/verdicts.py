@@ -0,0 +1,42 @@
+from collections import namedtuple
+
+# Reasons why the SameSite policy is withheld from a client.
+# Refer (https://www.chromium.org/updates/same-site/incompatible-clients)
+COMPATIBLE = 0
+BUGGY_CHROME = 1
+OLD_UC_BROWSER = 2
+IOS_12 = 3
+MACOS_10_14_SAFARI = 4
+OTHER_INCOMPATIBLE = 5
+CUSTOM_RULE = 6
+
+VERDICT_NAMES = {
+    COMPATIBLE: "compatible",
+    BUGGY_CHROME: "Chrome 51-66",
+    OLD_UC_BROWSER: "UC Browser < 12.13.2",
+    IOS_12: "iOS 12",
+    MACOS_10_14_SAFARI: "Safari on macOS 10.14",
+    OTHER_INCOMPATIBLE: "other incompatible",
+    CUSTOM_RULE: "custom rule",
+}
+
+# How the client was classified.
+USER_AGENT_PATH = "user_agent"
+CLIENT_HINTS_PATH = "client_hints"
+
+
+class SameSiteCompatibility(namedtuple("SameSiteCompatibility", ["rule", "path"])):
+    """The verdict for a client, available to the views as request.samesite_compatibility."""
+
+    __slots__ = ()
+
+    def __new__(cls, rule, path=USER_AGENT_PATH):
+        return super(SameSiteCompatibility, cls).__new__(cls, rule, path)
+
+    @property
+    def compatible(self):
+        return self.rule == COMPATIBLE
+
+    @property
+    def name(self):
+        return VERDICT_NAMES.get(self.rule, "unknown")
@@ -0,0 +1,10 @@
+from django.http import Http404, HttpResponse
+
+from django_cookies_samesite.prometheus import CONTENT_TYPE, metrics_collector
+
+
+def metrics(request):
+    """The metrics of the middleware in the Prometheus text format, 404 unless DCS_PROMETHEUS_METRICS is set."""
+    if not metrics_collector.connected:
+        raise Http404("The metrics are disabled.")
+    return HttpResponse(metrics_collector.render(), content_type=CONTENT_TYPE)
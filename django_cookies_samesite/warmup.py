@@ -0,0 +1,58 @@
+import io
+import os
+
+from django_cookies_samesite.cache import verdict_cache, warm_verdict_cache
+from django_cookies_samesite.classifier import get_incompatibility_rule
+from django_cookies_samesite.policy import get_verdicts_fingerprint, load_policy
+from django_cookies_samesite.user_agent_checker import parse_client
+
+# The most common User-Agents, shipped with the package.
+DEFAULT_CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "user_agents.txt")
+
+
+def read_user_agents(paths):
+    """
+    Yield the User-Agents from the corpus files, one per line.
+
+    Blank lines and lines starting with # are skipped, "weight<TAB>User-Agent" lines
+    (the format of the benchmarks corpus) are accepted as well.
+    """
+    for path in paths:
+        with io.open(path, encoding="utf-8", errors="ignore") as corpus:
+            for line in corpus:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield line.rsplit("\t", 1)[-1]
+
+
+def warm_up(corpus_paths=None):
+    """
+    Get the process ready to serve requests without cold-parse latency spikes.
+
+    The ua_parser regexes are compiled and the verdict cache is filled with the User-Agents
+    from the corpus files, the bundled list of the most common User-Agents by default.
+    Call it before the workers are forked (e.g. with gunicorn --preload), so all of them
+    share the result copy-on-write. Return the number of warmed up verdicts.
+    """
+    policy = load_policy()
+    if policy.django_supports_samesite:
+        return 0
+
+    verdict_cache.resize(policy.ua_cache_size)
+    verdict_cache.use_rules(get_verdicts_fingerprint(policy.rule_engine, policy.parser))
+    # Imports ua_parser, which compiles its regex database.
+    parse_client("", policy.parser)
+
+    user_agents = (
+        policy.canonicalizer(user_agent)
+        for user_agent in read_user_agents(corpus_paths or [DEFAULT_CORPUS_PATH])
+    )
+    return len(
+        warm_verdict_cache(
+            user_agents,
+            lambda user_agent: get_incompatibility_rule(
+                user_agent, policy.rule_engine, policy.parser
+            ),
+            policy.shared_verdict_cache,
+        )
+    )
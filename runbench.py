@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# -*- coding: utf-8
+"""
+Run the benchmarks from the benchmarks package and compare them with a stored baseline.
+
+    python runbench.py                              # run everything, compare with the baseline
+    python runbench.py bench_cookies                # run selected benchmarks
+    python runbench.py --save-baseline              # store the results as the new baseline
+
+Every timing is reported in microseconds (keys ending with "_us"), lower is better.
+"""
+from __future__ import print_function, unicode_literals, absolute_import
+
+import argparse
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+BENCHMARKS = [
+    'bench_user_agent_checker',
+    'bench_middleware',
+    'bench_cookies',
+    'bench_asgi',
+    'bench_import',
+    'bench_parsers',
+    'bench_wsgi',
+]
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+
+
+def run_benchmarks(names):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    import django
+    django.setup()
+
+    results = {}
+    for name in names:
+        module = importlib.import_module('benchmarks.{}'.format(name))
+        print('Running {}...'.format(name), file=sys.stderr)
+        results[name] = module.run()
+    return results
+
+
+def get_environment():
+    import django
+    import ua_parser
+
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'ua_parser': '.'.join(str(part) for part in ua_parser.VERSION),
+        'platform': platform.platform(),
+        'timestamp': int(time.time()),
+    }
+
+
+def iter_timings(results, prefix=''):
+    for key, value in sorted(results.items()):
+        path = '{}{}'.format(prefix, key)
+        if isinstance(value, dict):
+            for timing in iter_timings(value, path + '.'):
+                yield timing
+        elif key.endswith('_us'):
+            yield path, value
+
+
+def find_regressions(results, baseline, tolerance):
+    """Return (name, baseline, current) of every timing which got slower than the tolerance."""
+    baseline_timings = dict(iter_timings(baseline))
+    regressions = []
+    for name, value in iter_timings(results):
+        previous = baseline_timings.get(name)
+        if previous and value > previous * (1 + tolerance):
+            regressions.append((name, previous, value))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*', default=BENCHMARKS, help='benchmarks to run')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='JSON file with the baseline results')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against the baseline (default: 0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    report = {
+        'environment': get_environment(),
+        'results': run_benchmarks(args.benchmarks),
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    print(output)
+
+    if args.output:
+        with io.open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output)
+
+    if args.save_baseline:
+        with io.open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            baseline_file.write(output)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline found at {}, skipping the comparison.'.format(args.baseline), file=sys.stderr)
+        return 0
+
+    with io.open(args.baseline, encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)['results']
+
+    regressions = find_regressions(report['results'], baseline, args.tolerance)
+    for name, previous, value in regressions:
+        print('REGRESSION {}: {:.2f}us -> {:.2f}us'.format(name, previous, value), file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,23 @@
+# -*- encoding: utf-8 -*-
+import os
+import shutil
+import tempfile
+
+# Chrome 51-66 rejects the SameSite=None cookies, the full ua_parser run classifies it.
+CHROME_66 = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/66.0.3334.0 Safari/537.36'
+)
+FIREFOX = 'Mozilla/5.0 (Windows NT 6.1; Win64; x64; rv:47.0) Gecko/20100101 Firefox/47.0'
+
+
+class TemporaryDirectoryMixin(object):
+    """Gives every test an empty self.directory, removed after the test, and the self.file_path of a file in it."""
+
+    file_name = 'file'
+
+    def setUp(self):
+        super(TemporaryDirectoryMixin, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.file_path = os.path.join(self.directory, self.file_name)
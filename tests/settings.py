@@ -18,6 +18,7 @@ ROOT_URLCONF = 'tests.urls'
 
 INSTALLED_APPS = [
     'django.contrib.sessions',
+    'django_cookies_samesite',
 ]
 
 MIDDLEWARE = [
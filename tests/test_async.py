@@ -0,0 +1,100 @@
+# -*- encoding: utf-8 -*-
+import threading
+import unittest
+
+import django
+
+from mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache, make_cache_key, verdict_cache
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from tests.helpers import FIREFOX
+
+try:
+    from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+except ImportError:
+    async_to_sync = None
+
+
+def cookies_response(request):
+    response = HttpResponse('cookies!')
+    response.set_cookie('sessionid', 'something')
+    response.set_cookie('custom_cookie', 'something')
+    return response
+
+
+@unittest.skipIf(async_to_sync is None, 'requires asgiref')
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class AsyncMiddlewareTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+        self.request = RequestFactory().get('/', HTTP_USER_AGENT=FIREFOX)
+
+    def test_capabilities(self):
+        self.assertTrue(CookiesSameSite.sync_capable)
+        self.assertTrue(CookiesSameSite.async_capable)
+
+    def test_sync_get_response(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax'):
+            middleware = CookiesSameSite(cookies_response)
+            self.assertFalse(iscoroutinefunction(middleware))
+
+            response = middleware(self.request)
+            self.assertEqual(response.cookies['sessionid']['samesite'], 'Lax')
+
+    def test_async_get_response(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax'):
+            middleware = CookiesSameSite(sync_to_async(cookies_response))
+            self.assertTrue(iscoroutinefunction(middleware))
+
+            response = async_to_sync(middleware)(self.request)
+            self.assertEqual(response.cookies['sessionid']['samesite'], 'Lax')
+            self.assertEqual(response.cookies['custom_cookie']['samesite'], '')
+
+    def get_threads(self, **settings):
+        """Return the threads of the event loop and of the User-Agent classification."""
+        threads = {}
+
+        async def view(request):
+            threads['loop'] = threading.current_thread()
+            return cookies_response(request)
+
+        def classify(*args):
+            threads['classify'] = threading.current_thread()
+            return verdicts.COMPATIBLE
+
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', **settings):
+            with patch('django_cookies_samesite.middleware.get_incompatibility_rule', side_effect=classify):
+                response = async_to_sync(CookiesSameSite(view))(self.request)
+        self.assertEqual(response.cookies['sessionid']['samesite'], 'Lax')
+        return threads
+
+    def test_user_agent_is_parsed_in_a_thread(self):
+        threads = self.get_threads()
+        self.assertNotEqual(threads['classify'], threads['loop'])
+        self.assertEqual(verdict_cache.get(make_cache_key(FIREFOX)), verdicts.COMPATIBLE)
+
+    def test_cached_verdict_is_used_on_the_event_loop(self):
+        verdict_cache.set(make_cache_key(FIREFOX), verdicts.COMPATIBLE)
+        with patch('django_cookies_samesite.async_support.sync_to_async') as adapt:
+            threads = self.get_threads()
+        self.assertNotIn('classify', threads)
+        adapt.assert_not_called()
+
+    def test_profiled_response_is_processed_in_a_thread(self):
+        threads = []
+
+        def process_response(middleware, request, response):
+            threads.append(threading.current_thread())
+            return response
+
+        with patch.object(CookiesSameSite, 'process_response', autospec=True, side_effect=process_response):
+            with self.settings(DCS_PROFILE_SAMPLE_RATE=100, DCS_PROFILE_DIRECTORY='/tmp/profiles'):
+                async_to_sync(CookiesSameSite(sync_to_async(cookies_response)))(self.request)
+        # The thread sensitive sync_to_async runs in the thread which called async_to_sync.
+        self.assertEqual(threads, [threading.current_thread()])
@@ -0,0 +1,202 @@
+# -*- encoding: utf-8 -*-
+import shutil
+import tempfile
+import unittest
+
+import django
+
+from mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import (
+    SharedVerdictCache, VerdictCache, clear_verdict_cache, make_cache_key, verdict_cache, warm_verdict_cache,
+)
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from django_cookies_samesite.user_agent_checker import parse_client
+from tests.helpers import CHROME_66
+
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'verdicts': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'verdicts'},
+}
+
+
+class VerdictCacheTests(unittest.TestCase):
+    def test_get_and_set(self):
+        cache = VerdictCache(maxsize=2)
+        self.assertIsNone(cache.get('ua'))
+        cache.set('ua', True)
+        self.assertEqual(cache.get('ua'), True)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 2})
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = VerdictCache(maxsize=2)
+        cache.set('a', True)
+        cache.set('b', False)
+        cache.get('a')
+        cache.set('c', False)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_resize_and_clear(self):
+        cache = VerdictCache(maxsize=3)
+        for key in 'abc':
+            cache.set(key, False)
+        cache.resize(1)
+        self.assertEqual(len(cache), 1)
+        self.assertIn('c', cache)
+
+        cache.clear()
+        self.assertEqual(cache.stats(), {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0, 'maxsize': 1})
+
+    def test_disabled_cache(self):
+        cache = VerdictCache(maxsize=0)
+        self.assertEqual(cache.get_or_set('ua', lambda key: True), True)
+        self.assertEqual(len(cache), 0)
+
+
+class MiddlewareVerdictCacheTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+
+    def tearDown(self):
+        clear_verdict_cache()
+
+    def test_invalid_cache_size(self):
+        with self.settings(DCS_UA_CACHE_SIZE='big'):
+            with self.assertRaises(ValueError) as exc:
+                CookiesSameSite()
+            self.assertEqual(exc.exception.args[0], 'UA_CACHE_SIZE should be a non-negative integer.')
+
+    def test_cache_size_setting(self):
+        with self.settings(DCS_UA_CACHE_SIZE=10):
+            CookiesSameSite()
+            self.assertEqual(verdict_cache.maxsize, 10)
+
+    @unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+    def test_user_agent_is_parsed_once(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax'):
+            with patch('django_cookies_samesite.user_agent_checker.parse_client',
+                       wraps=parse_client) as parse:
+                for _ in range(3):
+                    self.client.get('/cookies-test/', HTTP_USER_AGENT=CHROME_66)
+
+            self.assertEqual(parse.call_count, 1)
+            self.assertEqual(verdict_cache.hits, 2)
+            self.assertEqual(verdict_cache.misses, 1)
+
+
+class SharedVerdictCacheMixin(object):
+    def setUp(self):
+        clear_verdict_cache()
+        caches['verdicts'].clear()
+        self.cache = SharedVerdictCache('verdicts', timeout=60)
+
+    def tearDown(self):
+        clear_verdict_cache()
+        caches['verdicts'].clear()
+
+    def test_get_and_set(self):
+        self.assertIsNone(self.cache.get('ua'))
+        self.cache.set('ua', verdicts.IOS_12)
+        self.cache.set('other', verdicts.COMPATIBLE)
+        self.assertEqual(self.cache.get('ua'), verdicts.IOS_12)
+        self.assertEqual(self.cache.get('other'), verdicts.COMPATIBLE)
+
+    def test_keys_are_versioned_hashes(self):
+        key = self.cache.make_key('Mozilla/5.0 ' * 100)
+        self.assertTrue(key.startswith(SharedVerdictCache.key_prefix))
+        self.assertEqual(len(key), len(SharedVerdictCache.key_prefix) + 40)
+
+    def test_get_many_and_set_many(self):
+        self.cache.set_many({'a': verdicts.BUGGY_CHROME, 'b': verdicts.COMPATIBLE})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': verdicts.BUGGY_CHROME, 'b': verdicts.COMPATIBLE}
+        )
+
+    def test_warm_verdict_cache(self):
+        self.cache.set('shared', verdicts.IOS_12)
+        verdict_cache.set(make_cache_key('local'), verdicts.COMPATIBLE)
+        computed = []
+
+        def compute(user_agent):
+            computed.append(user_agent)
+            return verdicts.BUGGY_CHROME
+
+        rules = warm_verdict_cache(['local', 'shared', 'new', 'new'], compute, self.cache)
+
+        self.assertEqual(rules, {
+            'local': verdicts.COMPATIBLE, 'shared': verdicts.IOS_12, 'new': verdicts.BUGGY_CHROME,
+        })
+        self.assertEqual(computed, ['new'])
+        self.assertEqual(self.cache.get('new'), verdicts.BUGGY_CHROME)
+        self.assertEqual(verdict_cache.get(make_cache_key('shared')), verdicts.IOS_12)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LocMemSharedVerdictCacheTests(SharedVerdictCacheMixin, TestCase):
+    pass
+
+
+class FileBasedSharedVerdictCacheTests(SharedVerdictCacheMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_dir = tempfile.mkdtemp()
+        cls.settings_override = override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'verdicts': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cls.cache_dir},
+        })
+        cls.settings_override.enable()
+        super(FileBasedSharedVerdictCacheTests, cls).setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super(FileBasedSharedVerdictCacheTests, cls).tearDownClass()
+        cls.settings_override.disable()
+        shutil.rmtree(cls.cache_dir, ignore_errors=True)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class MiddlewareSharedVerdictCacheTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        caches['verdicts'].clear()
+
+    def tearDown(self):
+        clear_verdict_cache()
+        caches['verdicts'].clear()
+
+    def test_unknown_cache_alias(self):
+        with self.settings(DCS_UA_CACHE_ALIAS='missing'):
+            with self.assertRaises(ValueError) as exc:
+                CookiesSameSite()
+            self.assertEqual(exc.exception.args[0], 'UA_CACHE_ALIAS should be one of the caches configured in CACHES.')
+
+    def test_invalid_cache_timeout(self):
+        with self.settings(DCS_UA_CACHE_ALIAS='verdicts', DCS_UA_CACHE_TIMEOUT=0):
+            with self.assertRaises(ValueError) as exc:
+                CookiesSameSite()
+            self.assertEqual(exc.exception.args[0], 'UA_CACHE_TIMEOUT should be a positive integer or None.')
+
+    def test_shared_cache_is_disabled_by_default(self):
+        self.assertIsNone(CookiesSameSite().policy.shared_verdict_cache)
+
+    @unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+    def test_verdict_is_shared_between_processes(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', DCS_UA_CACHE_ALIAS='verdicts'):
+            with patch('django_cookies_samesite.user_agent_checker.parse_client',
+                       wraps=parse_client) as parse:
+                self.client.get('/cookies-test/', HTTP_USER_AGENT=CHROME_66)
+                # a fresh process starts with an empty in-process cache
+                clear_verdict_cache()
+                self.client.get('/cookies-test/', HTTP_USER_AGENT=CHROME_66)
+
+            self.assertEqual(parse.call_count, 1)
+            self.assertIsNotNone(SharedVerdictCache('verdicts').get(CHROME_66))
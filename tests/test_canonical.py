@@ -0,0 +1,100 @@
+# -*- encoding: utf-8 -*-
+import io
+import os
+import unittest
+
+import django
+
+from mock import patch
+
+from django.test import TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache, make_cache_key, verdict_cache
+from django_cookies_samesite.canonical import UserAgentCanonicalizer
+from django_cookies_samesite.classifier import get_incompatibility_rule
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION
+from django_cookies_samesite.parsers import MinimalBackend
+from django_cookies_samesite.policy import load_canonicalizer, load_policy
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'user_agents.txt')
+CHROME_66_MOBILE = (
+    'Mozilla/5.0 (Linux; Android 8.0.0; SM-G960F Build/R16NW) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/66.0.3359.158 Mobile Safari/537.36'
+)
+
+
+class UserAgentCanonicalizerTests(unittest.TestCase):
+    def test_whitespace_and_length(self):
+        canonicalize = UserAgentCanonicalizer(max_length=20)
+        self.assertEqual(canonicalize('  Mozilla/5.0\t (X11;\n Linux) '), 'Mozilla/5.0 (X11;')
+        self.assertEqual(canonicalize(''), '')
+        self.assertEqual(canonicalize('Mozilla/5.0 ' + 'x' * 10 ** 6), 'Mozilla/5.0 xxxxxxxx')
+
+    def test_strip_tokens(self):
+        self.assertEqual(UserAgentCanonicalizer()(CHROME_66_MOBILE), CHROME_66_MOBILE)
+        self.assertEqual(
+            UserAgentCanonicalizer(strip_tokens=True)(CHROME_66_MOBILE),
+            'Mozilla/5.0 (Linux; Android 8.0.0; SM-G960F) AppleWebKit/537.36 (KHTML, like Gecko) '
+            'Chrome/66.0.3359.0 Mobile Safari/537.36',
+        )
+
+    def test_verdicts_are_preserved(self):
+        canonicalize = UserAgentCanonicalizer(strip_tokens=True)
+        with io.open(CORPUS_PATH, encoding='utf-8') as corpus:
+            user_agents = [line.strip() for line in corpus if line.strip() and not line.startswith('#')]
+        for parser in (None, MinimalBackend()):
+            for user_agent in user_agents:
+                self.assertEqual(
+                    get_incompatibility_rule(canonicalize(user_agent), parser=parser),
+                    get_incompatibility_rule(user_agent, parser=parser),
+                    user_agent,
+                )
+
+
+class LoadCanonicalizationTests(TestCase):
+    def test_defaults(self):
+        self.assertEqual(load_canonicalizer(), UserAgentCanonicalizer(512, False))
+
+    def test_settings(self):
+        with self.settings(DCS_UA_MAX_LENGTH=256, DCS_UA_STRIP_TOKENS=True):
+            self.assertEqual(load_canonicalizer(), UserAgentCanonicalizer(256, True))
+
+    def test_invalid_settings(self):
+        for settings, message in (
+            ({'DCS_UA_MAX_LENGTH': 0}, 'UA_MAX_LENGTH'),
+            ({'DCS_UA_MAX_LENGTH': '512'}, 'UA_MAX_LENGTH'),
+        ):
+            with self.settings(**settings):
+                with self.assertRaisesRegex(ValueError, message):
+                    load_policy()
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class MiddlewareCanonicalizationTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+
+    def get(self, user_agent, **settings):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True, **settings):
+            response = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=user_agent)
+        return response.cookies['custom_cookie']['samesite']
+
+    def test_cache_key(self):
+        self.assertEqual(self.get(CHROME_66_MOBILE), '')
+        self.assertEqual(verdict_cache.items(), [(make_cache_key(CHROME_66_MOBILE), verdicts.BUGGY_CHROME)])
+
+    def test_near_duplicates_share_the_verdict(self):
+        with patch(
+            'django_cookies_samesite.middleware.get_incompatibility_rule', return_value=verdicts.BUGGY_CHROME,
+        ) as get_rule:
+            self.assertEqual(self.get(CHROME_66_MOBILE, DCS_UA_STRIP_TOKENS=True), '')
+            self.assertEqual(self.get(CHROME_66_MOBILE.replace('3359.158', '3359.181'), DCS_UA_STRIP_TOKENS=True), '')
+            self.assertEqual(self.get(CHROME_66_MOBILE.replace(' ', '  '), DCS_UA_STRIP_TOKENS=True), '')
+        self.assertEqual(get_rule.call_count, 1)
+
+    def test_long_user_agent_is_truncated(self):
+        with patch('django_cookies_samesite.middleware.get_incompatibility_rule', return_value=0) as get_rule:
+            self.get(CHROME_66_MOBILE + ' x' * 10000, DCS_UA_MAX_LENGTH=len(CHROME_66_MOBILE))
+        get_rule.assert_called_once_with(CHROME_66_MOBILE, None, None)
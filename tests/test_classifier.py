@@ -0,0 +1,76 @@
+# -*- encoding: utf-8 -*-
+import io
+import os
+import unittest
+
+from ddt import ddt, data, unpack
+from mock import patch
+
+from django_cookies_samesite.classifier import fast_path_stats, get_do_not_send_same_site_policy, preclassify
+from django_cookies_samesite.user_agent_checker import UserAgentChecker, parse_client
+
+USER_AGENTS_PATH = os.path.join(os.path.dirname(__file__), 'user_agents.txt')
+
+
+def load_user_agents():
+    with io.open(USER_AGENTS_PATH, encoding='utf-8') as user_agents:
+        return [line.rstrip('\n') for line in user_agents if line.strip()]
+
+
+@ddt
+class PreclassifierTests(unittest.TestCase):
+    def setUp(self):
+        fast_path_stats.reset()
+
+    @data(
+        # Firefox
+        ('Mozilla/5.0 (Windows NT 6.1; Win64; x64; rv:47.0) Gecko/20100101 Firefox/47.0', False),
+        # Chrome outside of the buggy versions
+        ('Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/67.0.2704.103 Safari/537.36',
+         False),
+        # Safari on iOS 12
+        ('Mozilla/5.0 (iPhone; CPU iPhone OS 12_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+         'Version/12.0 Mobile/15E148 Safari/604.1', True),
+        # Safari on iOS 13
+        ('Mozilla/5.0 (iPad; CPU OS 13_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+         'Version/13.0 Mobile/15E148 Safari/604.1', False),
+        # Safari on Mac OS X 10.14
+        ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/12.0 '
+         'Safari/605.1.15', True),
+        # Browsers built on Safari which ua_parser reports under their own name
+        ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+         'Version/12.1.2 Safari/605.1.15 Epiphany/605.1.15', None),
+        ('Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) '
+         'Version/12.1.2 Safari/605.1.15 Edg/18', None),
+        # Buggy Chrome needs the full check because e.g. Opera sends the same token
+        ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 '
+         'Safari/537.36 OPR/47.0.2631.80', None),
+        # UC Browser
+        ('Mozilla/5.0 (Linux; U; Android 6.0.1; zh-CN; F5121 Build/34.0.A.1.247) AppleWebKit/537.36 (KHTML, like '
+         'Gecko) Version/4.0 Chrome/40.0.2214.89 UCBrowser/11.5.1.944 Mobile Safari/537.36', None),
+        # Apps on iOS
+        ('MyApp/1.0 CFNetwork/978.0.7 Darwin/18.0.0', None),
+    )
+    @unpack
+    def test_preclassify(self, user_agent, verdict):
+        self.assertEqual(preclassify(user_agent), verdict)
+
+    def test_preclassify_agrees_with_user_agent_checker(self):
+        """Every definitive verdict of the fast path has to match the full check."""
+        for user_agent in load_user_agents():
+            verdict = preclassify(user_agent)
+            if verdict is not None:
+                self.assertEqual(
+                    verdict, UserAgentChecker(user_agent).do_not_send_same_site_policy, user_agent
+                )
+
+    def test_fast_path_stats(self):
+        with patch('django_cookies_samesite.user_agent_checker.parse_client',
+                   wraps=parse_client) as parse:
+            get_do_not_send_same_site_policy('curl/7.64.1')
+            get_do_not_send_same_site_policy('MyApp/1.0 CFNetwork/978.0.7 Darwin/18.0.0')
+
+        parse.assert_called_once_with('MyApp/1.0 CFNetwork/978.0.7 Darwin/18.0.0', None)
+        self.assertEqual(fast_path_stats.hits, 1)
+        self.assertEqual(fast_path_stats.misses, 1)
+        self.assertEqual(fast_path_stats.hit_ratio, 0.5)
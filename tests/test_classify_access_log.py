@@ -0,0 +1,80 @@
+# -*- encoding: utf-8 -*-
+import gzip
+import io
+import os
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.management.commands.classify_access_log import extract_user_agent
+from django_cookies_samesite.snapshot import get_snapshot_version
+from django_cookies_samesite.verdict_table import VerdictTable
+from tests.helpers import CHROME_66, FIREFOX, TemporaryDirectoryMixin
+
+IOS_12 = (
+    'Mozilla/5.0 (iPhone; CPU iPhone OS 12_0 like Mac OS X) AppleWebKit/604.1.21 (KHTML, like Gecko) '
+    'Version/12.0 Mobile/17A6278a Safari/602.1.26'
+)
+
+
+def log_line(user_agent):
+    return (
+        '127.0.0.1 - - [10/Oct/2020:13:55:36 +0000] "GET / HTTP/1.1" 200 2326 '
+        '"https://example.com/" "{}"\n'.format(user_agent)
+    )
+
+
+class ClassifyAccessLogCommandTests(TemporaryDirectoryMixin, TestCase):
+    file_name = 'access.log.gz'
+
+    def setUp(self):
+        super(ClassifyAccessLogCommandTests, self).setUp()
+        with gzip.open(self.file_path, 'wb') as log:
+            for user_agent in [CHROME_66, FIREFOX, FIREFOX, IOS_12, FIREFOX, CHROME_66, '-']:
+                log.write(log_line(user_agent).encode('utf-8'))
+
+    def classify(self, *paths, **options):
+        stdout = io.StringIO()
+        call_command('classify_access_log', *paths, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_extract_user_agent(self):
+        self.assertEqual(extract_user_agent(log_line(FIREFOX).encode('utf-8')), FIREFOX)
+        self.assertEqual(extract_user_agent(u'{}\n'.format(FIREFOX).encode('utf-8')), FIREFOX)
+        self.assertEqual(extract_user_agent(u'Mozilla/5.0 (Żółw)'.encode('utf-8')), 'Mozilla/5.0 (w)')
+        self.assertEqual(extract_user_agent(log_line('-').encode('utf-8')), '')
+
+    def test_report(self):
+        output = self.classify(self.file_path, jobs=1)
+
+        self.assertIn('6 requests, 3 distinct User-Agents', output)
+        self.assertRegex(output, r'send SameSite\s+3\s+50.00\s+1\s+33.33')
+        self.assertRegex(output, r'withhold SameSite\s+3\s+50.00\s+2\s+66.67')
+        self.assertRegex(output, r'Chrome 51-66\s+2\s+33.33\s+1\s+33.33')
+        self.assertRegex(output, r'iOS 12\s+1\s+16.67\s+1\s+33.33')
+        self.assertRegex(output, r'UC Browser < 12.13.2\s+0\s+0.00\s+0\s+0.00')
+
+    def test_worker_processes(self):
+        plain_path = os.path.join(self.directory, 'user_agents.txt')
+        with io.open(plain_path, 'w', encoding='utf-8') as user_agents:
+            user_agents.write(u'{}\n{}\n'.format(FIREFOX, IOS_12))
+
+        output = self.classify(self.file_path, plain_path, jobs=2, chunk_size=1)
+        self.assertIn('8 requests, 3 distinct User-Agents', output)
+        self.assertRegex(output, r'withhold SameSite\s+4\s+50.00\s+2\s+66.67')
+
+    def test_verdict_table(self):
+        table_path = os.path.join(self.directory, 'verdicts.bin')
+        output = self.classify(self.file_path, jobs=1, verdict_table=table_path)
+        self.assertIn('Wrote 3 verdicts', output)
+
+        table = VerdictTable(table_path, get_snapshot_version())
+        self.addCleanup(table.close)
+        self.assertEqual(table.get(CHROME_66), verdicts.BUGGY_CHROME)
+        self.assertEqual(table.get(IOS_12), verdicts.IOS_12)
+        self.assertEqual(table.get(FIREFOX), verdicts.COMPATIBLE)
+
+    def test_missing_log(self):
+        with self.assertRaises(CommandError):
+            self.classify(os.path.join(self.directory, 'missing.log'), jobs=1)
@@ -0,0 +1,102 @@
+# -*- encoding: utf-8 -*-
+import unittest
+
+import django
+
+from ddt import ddt, data, unpack
+from mock import patch
+
+from django.test import TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache
+from django_cookies_samesite.classifier import get_client_hints_rule, get_incompatibility_rule
+from django_cookies_samesite.client_hints import get_browser, get_os, parse_brands
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION
+from django_cookies_samesite.user_agent_checker import UserAgentChecker
+
+CHROME_91_HINTS = '" Not;A Brand";v="99", "Google Chrome";v="91", "Chromium";v="91"'
+EDGE_92_HINTS = '"Chromium";v="92", " Not A;Brand";v="99", "Microsoft Edge";v="92"'
+CHROME_91 = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/91.0.4472.124 Safari/537.36'
+)
+
+
+@ddt
+class ClientHintsTests(unittest.TestCase):
+    def test_parse_brands_skips_grease(self):
+        self.assertEqual(parse_brands(CHROME_91_HINTS), [('Google Chrome', '91'), ('Chromium', '91')])
+        self.assertEqual(parse_brands('"Not A(Brand";v="24"'), [])
+
+    @unpack
+    @data(
+        (CHROME_91_HINTS, {'family': 'Chrome', 'major': '91'}),
+        (EDGE_92_HINTS, {'family': 'Edge', 'major': '92'}),
+        ('"Chromium";v="90"', {'family': 'Chromium', 'major': '90'}),
+        ('"Opera";v="77", "Chromium";v="91"', {'family': 'Opera', 'major': '77'}),
+        ('', None),
+        ('garbage', None),
+    )
+    def test_get_browser(self, sec_ch_ua, expected):
+        self.assertEqual(get_browser(sec_ch_ua), expected)
+
+    def test_get_os(self):
+        self.assertEqual(
+            get_os('"macOS"', '"10.14.6"'),
+            {'family': 'Mac OS X', 'major': '10', 'minor': '14', 'patch': '6'},
+        )
+        self.assertEqual(get_os('"Windows"'), {'family': 'Windows', 'major': None, 'minor': None, 'patch': None})
+        self.assertEqual(get_os(None)['family'], 'Other')
+
+    @unpack
+    @data(
+        (CHROME_91_HINTS, '"Windows"', None, verdicts.COMPATIBLE),
+        ('"Google Chrome";v="66", "Chromium";v="66"', '"Linux"', None, verdicts.BUGGY_CHROME),
+        (EDGE_92_HINTS, '"macOS"', '"10.14.6"', verdicts.COMPATIBLE),
+        ('"Not A;Brand";v="99"', '"Windows"', None, None),
+    )
+    def test_get_client_hints_rule(self, sec_ch_ua, platform, platform_version, expected):
+        self.assertEqual(get_client_hints_rule(sec_ch_ua, platform, platform_version), expected)
+
+    def test_same_verdict_as_the_user_agent(self):
+        checker = UserAgentChecker.from_client_hints(CHROME_91_HINTS, '"Windows"', '"10.0.0"')
+        self.assertEqual(checker.user_agent['family'], UserAgentChecker(CHROME_91).user_agent['family'])
+        self.assertEqual(checker.incompatibility_rule, get_incompatibility_rule(CHROME_91))
+        self.assertIsNone(UserAgentChecker.from_client_hints(''))
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class ClientHintsMiddlewareTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+
+    def get(self, **headers):
+        with patch('django_cookies_samesite.middleware.get_incompatibility_rule',
+                   wraps=get_incompatibility_rule) as parse:
+            with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+                response = self.client.get('/compatibility-test/', **headers)
+        return response, parse
+
+    def test_client_hints_skip_user_agent_parsing(self):
+        response, parse = self.get(
+            HTTP_USER_AGENT=CHROME_91,
+            HTTP_SEC_CH_UA='"Google Chrome";v="66", "Chromium";v="66"',
+            HTTP_SEC_CH_UA_PLATFORM='"Linux"',
+        )
+        self.assertEqual(response.json(), {'compatible': False, 'name': 'Chrome 51-66'})
+        self.assertEqual(response.cookies['custom_cookie']['samesite'], '')
+        parse.assert_not_called()
+
+    def test_fallback_to_user_agent(self):
+        for headers in ({}, {'HTTP_SEC_CH_UA': '"Not A;Brand";v="99"'}):
+            response, parse = self.get(HTTP_USER_AGENT=CHROME_91, **headers)
+            self.assertEqual(response.json(), {'compatible': True, 'name': 'compatible'})
+            parse.assert_called_once_with(CHROME_91, None, None)
+            clear_verdict_cache()
+
+    def test_client_hints_disabled(self):
+        with self.settings(DCS_USE_CLIENT_HINTS=False):
+            response, parse = self.get(HTTP_USER_AGENT=CHROME_91, HTTP_SEC_CH_UA=CHROME_91_HINTS)
+        parse.assert_called_once_with(CHROME_91, None, None)
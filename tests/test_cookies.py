@@ -0,0 +1,68 @@
+# -*- encoding: utf-8 -*-
+import sys
+import unittest
+
+import django
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from django_cookies_samesite.cookies import Cookie, SameSiteMorsel, get_cookie_attributes, set_cookie_attributes
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+
+
+class CookieAttributesTests(unittest.TestCase):
+    def test_get_cookie_attributes(self):
+        self.assertEqual(get_cookie_attributes('None', False), (
+            (('samesite', 'None'),),
+            (('samesite', 'None'), ('secure', True)),
+        ))
+        self.assertEqual(get_cookie_attributes('None', True), (
+            (('samesite', 'Lax'),),
+            (('samesite', 'None'), ('secure', True)),
+        ))
+
+    def test_set_cookie_attributes(self):
+        cookies = Cookie.SimpleCookie()
+        cookies['sessionid'] = 'something'
+        cookies['sessionid']['path'] = '/'
+
+        set_cookie_attributes(cookies['sessionid'], get_cookie_attributes('None', False)[True])
+
+        self.assertIsInstance(cookies['sessionid'], SameSiteMorsel)
+        self.assertEqual(cookies['sessionid']['samesite'], 'None')
+        self.assertEqual(cookies['sessionid']['secure'], True)
+        self.assertEqual(cookies.output(), 'Set-Cookie: sessionid=something; Path=/; SameSite=None; Secure')
+
+    def test_morsel_is_not_patched(self):
+        """Other cookies in the process keep the standard Morsel."""
+        cookies = Cookie.SimpleCookie()
+        cookies['other'] = 'something'
+        self.assertIs(type(cookies['other']), Cookie.Morsel)
+        if sys.version_info < (3, 8):
+            self.assertNotIn('samesite', Cookie.Morsel._reserved)
+
+
+def many_cookies_response(count):
+    response = HttpResponse('cookies!')
+    for index in range(count):
+        response.set_cookie('cookie_{}'.format(index), 'something')
+    return response
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class DevModeTests(TestCase):
+    def test_devmode(self):
+        with self.settings(DCS_SESSION_COOKIE_SAMESITE='None', DCS_SAMESITE_DEVMODE=True,
+                           DCS_SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+            middleware = CookiesSameSite()
+
+            response = middleware.process_response(RequestFactory().get('/'), many_cookies_response(2))
+            for morsel in response.cookies.values():
+                self.assertEqual(morsel['samesite'], 'Lax')
+                self.assertEqual(morsel['secure'], '')
+
+            response = middleware.process_response(RequestFactory().get('/', secure=True), many_cookies_response(2))
+            for morsel in response.cookies.values():
+                self.assertEqual(morsel['samesite'], 'None')
+                self.assertEqual(morsel['secure'], True)
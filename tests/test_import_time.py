@@ -0,0 +1,25 @@
+# -*- encoding: utf-8 -*-
+import unittest
+
+from django_cookies_samesite.testing import import_times
+
+
+class ImportTimeTests(unittest.TestCase):
+    """Loading the middleware shouldn't pay for compiling the ua_parser regex database."""
+
+    def test_middleware_import_skips_ua_parser(self):
+        times = import_times('import django_cookies_samesite.middleware')
+        self.assertIn('django_cookies_samesite.middleware', times)
+        self.assertEqual([module for module in times if module.startswith('ua_parser')], [])
+
+    def test_ua_parser_imported_on_first_full_parse(self):
+        times = import_times(
+            'from django_cookies_samesite.classifier import get_incompatibility_rule\n'
+            'get_incompatibility_rule("Mozilla/5.0 (Windows NT 10.0; rv:68.0) Gecko/20100101 Firefox/68.0")\n'
+            'get_incompatibility_rule("Mozilla/5.0 (iPhone; CPU iPhone OS 12_0 like Mac OS X) CriOS/69.0")\n'
+        )
+        self.assertIn('ua_parser.user_agent_parser', times)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# -*- encoding: utf-8 -*-
+import unittest
+
+import django
+
+from mock import patch
+
+from django.test import RequestFactory, TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache
+from django_cookies_samesite.instrumentation import (
+    SKIPPED_DISABLED, SKIPPED_INCOMPATIBLE, SKIPPED_NO_COOKIES, MetricsCollector,
+)
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from django_cookies_samesite.signals import response_processed
+from tests.helpers import CHROME_66, FIREFOX
+
+from . import views
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        self.collector = MetricsCollector()
+        self.collector.connect()
+        self.addCleanup(self.collector.disconnect)
+        self.addCleanup(clear_verdict_cache)
+
+    def test_not_instrumented_without_receivers(self):
+        self.collector.disconnect()
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax'):
+            with patch('django_cookies_samesite.middleware.CookiesSameSite.collect_metrics') as collect_metrics:
+                self.client.get('/cookies-test/', HTTP_USER_AGENT=FIREFOX)
+            collect_metrics.assert_not_called()
+
+    def test_signal_arguments(self):
+        received = []
+
+        def receiver(sender, request, response, metrics, **kwargs):
+            received.append((request.path, response.status_code, metrics))
+
+        response_processed.connect(receiver)
+        self.addCleanup(response_processed.disconnect, receiver)
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax'):
+            response = self.client.get('/cookies-test/', HTTP_USER_AGENT=FIREFOX)
+
+        self.assertEqual(response.cookies['sessionid']['samesite'], 'Lax')
+        path, status_code, metrics = received[0]
+        self.assertEqual((path, status_code), ('/cookies-test/', 200))
+        self.assertEqual(set(metrics.timings), {'normalize', 'cache_lookup', 'classify', 'rewrite'})
+        self.assertEqual(metrics.cookies_rewritten, 2)
+        self.assertIsNone(metrics.skipped)
+        self.assertEqual(metrics.rule, verdicts.COMPATIBLE)
+        self.assertFalse(metrics.cache_hit)
+        self.assertEqual(metrics.path, verdicts.USER_AGENT_PATH)
+
+    def test_collector(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax'):
+            self.client.get('/cookies-test/', HTTP_USER_AGENT=FIREFOX)
+            self.client.get('/cookies-test/', HTTP_USER_AGENT=FIREFOX)
+            self.client.get('/cookies-test/', HTTP_USER_AGENT=CHROME_66)
+            self.client.get('/no-cookies-test/', HTTP_USER_AGENT=FIREFOX)
+        with self.settings(SESSION_COOKIE_SAMESITE=None):
+            self.client.get('/cookies-test/', HTTP_USER_AGENT=FIREFOX)
+
+        snapshot = self.collector.snapshot()
+        self.assertEqual(snapshot['responses'], 5)
+        self.assertEqual(snapshot['cookies_rewritten'], 4)
+        self.assertEqual(snapshot['skipped'], {
+            SKIPPED_INCOMPATIBLE: 1, SKIPPED_NO_COOKIES: 1, SKIPPED_DISABLED: 1,
+        })
+        self.assertEqual(snapshot['rules'], {verdicts.COMPATIBLE: 2, verdicts.BUGGY_CHROME: 1})
+        self.assertEqual((snapshot['cache_hits'], snapshot['cache_misses']), (1, 2))
+        self.assertEqual(snapshot['stage_calls'], {'normalize': 3, 'cache_lookup': 3, 'classify': 2, 'rewrite': 2})
+        self.assertTrue(all(seconds >= 0 for seconds in snapshot['stage_seconds'].values()))
+
+        self.collector.reset()
+        self.assertEqual(self.collector.snapshot()['responses'], 0)
+
+    def test_classification_during_the_request_is_reused(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+            with patch(
+                'django_cookies_samesite.middleware.CookiesSameSite.classify_user_agent', return_value=0,
+            ) as classify_user_agent:
+                self.client.get('/compatibility-test/', HTTP_USER_AGENT=FIREFOX)
+                self.client.get('/compatibility-test/', HTTP_USER_AGENT=FIREFOX)
+        classify_user_agent.assert_called_once_with(FIREFOX)
+
+        # The view classified the client, its real cache lookup and classification are reported.
+        snapshot = self.collector.snapshot()
+        self.assertEqual(snapshot['stage_calls'], {'normalize': 2, 'cache_lookup': 2, 'classify': 1, 'rewrite': 2})
+        self.assertEqual((snapshot['cache_hits'], snapshot['cache_misses']), (1, 1))
+        self.assertEqual(snapshot['rules'], {verdicts.COMPATIBLE: 2})
+
+    def test_classification_before_instrumentation(self):
+        self.collector.disconnect()
+        received = []
+
+        def receiver(sender, request, response, metrics, **kwargs):
+            received.append(metrics)
+
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+            middleware = CookiesSameSite(views.custom_cookie_test)
+            request = RequestFactory().get('/custom-cookie-test/', HTTP_USER_AGENT=FIREFOX)
+            middleware.process_request(request)
+            self.assertTrue(request.samesite_compatibility.compatible)
+            response_processed.connect(receiver)
+            self.addCleanup(response_processed.disconnect, receiver)
+            middleware.process_response(request, views.custom_cookie_test(request))
+
+        self.assertEqual(set(received[0].timings), {'rewrite'})
+        self.assertIsNone(received[0].cache_hit)
+
+    def test_client_hints_path(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+            self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=FIREFOX)
+            self.client.get(
+                '/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66, HTTP_SEC_CH_UA='"Chromium";v="91"',
+            )
+            self.client.get('/compatibility-test/', HTTP_USER_AGENT=CHROME_66, HTTP_SEC_CH_UA='"Chromium";v="91"')
+
+        snapshot = self.collector.snapshot()
+        self.assertEqual(snapshot['paths'], {verdicts.USER_AGENT_PATH: 1, verdicts.CLIENT_HINTS_PATH: 2})
+        self.assertEqual(snapshot['rules'], {verdicts.COMPATIBLE: 3})
+        self.assertEqual((snapshot['cache_hits'], snapshot['cache_misses']), (0, 1))
+        self.assertEqual(snapshot['stage_calls']['client_hints'], 2)
@@ -8,9 +8,14 @@ from mock import patch
 import django
 
 from ddt import ddt, data
-from django.test import TestCase
+from django.core.exceptions import MiddlewareNotUsed
+from django.test import RequestFactory, TestCase
 
-from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache
+from django_cookies_samesite.classifier import get_incompatibility_rule
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite, is_classified
+from django_cookies_samesite.verdicts import SameSiteCompatibility
 
 
 @ddt
@@ -52,6 +57,33 @@ class CookieSamesiteConfigTests(TestCase):
             middleware = CookiesSameSite()
             self.assertEqual(middleware.protected_cookies, {'custom_cookie'})
 
+    def test_invalid_settings_fail_at_startup(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='invalid'):
+            with self.assertRaises(ValueError) as exc:
+                CookiesSameSite()
+            self.assertEqual(exc.exception.args[0], 'samesite must be "Lax", "None", or "Strict".')
+
+        with self.settings(SESSION_COOKIE_SAMESITE_KEYS='something'):
+            with self.assertRaises(ValueError) as exc:
+                CookiesSameSite()
+            self.assertEqual(exc.exception.args[0], 'SESSION_COOKIE_SAMESITE_KEYS should be a list, set or tuple.')
+
+    def test_policy_is_rebuilt_when_settings_change(self):
+        with self.settings(DCS_SESSION_COOKIE_SAMESITE='Lax'):
+            middleware = CookiesSameSite()
+            policy = middleware.policy
+            self.assertIs(middleware.policy, policy)
+
+            with self.settings(DCS_SESSION_COOKIE_SAMESITE='Strict', DCS_SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+                self.assertEqual(middleware.samesite_flag, 'Strict')
+                self.assertEqual(middleware.samesite_force_all, True)
+
+            self.assertEqual(middleware.policy, policy)
+
+            policy = middleware.policy
+            with self.settings(DEBUG=False):
+                self.assertIs(middleware.policy, policy)
+
 
 @ddt
 class CookiesSamesiteTestsWithConfigPrefix(TestCase):
@@ -130,21 +162,11 @@ class CookiesSamesiteTestsWithConfigPrefix(TestCase):
             self.assertTrue('zcustom_cookie=' in cookies_string[3])
             self.assertTrue('; SameSite=None' in cookies_string[3])
 
-    @unittest.skipIf(django.get_version() < DJANGO_SUPPORTED_VERSION, 'should skip if Django does not support')
     def test_cookie_samesite_django31(self):
-        # Raise DeprecationWarning for newer versions of Django
+        # The middleware disables itself for newer versions of Django
         with patch('django.get_version', return_value=DJANGO_SUPPORTED_VERSION):
-            with self.assertRaises(DeprecationWarning) as exc:
-                self.client.get('/cookies-test/')
-
-            self.assertEqual(exc.exception.args[0], (
-                'Your version of Django supports SameSite flag in the cookies mechanism. '
-                'You should remove django-cookies-samesite from your project.'
-            ))
-
-        with patch('django_cookies_samesite.middleware.django.get_version', return_value=DJANGO_SUPPORTED_VERSION):
-            with self.assertRaises(DeprecationWarning) as exc:
-                self.client.get('/cookies-test/')
+            with self.assertRaises(MiddlewareNotUsed) as exc:
+                CookiesSameSite()
 
             self.assertEqual(exc.exception.args[0], (
                 'Your version of Django supports SameSite flag in the cookies mechanism. '
@@ -351,3 +373,74 @@ class CookiesSamesiteTestsWithConfigPrefix(TestCase):
             cookies_string = sorted(response.cookies.output().split('\r\n'))
             self.assertTrue('; SameSite=None; Secure' in cookies_string[0])
             self.assertTrue('; SameSite=None; Secure' in cookies_string[2])
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class LazyUserAgentEvaluationTests(TestCase):
+    """The User-Agent should be classified only when there's a cookie to rewrite."""
+    user_agent = (
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/67.0.2704.103 Safari/537.36'
+    )
+
+    def setUp(self):
+        clear_verdict_cache()
+
+    def get(self, path):
+        with patch('django_cookies_samesite.middleware.get_incompatibility_rule',
+                   wraps=get_incompatibility_rule) as parse:
+            response = self.client.get(path, HTTP_USER_AGENT=self.user_agent)
+        return response, parse
+
+    def test_response_without_cookies(self):
+        for force_all in (False, True):
+            with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=force_all):
+                response, parse = self.get('/no-cookies-test/')
+                self.assertFalse(response.cookies)
+                parse.assert_not_called()
+
+    def test_response_without_protected_cookies(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax'):
+            response, parse = self.get('/custom-cookie-test/')
+            self.assertEqual(response.cookies['custom_cookie']['samesite'], '')
+            parse.assert_not_called()
+
+    def test_force_all_parses_user_agent(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+            response, parse = self.get('/custom-cookie-test/')
+            self.assertEqual(response.cookies['custom_cookie']['samesite'], 'Lax')
+            parse.assert_called_once_with(self.user_agent, None, None)
+
+    def test_samesite_flag_disabled(self):
+        with self.settings(SESSION_COOKIE_SAMESITE=None):
+            response, parse = self.get('/cookies-test/')
+            parse.assert_not_called()
+
+    def test_request_compatibility_is_shared_with_the_view(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+            response, parse = self.get('/compatibility-test/')
+            self.assertEqual(response.json(), {'compatible': True, 'name': 'compatible'})
+            self.assertEqual(response.cookies['custom_cookie']['samesite'], 'Lax')
+            parse.assert_called_once_with(self.user_agent, None, None)
+
+    def test_request_compatibility_is_lazy(self):
+        request = RequestFactory().get('/', HTTP_USER_AGENT=self.user_agent)
+        middleware = CookiesSameSite()
+        with patch('django_cookies_samesite.middleware.get_incompatibility_rule',
+                   wraps=get_incompatibility_rule) as parse:
+            middleware.process_request(request)
+            lazy_compatibility = request.samesite_compatibility
+            parse.assert_not_called()
+            self.assertFalse(is_classified(request))
+
+            self.assertEqual(lazy_compatibility.rule, verdicts.COMPATIBLE)
+            self.assertTrue(is_classified(request))
+            self.assertFalse(middleware.do_not_send_same_site_policy(request))
+            parse.assert_called_once_with(self.user_agent, None, None)
+        # The evaluated compatibility replaces the lazy one.
+        self.assertIs(type(request.samesite_compatibility), SameSiteCompatibility)
+        self.assertEqual(lazy_compatibility, request.samesite_compatibility)
+
+    def test_request_without_process_request(self):
+        request = RequestFactory().get('/', HTTP_USER_AGENT=self.user_agent)
+        self.assertFalse(CookiesSameSite().do_not_send_same_site_policy(request))
+        self.assertEqual(request.samesite_compatibility, SameSiteCompatibility(verdicts.COMPATIBLE))
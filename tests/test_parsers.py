@@ -0,0 +1,104 @@
+# -*- encoding: utf-8 -*-
+import io
+import os
+import random
+import unittest
+
+import django
+
+from mock import patch
+
+from django.test import TestCase
+
+from django_cookies_samesite.cache import clear_verdict_cache, verdict_cache
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from django_cookies_samesite.parsers import MinimalBackend, UAParserBackend
+from django_cookies_samesite.policy import load_parser
+from django_cookies_samesite.testing import ParserBackendConformanceMixin
+from tests.helpers import CHROME_66
+
+MINIMAL_BACKEND = 'django_cookies_samesite.parsers.MinimalBackend'
+USER_AGENTS_PATH = os.path.join(os.path.dirname(__file__), 'user_agents.txt')
+
+
+def load_user_agents():
+    with io.open(USER_AGENTS_PATH, encoding='utf-8') as user_agents:
+        return [line.rstrip('\n') for line in user_agents if line.strip()]
+
+
+class UAParserBackendTests(ParserBackendConformanceMixin, unittest.TestCase):
+    parser_class = UAParserBackend
+
+
+class MinimalBackendTests(ParserBackendConformanceMixin, unittest.TestCase):
+    parser_class = MinimalBackend
+
+    def assertSameFields(self, user_agents):
+        reference = UAParserBackend()
+        for user_agent in user_agents:
+            self.assertEqual(self.parser.parse(user_agent), reference.parse(user_agent), user_agent)
+
+    def test_same_fields_as_ua_parser(self):
+        self.assertSameFields(load_user_agents())
+
+    def test_same_fields_as_ua_parser_with_shuffled_tokens(self):
+        # The tokens of other User-Agents inserted anywhere, e.g. the tokens of several browsers.
+        user_agents = load_user_agents()
+        tokens = sorted(set(token for user_agent in user_agents for token in user_agent.split()))
+        generator = random.Random(0)
+        fuzzed = []
+        for _ in range(5000):
+            words = generator.choice(user_agents).split()
+            for _ in range(generator.randint(1, 3)):
+                words.insert(generator.randint(0, len(words)), generator.choice(tokens))
+            fuzzed.append(' '.join(words))
+        self.assertSameFields(fuzzed)
+
+    def test_only_the_rules_which_can_match_are_tried(self):
+        from ua_parser import user_agent_parser
+
+        self.parser.parse(CHROME_66)
+        browser_index = self.parser.indexes[0]
+        with patch.object(user_agent_parser.UserAgentParser, 'Parse', autospec=True,
+                          wraps=user_agent_parser.UserAgentParser.Parse) as parse:
+            self.parser.parse(CHROME_66)
+        self.assertLess(parse.call_count, len(browser_index.rules) / 10)
+
+
+class LoadParserTests(TestCase):
+    def test_default(self):
+        self.assertIsNone(load_parser())
+
+    def test_backend(self):
+        with self.settings(DCS_UA_PARSER_BACKEND=MINIMAL_BACKEND):
+            self.assertIsInstance(load_parser(), MinimalBackend)
+
+    def test_invalid_backend(self):
+        for path in ('django_cookies_samesite.parsers.Missing', 'django_cookies_samesite.parsers.re', 'missing'):
+            with self.settings(DCS_UA_PARSER_BACKEND=path):
+                with self.assertRaisesRegex(ValueError, 'UA_PARSER_BACKEND'):
+                    load_parser()
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class MiddlewareParserBackendTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+
+    def test_configured_backend_is_used(self):
+        with self.settings(
+            SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True,
+            DCS_UA_PARSER_BACKEND=MINIMAL_BACKEND,
+        ):
+            with patch.object(MinimalBackend, 'parse', autospec=True, wraps=MinimalBackend.parse) as parse:
+                response = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66)
+        self.assertEqual(response.cookies['custom_cookie']['samesite'], '')
+        self.assertEqual(parse.call_count, 1)
+
+    def test_verdict_cache_is_cleared_when_the_backend_changes(self):
+        middleware = CookiesSameSite()
+        verdict_cache.set(CHROME_66, 0)
+        with self.settings(DCS_UA_PARSER_BACKEND=MINIMAL_BACKEND):
+            middleware.policy
+        self.assertNotIn(CHROME_66, verdict_cache)
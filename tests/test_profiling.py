@@ -0,0 +1,143 @@
+# -*- encoding: utf-8 -*-
+import os
+import pstats
+import unittest
+
+import django
+
+from mock import patch
+
+from django.test import TestCase
+
+from django_cookies_samesite.cache import clear_verdict_cache
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION
+from django_cookies_samesite.policy import load_profiler
+from django_cookies_samesite.profiling import DUMP_PREFIX, DUMP_SUFFIX, SampledProfiler
+from tests.helpers import TemporaryDirectoryMixin
+
+# UC Browser needs the full parse, not only the fast path.
+UC_BROWSER_12_11 = (
+    'Mozilla/5.0 (Linux; U; Android 8.1.0; en-US; Nexus 6P Build/OPM7.181205.001) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Version/4.0 Chrome/57.0.2987.108 UCBrowser/12.11.1.{} Mobile Safari/537.36'
+)
+
+
+def profiled_function(value):
+    return value * 2
+
+
+class SampledProfilerTests(TemporaryDirectoryMixin, unittest.TestCase):
+    def get_dumps(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(DUMP_SUFFIX))
+
+    def test_sampling(self):
+        profiler = SampledProfiler(3, self.directory)
+        self.assertEqual([profiler.is_sampled() for _ in range(6)], [False, False, True, False, False, True])
+
+    def test_dump(self):
+        profiler = SampledProfiler(1, self.directory)
+        self.assertIsNone(profiler.dump())
+        self.assertEqual(profiler.runcall(profiled_function, 21), 42)
+        self.assertEqual(profiler.runcall(profiled_function, 1), 2)
+        self.assertEqual(self.get_dumps(), [])
+
+        path = profiler.dump()
+        self.assertEqual(self.get_dumps(), [os.path.basename(path)])
+        calls = {
+            function[2]: stats[1] for function, stats in pstats.Stats(path).stats.items()
+        }
+        self.assertEqual(calls['profiled_function'], 2)
+        # The next dump has only what was profiled since this one.
+        self.assertIsNone(profiler.dump())
+
+    def test_periodic_dump(self):
+        profiler = SampledProfiler(1, self.directory, dump_interval=0)
+        profiler.runcall(profiled_function, 1)
+        profiler.runcall(profiled_function, 1)
+        self.assertEqual(len(self.get_dumps()), 2)
+
+    def test_disk_cap(self):
+        old_dump = os.path.join(self.directory, '{}0-1-1{}'.format(DUMP_PREFIX, DUMP_SUFFIX))
+        other_file = os.path.join(self.directory, 'other.txt')
+        for path in (old_dump, other_file):
+            with open(path, 'wb') as dump_file:
+                dump_file.write(b'x' * 1000)
+        os.utime(old_dump, (0, 0))
+
+        profiler = SampledProfiler(1, self.directory, max_bytes=1000)
+        profiler.runcall(profiled_function, 1)
+        path = profiler.dump()
+        self.assertEqual(self.get_dumps(), [os.path.basename(path)])
+        self.assertTrue(os.path.exists(other_file))
+
+    def test_write_errors_are_ignored(self):
+        path = os.path.join(self.directory, 'file')
+        with open(path, 'w'):
+            pass
+        profiler = SampledProfiler(1, os.path.join(path, 'profiles'), dump_interval=0)
+        self.assertEqual(profiler.runcall(profiled_function, 21), 42)
+
+
+class LoadProfilerTests(TestCase):
+    def test_disabled(self):
+        self.assertIsNone(load_profiler())
+        with self.settings(DCS_PROFILE_SAMPLE_RATE=0, DCS_PROFILE_DIRECTORY='/tmp'):
+            self.assertIsNone(load_profiler())
+
+    def test_profiler(self):
+        with self.settings(
+            DCS_PROFILE_SAMPLE_RATE=100, DCS_PROFILE_DIRECTORY='/tmp/profiles',
+            DCS_PROFILE_MAX_BYTES=1024, DCS_PROFILE_DUMP_INTERVAL=10,
+        ):
+            profiler = load_profiler()
+        self.assertEqual(
+            (profiler.rate, profiler.directory, profiler.max_bytes, profiler.dump_interval),
+            (100, '/tmp/profiles', 1024, 10),
+        )
+
+    def test_invalid_settings(self):
+        for settings in (
+            {'DCS_PROFILE_SAMPLE_RATE': -1, 'DCS_PROFILE_DIRECTORY': '/tmp'},
+            {'DCS_PROFILE_SAMPLE_RATE': '10', 'DCS_PROFILE_DIRECTORY': '/tmp'},
+            {'DCS_PROFILE_SAMPLE_RATE': 10},
+            {'DCS_PROFILE_SAMPLE_RATE': 10, 'DCS_PROFILE_DIRECTORY': '/tmp', 'DCS_PROFILE_MAX_BYTES': 0},
+            {'DCS_PROFILE_SAMPLE_RATE': 10, 'DCS_PROFILE_DIRECTORY': '/tmp', 'DCS_PROFILE_DUMP_INTERVAL': -1},
+        ):
+            with self.settings(**settings):
+                with self.assertRaisesRegex(ValueError, 'PROFILE_'):
+                    load_profiler()
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class MiddlewareProfilingTests(TemporaryDirectoryMixin, TestCase):
+    def setUp(self):
+        super(MiddlewareProfilingTests, self).setUp()
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+
+    def get_profiled_settings(self):
+        return self.settings(
+            SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True,
+            DCS_PROFILE_SAMPLE_RATE=2, DCS_PROFILE_DIRECTORY=self.directory, DCS_PROFILE_DUMP_INTERVAL=0,
+        )
+
+    def test_sampled_responses_are_profiled(self):
+        with self.get_profiled_settings():
+            for build in range(4):
+                response = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=UC_BROWSER_12_11.format(build))
+                self.assertEqual(response.cookies['custom_cookie']['samesite'], '')
+
+        dumps = [os.path.join(self.directory, name) for name in sorted(os.listdir(self.directory))]
+        self.assertEqual(len(dumps), 2)
+        profiled = set()
+        for path in dumps:
+            profiled.update((os.path.basename(function[0]), function[2]) for function in pstats.Stats(path).stats)
+        self.assertIn(('middleware.py', 'update_response'), profiled)
+        # Including the time spent parsing the User-Agent.
+        self.assertIn(('user_agent_parser.py', 'Parse'), profiled)
+
+    def test_unsampled_responses_are_not_profiled(self):
+        with self.get_profiled_settings():
+            with patch('cProfile.Profile') as profile:
+                self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=UC_BROWSER_12_11.format(0))
+        profile.assert_not_called()
@@ -0,0 +1,196 @@
+# -*- encoding: utf-8 -*-
+import json
+import os
+import threading
+import unittest
+
+import django
+
+from mock import patch
+
+from django.apps import apps
+from django.test import TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache
+from django_cookies_samesite.instrumentation import SKIPPED_INCOMPATIBLE, SKIPPED_NO_COOKIES, ResponseMetrics
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION
+from django_cookies_samesite.prometheus import (
+    CONTENT_TYPE, FILE_PREFIX, FILE_SUFFIX, PrometheusCollector, metrics_collector,
+)
+from tests.helpers import CHROME_66, FIREFOX, TemporaryDirectoryMixin
+
+
+def make_metrics(rule=verdicts.COMPATIBLE, cookies_rewritten=1, classify=None, skipped=None):
+    metrics = ResponseMetrics()
+    metrics.rule = rule
+    metrics.path = verdicts.USER_AGENT_PATH
+    metrics.cookies_rewritten = cookies_rewritten
+    metrics.skipped = skipped
+    metrics.cache_hit = classify is None
+    if classify is not None:
+        metrics.timings['classify'] = classify
+    return metrics
+
+
+def parse(text):
+    """The samples of the exposition format by name."""
+    return {
+        line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+        for line in text.splitlines() if not line.startswith('#')
+    }
+
+
+class PrometheusCollectorTests(unittest.TestCase):
+    def setUp(self):
+        self.collector = PrometheusCollector()
+
+    def test_render(self):
+        self.collector.receive(None, make_metrics(classify=0.0002))
+        self.collector.receive(None, make_metrics())
+        self.collector.receive(
+            None, make_metrics(verdicts.BUGGY_CHROME, 0, classify=0.02, skipped=SKIPPED_INCOMPATIBLE),
+        )
+        metrics = ResponseMetrics()
+        metrics.skipped = SKIPPED_NO_COOKIES
+        self.collector.receive(None, metrics)
+
+        text = self.collector.render()
+        self.assertIn('# TYPE dcs_responses_total counter\n', text)
+        self.assertIn('# TYPE dcs_ua_parse_seconds histogram\n', text)
+        samples = parse(text)
+        self.assertEqual(samples['dcs_responses_total'], 4)
+        self.assertEqual(samples['dcs_responses_rewritten_total'], 2)
+        self.assertEqual(samples['dcs_responses_skipped_total{reason="incompatible"}'], 1)
+        self.assertEqual(samples['dcs_responses_skipped_total{reason="no_cookies"}'], 1)
+        self.assertEqual(samples['dcs_verdicts_total{path="user_agent",rule="compatible"}'], 2)
+        self.assertEqual(samples['dcs_verdicts_total{path="user_agent",rule="Chrome 51-66"}'], 1)
+        self.assertEqual(samples['dcs_ua_cache_hits_total'], 1)
+        self.assertEqual(samples['dcs_ua_cache_misses_total'], 2)
+        self.assertAlmostEqual(samples['dcs_ua_cache_hit_ratio'], 1 / 3.0)
+        self.assertEqual(samples['dcs_ua_parse_seconds_bucket{le="0.0001"}'], 0)
+        self.assertEqual(samples['dcs_ua_parse_seconds_bucket{le="0.0005"}'], 1)
+        self.assertEqual(samples['dcs_ua_parse_seconds_bucket{le="0.05"}'], 2)
+        self.assertEqual(samples['dcs_ua_parse_seconds_bucket{le="+Inf"}'], 2)
+        self.assertEqual(samples['dcs_ua_parse_seconds_count'], 2)
+        self.assertAlmostEqual(samples['dcs_ua_parse_seconds_sum'], 0.0202)
+
+    def test_empty(self):
+        samples = parse(self.collector.render())
+        self.assertEqual(samples['dcs_responses_total'], 0)
+        self.assertEqual(samples['dcs_ua_cache_hit_ratio'], 0)
+        self.assertEqual(samples['dcs_ua_parse_seconds_bucket{le="+Inf"}'], 0)
+        self.assertNotIn('dcs_verdicts_total', ' '.join(samples))
+
+    def test_threads_count_separately(self):
+        def receive():
+            for _ in range(1000):
+                self.collector.receive(None, make_metrics())
+
+        threads = [threading.Thread(target=receive) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.collector.collect()['dcs_responses_total'], 4000)
+        # The counters of the finished threads are merged.
+        self.assertEqual(self.collector._counters, {})
+
+    def test_finished_threads_are_merged_when_a_thread_starts(self):
+        for _ in range(10):
+            thread = threading.Thread(target=self.collector.receive, args=(None, make_metrics()))
+            thread.start()
+            thread.join()
+        self.assertEqual(len(self.collector._counters), 1)
+        self.collector.receive(None, make_metrics())
+        self.assertEqual(list(self.collector._counters), [threading.current_thread()])
+        self.assertEqual(self.collector.collect()['dcs_responses_total'], 11)
+
+
+class MultiProcessTests(TemporaryDirectoryMixin, unittest.TestCase):
+    def setUp(self):
+        super(MultiProcessTests, self).setUp()
+        self.collector = PrometheusCollector(self.directory, flush_interval=0)
+
+    def write_process_file(self, pid, samples):
+        path = os.path.join(self.directory, '{}{}{}'.format(FILE_PREFIX, pid, FILE_SUFFIX))
+        with open(path, 'w') as metrics_file:
+            json.dump(samples, metrics_file)
+
+    def test_flush(self):
+        self.collector.receive(None, make_metrics())
+        path = os.path.join(self.directory, '{}{}{}'.format(FILE_PREFIX, os.getpid(), FILE_SUFFIX))
+        with open(path) as metrics_file:
+            self.assertEqual(json.load(metrics_file)['dcs_responses_total'], 1)
+
+    def test_aggregation(self):
+        self.collector.receive(None, make_metrics())
+        self.write_process_file(os.getppid(), {'dcs_responses_total': 10, 'dcs_ua_cache_size': 5})
+        with patch('django_cookies_samesite.prometheus.is_process_running', return_value=False):
+            self.write_process_file(999999999, {'dcs_responses_total': 100, 'dcs_ua_cache_size': 50})
+            self.write_process_file('broken', {'dcs_responses_total': 1000})
+            samples = parse(self.collector.render())
+        self.assertEqual(samples['dcs_responses_total'], 111)
+        # Only the cache sizes of the running processes.
+        self.assertEqual(samples['dcs_ua_cache_size'], self.collector.collect()['dcs_ua_cache_size'])
+
+    def test_running_processes_gauges(self):
+        self.write_process_file(os.getppid(), {'dcs_ua_cache_size': 5})
+        with patch('django_cookies_samesite.prometheus.is_process_running', return_value=True):
+            cache_size = self.collector.aggregate()['dcs_ua_cache_size']
+        self.assertEqual(cache_size, 5 + self.collector.collect()['dcs_ua_cache_size'])
+
+    def test_write_errors_are_ignored(self):
+        path = os.path.join(self.directory, 'file')
+        with open(path, 'w'):
+            pass
+        collector = PrometheusCollector(os.path.join(path, 'metrics'), flush_interval=0)
+        collector.receive(None, make_metrics())
+        self.assertIsNone(collector.flush())
+        self.assertEqual(parse(collector.render())['dcs_responses_total'], 1)
+
+    def test_serialization_errors_are_ignored(self):
+        with patch('django_cookies_samesite.prometheus.json.dumps', side_effect=TypeError):
+            self.collector.receive(None, make_metrics())
+        self.assertEqual(self.collector.collect()['dcs_responses_total'], 1)
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class MetricsViewTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+        metrics_collector.reset()
+        self.addCleanup(metrics_collector.reset)
+
+    def test_disabled(self):
+        self.assertEqual(self.client.get('/samesite/metrics/').status_code, 404)
+
+    def test_metrics(self):
+        app_config = apps.get_app_config('django_cookies_samesite')
+        with patch('atexit.register'), patch('os.register_at_fork', create=True):
+            with self.settings(DCS_PROMETHEUS_METRICS=True):
+                app_config.ready()
+        self.addCleanup(metrics_collector.disconnect)
+
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+            self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66)
+            self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=FIREFOX)
+            self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=FIREFOX)
+            response = self.client.get('/samesite/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], CONTENT_TYPE)
+        samples = parse(response.content.decode('utf-8'))
+        self.assertEqual(samples['dcs_responses_total'], 3)
+        self.assertEqual(samples['dcs_responses_rewritten_total'], 2)
+        self.assertEqual(samples['dcs_verdicts_total{path="user_agent",rule="Chrome 51-66"}'], 1)
+        self.assertEqual(samples['dcs_ua_cache_hits_total'], 1)
+        self.assertEqual(samples['dcs_ua_parse_seconds_count'], 2)
+        self.assertEqual(samples['dcs_ua_cache_size'], 2)
+
+    def test_invalid_flush_interval(self):
+        app_config = apps.get_app_config('django_cookies_samesite')
+        with self.settings(DCS_PROMETHEUS_METRICS=True, DCS_PROMETHEUS_FLUSH_INTERVAL=-1):
+            with self.assertRaisesRegex(ValueError, 'PROMETHEUS_FLUSH_INTERVAL'):
+                app_config.ready()
@@ -0,0 +1,132 @@
+# -*- encoding: utf-8 -*-
+import unittest
+
+import django
+
+from ddt import ddt, data, unpack
+
+from django.test import TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache, make_cache_key, verdict_cache
+from django_cookies_samesite.classifier import get_incompatibility_rule
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from django_cookies_samesite.rules import DEFAULT_RULES, Rule, RuleEngine, parse_rule
+from django_cookies_samesite.user_agent_checker import UserAgentChecker, parse_client
+from tests.helpers import FIREFOX
+
+from .test_classifier import load_user_agents
+
+SAMSUNG_8 = (
+    'Mozilla/5.0 (Linux; Android 9; SAMSUNG SM-G960F) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'SamsungBrowser/8.2 Chrome/63.0.3239.111 Mobile Safari/537.36'
+)
+SAMSUNG_9 = SAMSUNG_8.replace('SamsungBrowser/8.2', 'SamsungBrowser/9.2')
+
+
+@ddt
+class RuleEngineTests(unittest.TestCase):
+    def test_default_rules_agree_with_the_checks(self):
+        for user_agent in load_user_agents():
+            checker = UserAgentChecker(user_agent)
+            self.assertEqual(
+                checker.do_not_send_same_site_policy,
+                not (checker.supported_browsers_os() or checker.other_browsers()),
+                user_agent,
+            )
+
+    def test_dispatch(self):
+        engine = RuleEngine([
+            Rule(verdicts.COMPATIBLE, browser='Firefox', max_version=(47,)),
+            Rule(verdicts.CUSTOM_RULE, browser='Firefox', os='Windows'),
+            Rule(verdicts.IOS_12, os='Windows', version_of='os', min_version=(10,)),
+        ])
+        self.assertEqual(engine.classify(parse_client(FIREFOX)), verdicts.COMPATIBLE)
+        self.assertEqual(engine.classify(parse_client(FIREFOX.replace('47.0', '48.0'))), verdicts.CUSTOM_RULE)
+        self.assertEqual(engine.classify(parse_client(FIREFOX.replace('Firefox', 'Other'))), verdicts.COMPATIBLE)
+        self.assertEqual(
+            engine.classify(parse_client(FIREFOX.replace('Firefox', 'Other').replace('6.1', '10.0'))),
+            verdicts.IOS_12,
+        )
+
+    def test_fingerprint(self):
+        self.assertEqual(RuleEngine().fingerprint, RuleEngine(DEFAULT_RULES).fingerprint)
+        self.assertNotEqual(RuleEngine().fingerprint, RuleEngine(DEFAULT_RULES[1:]).fingerprint)
+
+    @data(
+        ({'browser': 'Samsung Internet', 'max_version': '8.9'},
+         Rule(verdicts.CUSTOM_RULE, browser='Samsung Internet', max_version=(8, 9))),
+        ({'os': 'Android', 'min_version': 4, 'max_version': [4, 4], 'incompatible': False},
+         Rule(verdicts.COMPATIBLE, os='Android', version_of='os', min_version=(4,), max_version=(4, 4))),
+        ({'browser': 'Chrome', 'os': 'Android', 'version_of': 'os', 'min_version': '10'},
+         Rule(verdicts.CUSTOM_RULE, browser='Chrome', os='Android', version_of='os', min_version=(10,))),
+    )
+    @unpack
+    def test_parse_rule(self, spec, rule):
+        self.assertEqual(parse_rule(spec), rule)
+
+    @data(
+        'Chrome',
+        {},
+        {'browser': 'Chrome', 'unknown': True},
+        {'browser': 'Chrome', 'version_of': 'device'},
+        {'browser': 'Chrome', 'min_version': '1.x'},
+        {'browser': 'Chrome Mobile'},
+        {'browser': 'Chrome Mobile WebView', 'os': 'Android'},
+        {'browser': 'Chromium'},
+        {'browser': 'Mobile Safari', 'os': 'iOS'},
+    )
+    def test_invalid_rule(self, spec):
+        with self.assertRaises(ValueError):
+            parse_rule(spec)
+
+    def test_grouped_browser_flavour_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, 'every Chrome flavour is matched as "Chrome"'):
+            parse_rule({'browser': 'Chrome Mobile', 'max_version': '66'})
+        self.assertEqual(parse_rule({'browser': 'Safari', 'os': 'iOS'}).browser, 'Safari')
+
+    def test_custom_rules_skip_the_fast_path(self):
+        engine = RuleEngine((parse_rule({'browser': 'Firefox'}),) + DEFAULT_RULES)
+        self.assertEqual(get_incompatibility_rule(FIREFOX), verdicts.COMPATIBLE)
+        self.assertEqual(get_incompatibility_rule(FIREFOX, engine), verdicts.CUSTOM_RULE)
+
+
+class CustomRulesSettingTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+
+    def test_invalid_setting(self):
+        for setting in ('Chrome', [{'browser': 'Chrome', 'min_version': 'new'}], [{'browser': 'Mobile Safari'}]):
+            with self.settings(DCS_SAMESITE_RULES=setting):
+                with self.assertRaises(ValueError):
+                    CookiesSameSite()
+
+    def test_policy(self):
+        self.assertIsNone(CookiesSameSite().policy.rule_engine)
+        with self.settings(DCS_SAMESITE_RULES=[{'browser': 'Samsung Internet', 'max_version': '8'}]):
+            rule_engine = CookiesSameSite().policy.rule_engine
+            self.assertEqual(rule_engine.rules[1:], DEFAULT_RULES)
+            self.assertEqual(UserAgentChecker(SAMSUNG_8, rule_engine).incompatibility_rule, verdicts.CUSTOM_RULE)
+            self.assertEqual(UserAgentChecker(SAMSUNG_9, rule_engine).incompatibility_rule, verdicts.COMPATIBLE)
+
+    @unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+    def test_custom_rules_are_applied(self):
+        with self.settings(SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True):
+            response = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=SAMSUNG_8)
+            self.assertEqual(response.cookies['custom_cookie']['samesite'], 'Lax')
+
+            with self.settings(DCS_SAMESITE_RULES=[{'browser': 'Samsung Internet', 'max_version': '8'}]):
+                response = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=SAMSUNG_8)
+                self.assertEqual(response.cookies['custom_cookie']['samesite'], '')
+                self.assertEqual(verdict_cache.get(make_cache_key(SAMSUNG_8)), verdicts.CUSTOM_RULE)
+
+    def test_verdict_cache_is_cleared_when_the_rules_change(self):
+        middleware = CookiesSameSite()
+        verdict_cache.set(FIREFOX, verdicts.COMPATIBLE)
+        with self.settings(DCS_SAMESITE_DEVMODE=True):
+            middleware.policy
+        self.assertIn(FIREFOX, verdict_cache)
+        with self.settings(DCS_SAMESITE_RULES=[{'browser': 'Firefox'}]):
+            middleware.policy
+        self.assertNotIn(FIREFOX, verdict_cache)
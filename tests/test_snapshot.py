@@ -0,0 +1,225 @@
+# -*- encoding: utf-8 -*-
+import io
+import os
+import threading
+import time
+import unittest
+
+import django
+
+from mock import patch
+
+from django.test import TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import VerdictCache, clear_verdict_cache, make_cache_key
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from django_cookies_samesite.parsers import MinimalBackend
+from django_cookies_samesite.policy import load_verdict_snapshot
+from django_cookies_samesite.rules import DEFAULT_RULES, RuleEngine, parse_rule
+from django_cookies_samesite.snapshot import (
+    VerdictCacheSnapshot,
+    get_snapshot_version,
+    read_snapshot,
+    run_exit_save,
+    save_at_exit,
+    write_snapshot,
+)
+from tests.helpers import CHROME_66, TemporaryDirectoryMixin
+
+VERSION = get_snapshot_version()
+
+
+class SnapshotFileTests(TemporaryDirectoryMixin, unittest.TestCase):
+    file_name = 'verdicts.snapshot'
+
+    def test_missing_or_invalid_file(self):
+        self.assertEqual(read_snapshot(self.file_path, VERSION), {})
+        with io.open(self.file_path, 'wb') as snapshot_file:
+            snapshot_file.write(b'not a snapshot')
+        self.assertEqual(read_snapshot(self.file_path, VERSION), {})
+
+    def test_other_version(self):
+        write_snapshot(self.file_path, VERSION, [(1, 1)])
+        self.assertEqual(read_snapshot(self.file_path, VERSION), {1: 1})
+        self.assertEqual(read_snapshot(self.file_path, get_snapshot_version(parser=MinimalBackend())), {})
+
+    def test_truncated_record(self):
+        write_snapshot(self.file_path, VERSION, [(1, 1), (2, 2)])
+        with io.open(self.file_path, 'ab') as snapshot_file:
+            snapshot_file.write(b'\x03\x00\x00')
+        self.assertEqual(list(read_snapshot(self.file_path, VERSION).items()), [(1, 1), (2, 2)])
+
+    def test_version(self):
+        custom_rules = RuleEngine((parse_rule({'browser': 'Samsung Internet', 'max_version': '8'}),) + DEFAULT_RULES)
+        self.assertEqual(get_snapshot_version(), get_snapshot_version(RuleEngine()))
+        self.assertNotEqual(get_snapshot_version(), get_snapshot_version(custom_rules))
+        self.assertNotEqual(get_snapshot_version(), get_snapshot_version(parser=MinimalBackend()))
+        with patch('ua_parser.VERSION', (0, 0, 1)):
+            self.assertNotEqual(get_snapshot_version(), VERSION)
+
+
+class VerdictCacheSnapshotTests(TemporaryDirectoryMixin, unittest.TestCase):
+    file_name = 'verdicts.snapshot'
+
+    def test_save_and_load(self):
+        cache = VerdictCache(10)
+        snapshot = VerdictCacheSnapshot(self.file_path, VERSION)
+        self.assertEqual(snapshot.load(cache), 0)
+        for index in range(3):
+            cache.set(index, index)
+        self.assertEqual(snapshot.save(cache), 3)
+        # Only the new verdicts are appended.
+        cache.set(3, 3)
+        self.assertEqual(snapshot.save(cache), 1)
+        self.assertEqual(snapshot.save(cache), 0)
+
+        restarted_cache = VerdictCache(10)
+        self.assertEqual(VerdictCacheSnapshot(self.file_path, VERSION).load(restarted_cache), 4)
+        self.assertEqual(restarted_cache.items(), cache.items())
+
+    def test_stale_snapshot_is_discarded(self):
+        write_snapshot(self.file_path, get_snapshot_version(parser=MinimalBackend()), [(1, 1)])
+        cache = VerdictCache(10)
+        snapshot = VerdictCacheSnapshot(self.file_path, VERSION)
+        self.assertEqual(snapshot.load(cache), 0)
+        cache.set(2, 2)
+        snapshot.save(cache)
+        self.assertEqual(read_snapshot(self.file_path, VERSION), {2: 2})
+
+    def test_shared_file(self):
+        caches = [VerdictCache(10), VerdictCache(10)]
+        snapshots = [VerdictCacheSnapshot(self.file_path, VERSION) for _ in caches]
+        for index, (cache, snapshot) in enumerate(zip(caches, snapshots)):
+            cache.set(index, index)
+            snapshot.save(cache)
+        self.assertEqual(read_snapshot(self.file_path, VERSION), {0: 0, 1: 1})
+
+    def test_compaction(self):
+        cache = VerdictCache(4)
+        snapshot = VerdictCacheSnapshot(self.file_path, VERSION)
+        for index in range(20):
+            cache.set(index, 1)
+            snapshot.save(cache)
+        snapshot_records = read_snapshot(self.file_path, VERSION)
+        self.assertLessEqual(len(snapshot_records), 8)
+        self.assertEqual(list(snapshot_records)[-4:], [16, 17, 18, 19])
+
+    def test_periodic_save(self):
+        cache = VerdictCache(10)
+        cache.set(1, 1)
+        snapshot = VerdictCacheSnapshot(self.file_path, VERSION, interval=0.01)
+        self.addCleanup(snapshot.stop_saving)
+        with patch('threading.Thread.start', autospec=True, side_effect=threading.Thread.start) as start:
+            snapshot.start_saving(cache)
+            snapshot.start_saving(cache)
+        start.assert_called_once()
+        for _ in range(100):
+            if read_snapshot(self.file_path, VERSION):
+                break
+            time.sleep(0.01)
+        self.assertEqual(read_snapshot(self.file_path, VERSION), {1: 1})
+
+    def test_no_periodic_save(self):
+        with patch('threading.Thread.start') as start:
+            VerdictCacheSnapshot(self.file_path, VERSION, interval=0).start_saving(VerdictCache(10))
+        start.assert_not_called()
+
+    @patch('django_cookies_samesite.snapshot.exit_save', None)
+    def test_save_at_exit(self):
+        cache = VerdictCache(10)
+        stale_snapshot = VerdictCacheSnapshot(os.path.join(self.directory, 'stale'), VERSION)
+        snapshot = VerdictCacheSnapshot(self.file_path, VERSION)
+        with patch('atexit.register') as register:
+            save_at_exit(stale_snapshot, cache)
+            save_at_exit(snapshot, cache)
+        register.assert_called_once_with(run_exit_save)
+        self.assertTrue(stale_snapshot._stopped.is_set())
+        cache.set(1, 1)
+        run_exit_save()
+        self.assertEqual(read_snapshot(self.file_path, VERSION), {1: 1})
+        self.assertFalse(os.path.exists(stale_snapshot.path))
+
+    def test_write_errors_are_ignored(self):
+        cache = VerdictCache(10)
+        cache.set(1, 1)
+        snapshot = VerdictCacheSnapshot(os.path.join(self.file_path, 'missing', 'file'), VERSION)
+        self.assertEqual(snapshot.save(cache), 0)
+
+
+class LoadVerdictSnapshotTests(TestCase):
+    def test_disabled(self):
+        self.assertIsNone(load_verdict_snapshot())
+
+    def test_snapshot(self):
+        with self.settings(DCS_UA_CACHE_SNAPSHOT_PATH='/tmp/verdicts.snapshot', DCS_UA_CACHE_SNAPSHOT_INTERVAL=10):
+            snapshot = load_verdict_snapshot(parser=MinimalBackend())
+        self.assertEqual(
+            (snapshot.path, snapshot.version, snapshot.interval),
+            ('/tmp/verdicts.snapshot', get_snapshot_version(parser=MinimalBackend()), 10),
+        )
+
+    def test_invalid_interval(self):
+        for interval in (-1, '10'):
+            with self.settings(
+                DCS_UA_CACHE_SNAPSHOT_PATH='/tmp/verdicts.snapshot', DCS_UA_CACHE_SNAPSHOT_INTERVAL=interval,
+            ):
+                with self.assertRaisesRegex(ValueError, 'UA_CACHE_SNAPSHOT_INTERVAL'):
+                    load_verdict_snapshot()
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class MiddlewareSnapshotTests(TemporaryDirectoryMixin, TestCase):
+    file_name = 'verdicts.snapshot'
+
+    def setUp(self):
+        super(MiddlewareSnapshotTests, self).setUp()
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+
+    def get_snapshot_settings(self, **kwargs):
+        kwargs.setdefault('DCS_UA_CACHE_SNAPSHOT_INTERVAL', 0)
+        return self.settings(
+            SESSION_COOKIE_SAMESITE='Lax', SESSION_COOKIE_SAMESITE_FORCE_ALL=True,
+            DCS_UA_CACHE_SNAPSHOT_PATH=self.file_path, **kwargs
+        )
+
+    @patch('atexit.register')
+    @patch('django_cookies_samesite.snapshot.exit_save', None)
+    def test_verdicts_survive_a_restart(self, register):
+        with self.get_snapshot_settings():
+            self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66)
+            run_exit_save()
+            snapshot_records = read_snapshot(self.file_path, VERSION)
+            self.assertEqual(snapshot_records[make_cache_key(CHROME_66)], verdicts.BUGGY_CHROME)
+
+            clear_verdict_cache()
+            with patch('django_cookies_samesite.middleware.get_incompatibility_rule') as get_rule:
+                middleware = CookiesSameSite()
+                request = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66).wsgi_request
+                self.assertTrue(middleware.do_not_send_same_site_policy(request))
+            get_rule.assert_not_called()
+
+    @patch('atexit.register')
+    @patch('django_cookies_samesite.snapshot.exit_save', None)
+    def test_misses_start_the_saving_thread(self, register):
+        with self.get_snapshot_settings(DCS_UA_CACHE_SNAPSHOT_INTERVAL=60):
+            with patch('threading.Thread.start') as start:
+                with patch('django_cookies_samesite.snapshot.append_snapshot') as append_snapshot:
+                    self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66)
+                    self.client.get('/custom-cookie-test/', HTTP_USER_AGENT='other')
+        start.assert_called_once_with()
+        append_snapshot.assert_not_called()
+
+    @patch('atexit.register')
+    @patch('django_cookies_samesite.snapshot.exit_save', None)
+    def test_rule_change_discards_the_snapshot(self, register):
+        with self.get_snapshot_settings():
+            self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66)
+            run_exit_save()
+
+        clear_verdict_cache()
+        rules = [{'browser': 'Chrome', 'min_version': '51', 'max_version': '66', 'incompatible': False}]
+        with self.get_snapshot_settings(DCS_SAMESITE_RULES=rules):
+            response = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66)
+        self.assertEqual(response.cookies['custom_cookie']['samesite'], 'Lax')
@@ -1,4 +1,10 @@
 import unittest
+
+from mock import Mock, patch
+
+from django_cookies_samesite import parsers, verdicts
+from django_cookies_samesite.classifier import get_incompatibility_rule
+from django_cookies_samesite.rules import RuleEngine, parse_rule
 from django_cookies_samesite.user_agent_checker import UserAgentChecker
 
 
@@ -161,6 +167,76 @@ class TestUserAgentChecker(unittest.TestCase):
         user_agent_checker = UserAgentChecker("Liferea/x.x.x (Linux; en_US.UTF-8; http://liferea.sf.net/)")
         self.assertEqual(user_agent_checker.is_uc_browser_in_least_supported_version(), False)
 
+    def test_incompatibility_rule(self):
+        self.assertEqual(
+            UserAgentChecker("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                             "Chrome/66.0.3334.0 Safari/537.36").incompatibility_rule, verdicts.BUGGY_CHROME)
+        self.assertEqual(
+            UserAgentChecker("Mozilla/5.0 (Linux; U; Android 6.0.1; zh-CN; F5121 Build/34.0.A.1.247) "
+                             "AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/40.0.2214.89 "
+                             "UCBrowser/11.5.1.944 Mobile Safari/537.36").incompatibility_rule,
+            verdicts.OLD_UC_BROWSER)
+        self.assertEqual(
+            UserAgentChecker("Mozilla/5.0 (iPhone; CPU iPhone OS 12_0 like Mac OS X) AppleWebKit/604.1.21 "
+                             "(KHTML, like Gecko) Version/12.0 Mobile/17A6278a Safari/602.1.26").incompatibility_rule,
+            verdicts.IOS_12)
+        self.assertEqual(
+            UserAgentChecker("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14) AppleWebKit/605.1.15 (KHTML, like Gecko) "
+                             "Version/12.0 Safari/605.1.15").incompatibility_rule, verdicts.MACOS_10_14_SAFARI)
+        self.assertEqual(
+            UserAgentChecker("Mozilla/5.0 (Windows NT 6.1; WOW64) AppleWebKit/534.57.2 (KHTML, like Gecko) "
+                             "Version/5.1.7 Safari/534.57.2").incompatibility_rule, verdicts.OTHER_INCOMPATIBLE)
+        self.assertEqual(
+            UserAgentChecker("Mozilla/5.0 (Windows NT 6.1; Win64; x64; rv:47.0) Gecko/20100101 "
+                             "Firefox/47.0").incompatibility_rule, verdicts.COMPATIBLE)
+
+    def test_classify_many(self):
+        user_agents = [
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/66.0.3334.0 "
+            "Safari/537.36",
+            "Mozilla/5.0 (Windows NT 6.1; Win64; x64; rv:47.0) Gecko/20100101 Firefox/47.0",
+            "",
+            None,
+        ] * 3
+        expected = [UserAgentChecker(user_agent).do_not_send_same_site_policy for user_agent in user_agents]
+
+        with patch('django_cookies_samesite.classifier.get_incompatibility_rule',
+                   wraps=get_incompatibility_rule) as classify:
+            self.assertEqual(UserAgentChecker.classify_many(iter(user_agents)), expected)
+        self.assertEqual(classify.call_count, 4)
+
+        verdicts_iterator = UserAgentChecker.classify_many(iter(user_agents), chunk_size=5)
+        self.assertNotIsInstance(verdicts_iterator, list)
+        self.assertEqual(list(verdicts_iterator), expected)
+        self.assertEqual(UserAgentChecker.classify_many([]), [])
+        self.assertEqual(list(UserAgentChecker.classify_many([], chunk_size=5)), [])
+
+        with self.assertRaises(ValueError):
+            UserAgentChecker.classify_many(user_agents, chunk_size=0)
+
+    def test_classify_many_uses_the_rules_and_the_parser(self):
+        user_agents = [
+            "Mozilla/5.0 (Windows NT 6.1; Win64; x64; rv:47.0) Gecko/20100101 Firefox/47.0",
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.93 "
+            "Safari/537.36",
+        ]
+        rule_engine = RuleEngine([parse_rule({'browser': 'Firefox'})])
+        self.assertEqual(UserAgentChecker.classify_many(user_agents), [False, False])
+        self.assertEqual(UserAgentChecker.classify_many(user_agents, rule_engine=rule_engine), [True, False])
+        self.assertEqual(
+            list(UserAgentChecker.classify_many(user_agents, chunk_size=1, rule_engine=rule_engine)), [True, False])
+
+        parser = Mock(wraps=parsers.default_parser)
+        UserAgentChecker.classify_many(user_agents, parser=parser)
+        self.assertEqual(parser.parse.call_count, 2)
+
+    def test_classify_many_uses_the_fast_path(self):
+        with patch('django_cookies_samesite.user_agent_checker.parse_client') as parse:
+            self.assertEqual(UserAgentChecker.classify_many([
+                "Mozilla/5.0 (Windows NT 6.1; Win64; x64; rv:47.0) Gecko/20100101 Firefox/47.0",
+            ]), [False])
+        parse.assert_not_called()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,137 @@
+# -*- encoding: utf-8 -*-
+import io
+import os
+import unittest
+
+import django
+
+from mock import patch
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache
+from django_cookies_samesite.canonical import default_canonicalizer
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from django_cookies_samesite.parsers import MinimalBackend
+from django_cookies_samesite.policy import load_policy
+from django_cookies_samesite.snapshot import get_snapshot_version
+from django_cookies_samesite.user_agent_checker import UserAgentChecker
+from django_cookies_samesite.verdict_table import (
+    StaleVerdictTable, VerdictTable, hash_user_agent, write_verdict_table,
+)
+from tests.helpers import CHROME_66, TemporaryDirectoryMixin
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'user_agents.txt')
+VERSION = get_snapshot_version()
+MINIMAL_BACKEND = 'django_cookies_samesite.parsers.MinimalBackend'
+
+
+class VerdictTableTests(TemporaryDirectoryMixin, unittest.TestCase):
+    file_name = 'verdicts.bin'
+
+    def test_lookup(self):
+        rules = {'ua-{}'.format(i): i % 6 for i in range(500)}
+        self.assertEqual(write_verdict_table(self.file_path, VERSION, rules.items()), 500)
+
+        table = VerdictTable(self.file_path, VERSION)
+        self.addCleanup(table.close)
+        self.assertEqual(len(table), 500)
+        for user_agent, rule in rules.items():
+            self.assertEqual(table.get(user_agent), rule)
+        self.assertIsNone(table.get('unknown'))
+        self.assertNotIn('unknown', table)
+
+    def test_empty_table(self):
+        write_verdict_table(self.file_path, VERSION, [])
+        table = VerdictTable(self.file_path)
+        self.addCleanup(table.close)
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(table.get('ua'))
+
+    def test_invalid_file(self):
+        with io.open(self.file_path, 'wb') as table_file:
+            table_file.write(b'not a verdict table')
+        with self.assertRaises(ValueError):
+            VerdictTable(self.file_path)
+
+    def test_other_version(self):
+        write_verdict_table(self.file_path, get_snapshot_version(parser=MinimalBackend()), [('ua', 0)])
+        with self.assertRaises(StaleVerdictTable):
+            VerdictTable(self.file_path, VERSION)
+        table = VerdictTable(self.file_path)
+        self.addCleanup(table.close)
+        self.assertEqual(table.get('ua'), 0)
+
+    def test_hash_is_stable(self):
+        self.assertEqual(hash_user_agent('Mozilla/5.0'), hash_user_agent(u'Mozilla/5.0'))
+        self.assertLess(hash_user_agent('Mozilla/5.0'), 2 ** 64)
+
+
+class BuildVerdictTableCommandTests(TemporaryDirectoryMixin, TestCase):
+    file_name = 'verdicts.bin'
+
+    def test_build_from_corpus(self):
+        stdout = io.StringIO()
+        call_command('build_verdict_table', CORPUS_PATH, output=self.file_path, stdout=stdout)
+        self.assertIn('Wrote', stdout.getvalue())
+
+        table = VerdictTable(self.file_path, VERSION)
+        self.addCleanup(table.close)
+        with io.open(CORPUS_PATH, encoding='utf-8') as corpus:
+            user_agents = [line.strip() for line in corpus if line.strip() and not line.startswith('#')]
+        # The table holds the canonical User-Agents the middleware looks up.
+        for user_agent in map(default_canonicalizer, user_agents):
+            self.assertEqual(table.get(user_agent), UserAgentChecker(user_agent).incompatibility_rule)
+
+    def test_output_is_required(self):
+        with self.assertRaises(CommandError):
+            call_command('build_verdict_table', CORPUS_PATH)
+
+    def test_missing_corpus(self):
+        with self.assertRaises(CommandError):
+            call_command('build_verdict_table', os.path.join(self.directory, 'missing.txt'), output=self.file_path)
+
+
+class MiddlewareVerdictTableTests(TemporaryDirectoryMixin, TestCase):
+    file_name = 'verdicts.bin'
+
+    def setUp(self):
+        super(MiddlewareVerdictTableTests, self).setUp()
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+
+    def test_invalid_table_path(self):
+        with self.settings(DCS_VERDICT_TABLE_PATH=self.file_path):
+            with self.assertRaises(ValueError) as exc:
+                CookiesSameSite()
+            self.assertEqual(
+                exc.exception.args[0],
+                'VERDICT_TABLE_PATH should point to a table built with the build_verdict_table command.',
+            )
+
+    def test_table_of_other_rules_is_rejected(self):
+        write_verdict_table(self.file_path, get_snapshot_version(parser=MinimalBackend()), [(CHROME_66, 0)])
+        with self.settings(DCS_VERDICT_TABLE_PATH=self.file_path):
+            with self.assertRaisesRegex(ValueError, 'built for other rules or another parser'):
+                CookiesSameSite()
+        with self.settings(DCS_VERDICT_TABLE_PATH=self.file_path, DCS_UA_PARSER_BACKEND=MINIMAL_BACKEND):
+            self.assertEqual(load_policy().verdict_table.get(CHROME_66), 0)
+
+    @unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+    def test_known_user_agents_are_not_parsed(self):
+        write_verdict_table(self.file_path, VERSION, [(CHROME_66, verdicts.BUGGY_CHROME)])
+        with self.settings(
+            DCS_SESSION_COOKIE_SAMESITE='None', DCS_SESSION_COOKIE_SAMESITE_FORCE_ALL=True,
+            DCS_VERDICT_TABLE_PATH=self.file_path,
+        ):
+            with patch('django_cookies_samesite.middleware.get_incompatibility_rule') as classify:
+                response = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT=CHROME_66)
+                self.assertEqual(response.cookies['custom_cookie']['samesite'], '')
+                self.assertFalse(classify.called)
+
+                classify.return_value = verdicts.COMPATIBLE
+                response = self.client.get('/custom-cookie-test/', HTTP_USER_AGENT='Unknown/1.0')
+                self.assertEqual(response.cookies['custom_cookie']['samesite'], 'None')
+                classify.assert_called_once_with('Unknown/1.0', None, None)
@@ -0,0 +1,74 @@
+# -*- encoding: utf-8 -*-
+import os
+import tempfile
+import unittest
+
+import django
+
+from mock import patch
+
+from django.apps import apps
+from django.test import TestCase
+
+from django_cookies_samesite import verdicts
+from django_cookies_samesite.cache import clear_verdict_cache, make_cache_key, verdict_cache
+from django_cookies_samesite.classifier import get_incompatibility_rule
+from django_cookies_samesite.middleware import DJANGO_SUPPORTED_VERSION, CookiesSameSite
+from django_cookies_samesite.warmup import DEFAULT_CORPUS_PATH, read_user_agents, warm_up
+
+TESTS_CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'user_agents.txt')
+SAMSUNG_8 = (
+    'Mozilla/5.0 (Linux; Android 7.0; SAMSUNG SM-G930F) AppleWebKit/537.36 (KHTML, like Gecko) '
+    'SamsungBrowser/8.2 Chrome/63.0.3239.111 Mobile Safari/537.36'
+)
+
+
+@unittest.skipIf(django.get_version() >= DJANGO_SUPPORTED_VERSION, 'should skip if Django already supports')
+class WarmUpTests(TestCase):
+    def setUp(self):
+        clear_verdict_cache()
+        self.addCleanup(clear_verdict_cache)
+
+    def test_bundled_corpus(self):
+        user_agents = set(read_user_agents([DEFAULT_CORPUS_PATH]))
+        self.assertGreater(len(user_agents), 50)
+        self.assertEqual(warm_up(), len(user_agents))
+        for user_agent in user_agents:
+            self.assertEqual(verdict_cache.get(make_cache_key(user_agent)), get_incompatibility_rule(user_agent))
+
+    def test_custom_corpus(self):
+        user_agents = set(read_user_agents([TESTS_CORPUS_PATH]))
+        self.assertEqual(warm_up([TESTS_CORPUS_PATH]), len(user_agents))
+        self.assertEqual(len(verdict_cache), len(user_agents))
+
+    def test_cache_size(self):
+        with self.settings(DCS_UA_CACHE_SIZE=10):
+            warm_up()
+        self.assertEqual(len(verdict_cache), 10)
+
+    def test_custom_rules_survive_the_middleware(self):
+        rules = [{'browser': 'Samsung Internet', 'max_version': '8'}]
+        corpus_path = self.write_corpus([SAMSUNG_8])
+        with self.settings(DCS_SAMESITE_RULES=rules):
+            warm_up([corpus_path])
+            CookiesSameSite().policy
+        self.assertEqual(verdict_cache.get(make_cache_key(SAMSUNG_8)), verdicts.CUSTOM_RULE)
+
+    def test_app_config(self):
+        app_config = apps.get_app_config('django_cookies_samesite')
+        with patch('django_cookies_samesite.warmup.warm_up') as warm_up_mock:
+            app_config.ready()
+            warm_up_mock.assert_not_called()
+            with self.settings(DCS_UA_CACHE_WARMUP=True):
+                app_config.ready()
+            warm_up_mock.assert_called_once_with(None)
+            with self.settings(DCS_UA_CACHE_WARMUP=TESTS_CORPUS_PATH):
+                app_config.ready()
+            warm_up_mock.assert_called_with([TESTS_CORPUS_PATH])
+
+    def write_corpus(self, user_agents):
+        corpus_file = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        self.addCleanup(os.remove, corpus_file.name)
+        with corpus_file:
+            corpus_file.write('\n'.join(user_agents))
+        return corpus_file.name
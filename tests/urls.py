@@ -1,7 +1,11 @@
-from django.conf.urls import url
+from django.conf.urls import include, url
 
 from . import views
 
 urlpatterns = [
-    url('^cookies-test/$', views.cookies_test, name='cookie-test')
+    url('^cookies-test/$', views.cookies_test, name='cookie-test'),
+    url('^no-cookies-test/$', views.no_cookies_test, name='no-cookies-test'),
+    url('^custom-cookie-test/$', views.custom_cookie_test, name='custom-cookie-test'),
+    url('^compatibility-test/$', views.compatibility_test, name='compatibility-test'),
+    url('^samesite/', include('django_cookies_samesite.urls')),
 ]
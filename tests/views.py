@@ -1,4 +1,4 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
 
 
@@ -15,3 +15,31 @@ def cookies_test(request):
     response.set_cookie('zcustom_cookie', 'something')
 
     return response
+
+
+def no_cookies_test(request):
+    """
+    Respond without setting any cookies.
+    """
+    return HttpResponse('{}', content_type='application/json')
+
+
+def custom_cookie_test(request):
+    """
+    Set only a cookie which isn't protected by default.
+    """
+    response = HttpResponse('cookies!')
+    response.set_cookie('custom_cookie', 'something')
+
+    return response
+
+
+def compatibility_test(request):
+    """
+    Report the SameSite compatibility of the client and set a cookie.
+    """
+    compatibility = request.samesite_compatibility
+    response = JsonResponse({'compatible': compatibility.compatible, 'name': compatibility.name})
+    response.set_cookie('custom_cookie', 'something')
+
+    return response